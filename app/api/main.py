@@ -1,44 +1,49 @@
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-import structlog, time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 
-from app.api.utils import extract_request_id_from_headers
 from app.core.config import get_settings
+from app.api.routers.export import router as export_router
 from app.api.routers.ingest import router as ingest_router
 from app.api.routers.stats import router as stats_router
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
-from app.api.middleware import PrometheusMiddleware
+from app.api.middleware import ObservabilityMiddleware
 from app.observability.metrics import REGISTRY
 from app.observability.logging import configure_json_logging
+from app.services.ingest_batcher import get_batcher
+from app.services.ingest_spool import get_spool
+from app.services.rollup_folder import get_rollup_folder
 
 
 configure_json_logging()
 settings = get_settings()
 
-app = FastAPI(title="Robomate Events Analytics")
-
-app.add_middleware(PrometheusMiddleware)
-
 
-class AccessLogMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = extract_request_id_from_headers(request.headers)
-        structlog.contextvars.bind_contextvars(request_id=request_id)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    batcher = get_batcher()
+    spool = get_spool()
+    folder = get_rollup_folder()
+    if batcher is not None:
+        await batcher.start()
+    if spool is not None:
+        await spool.start()
+    if folder is not None:
+        await folder.start()
+    try:
+        yield
+    finally:
+        if folder is not None:
+            await folder.stop()
+        if spool is not None:
+            await spool.stop()
+        if batcher is not None:
+            await batcher.stop()
 
-        route = request.scope.get("route")
-        route_path = getattr(route, "path", request.url.path)
-        t0 = time.perf_counter()
-        try:
-            response: Response = await call_next(request)
-            response.headers["X-Request-ID"] = request_id
-            status = response.status_code
-            return response
-        finally:
-            dt = time.perf_counter() - t0
-            structlog.contextvars.clear_contextvars()
 
+app = FastAPI(title="Robomate Events Analytics", lifespan=lifespan)
 
-app.add_middleware(AccessLogMiddleware)
+app.add_middleware(ObservabilityMiddleware)
 
 
 @app.get("/healthz")
@@ -58,4 +63,5 @@ async def metrics():
 
 
 app.include_router(ingest_router)
+app.include_router(export_router)
 app.include_router(stats_router)
@@ -1,40 +1,78 @@
 import time
 import logging
-from uuid import uuid4
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+
+import structlog
+
+from app.api.utils import extract_request_id_from_headers
 from app.observability.metrics import REQUESTS, REQUEST_LATENCY
 
+UNMATCHED_ROUTE = "<unmatched>"
+_METHODS = frozenset(
+    {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+)
+
+log = logging.getLogger("access")
+
+
+class ObservabilityMiddleware:
+    """
+    Request id, access log and Prometheus metrics in one pure ASGI pass.
+
+    Metrics are labelled by the matched route template ("/stats/dau"), or
+    UNMATCHED_ROUTE when routing found nothing, so arbitrary paths cannot
+    blow up label cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        log = logging.getLogger("access")
         start = time.perf_counter()
+        request_id = extract_request_id_from_headers(_Headers(scope["headers"]))
+        scope["request_id"] = request_id
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+        header = (b"x-request-id", request_id.encode("latin-1"))
+        status = 500
 
-        request_id = request.headers.get("x-request-id") or str(uuid4())
-        request.scope["request_id"] = request_id
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
 
-        response: Response | None = None
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dur = time.perf_counter() - start
+            method = scope["method"] if scope["method"] in _METHODS else "OTHER"
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
 
+            REQUEST_LATENCY.labels(method=method, route=route).observe(dur)
+            REQUESTS.labels(method=method, path=route, status=str(status)).inc()
             log.info(
-                f"access method={request.method} path={request.url.path} "
-                f"status={response.status_code} request_id={request_id}"
+                f"access method={scope['method']} path={scope['path']} "
+                f"route={route} status={status} duration_ms={dur * 1000:.2f} "
+                f"request_id={request_id}"
             )
+            structlog.contextvars.clear_contextvars()
 
-            response.headers["x-request-id"] = request_id
-            return response
 
-        finally:
-            dur = time.perf_counter() - start
-            path = request.scope.get("path", request.url.path)
-            status_code = response.status_code if response is not None else 500
-
-            REQUEST_LATENCY.observe(dur)
-            REQUESTS.labels(
-                method=request.method,
-                path=path,
-                status=str(status_code),
-            ).inc()
+class _Headers:
+    """Just enough of a mapping over raw ASGI headers for a single lookup."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def get(self, name: str, default=None):
+        key = name.encode("latin-1")
+        for k, v in self.raw:
+            if k == key:
+                return v.decode("latin-1")
+        return default
@@ -0,0 +1,80 @@
+"""
+Incremental newline-delimited JSON reading for streamed request bodies.
+
+Nothing here holds more than one line (capped at max_line_bytes) plus one
+decompressed chunk, so memory does not grow with the size of the upload.
+"""
+import zlib
+from typing import AsyncIterator, Optional, Tuple
+
+# upper bound on what one decompress() call may produce
+_INFLATE_CHUNK = 64 * 1024
+
+
+class StreamDecodeError(ValueError):
+    """The body could not be decompressed; nothing after it is readable."""
+
+
+async def gunzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Inflates a gzip stream (concatenated members allowed) chunk by chunk."""
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    in_member = False
+    async for chunk in chunks:
+        data = chunk
+        while data:
+            in_member = True
+            try:
+                out = d.decompress(data, _INFLATE_CHUNK)
+            except zlib.error as e:
+                raise StreamDecodeError(f"invalid gzip stream: {e}") from None
+            if out:
+                yield out
+            if d.eof:
+                data = d.unused_data
+                d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                in_member = False
+            else:
+                data = d.unconsumed_tail
+    if in_member:
+        raise StreamDecodeError("invalid gzip stream: truncated")
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int,
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Yields (line number, line) for every non-blank line, numbered from 1.
+    Lines longer than max_line_bytes are skipped to their end and yielded
+    as (line number, None).
+    """
+    buf = bytearray()
+    lineno = 1
+    overlong = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            if nl < 0:
+                if not overlong:
+                    buf += chunk[start:]
+                    if len(buf) > max_line_bytes:
+                        overlong = True
+                        buf.clear()
+                break
+            if overlong:
+                yield lineno, None
+                overlong = False
+            else:
+                buf += chunk[start:nl]
+                if len(buf) > max_line_bytes:
+                    yield lineno, None
+                elif buf.strip():
+                    yield lineno, bytes(buf)
+            buf.clear()
+            lineno += 1
+            start = nl + 1
+    if overlong:
+        yield lineno, None
+    elif buf.strip():
+        yield lineno, bytes(buf)
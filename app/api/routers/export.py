@@ -0,0 +1,43 @@
+from __future__ import annotations
+from datetime import date
+from typing import AsyncIterator, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.config import get_settings
+from app.db.session import AnalyticsSessionLocal
+from app.services.export_dao import MEDIA_TYPES, iter_export
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/export")
+async def export_events(
+    from_: date = Query(..., alias="from", description="YYYY-MM-DD inclusive"),
+    to:   date = Query(..., description="YYYY-MM-DD inclusive"),
+    event_type: Optional[str] = Query(None, description="Only this event type"),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+):
+    """
+    Streams events ordered by occurred_at. CSV re-imports with
+    app.cli.import_events, NDJSON with POST /events/stream.
+    """
+    if to < from_:
+        raise HTTPException(status_code=422, detail="'to' must be >= 'from'")
+
+    async def body() -> AsyncIterator[bytes]:
+        # the session lives as long as the response body, not the handler
+        async with AnalyticsSessionLocal() as session:
+            async for chunk, _ in iter_export(
+                session, from_, to, event_type, format,
+                chunk_rows=get_settings().EXPORT_CHUNK_ROWS,
+            ):
+                yield chunk.encode()
+
+    filename = f"events_{from_}_{to}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,35 +1,72 @@
 from __future__ import annotations
+import time
+from typing import List
 
 from starlette.requests import Request
 
-from app.core.metrics import EVENTS_INGESTED, INGEST_DURATION, Timer
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.schemas import EventsBatchIn, IngestResult
+from pydantic import TypeAdapter, ValidationError
+
+from app.api.fast_json import validate_json_body
+from app.api.ndjson import StreamDecodeError, gunzip, iter_lines
+from app.api.schemas import (
+    EventIn,
+    IngestResult,
+    LineError,
+    StreamIngestResult,
+    events_batch_adapter,
+)
 from app.core.config import get_settings
+from app.core.rate_limit import check_rate_limit, wait_rate_limit
 from app.db.session import AsyncSessionLocal
+from app.observability.metrics import (
+    EVENTS_INGESTED,
+    INGEST_DURATION,
+    INGEST_STAGE_SECONDS,
+)
 from app.services.events_dao import insert_events_idempotent
+from app.services.ingest_batcher import get_batcher
+from app.services.ingest_spool import get_spool
 
 
 router = APIRouter(prefix="/events", tags=["events"])
 
+_BODY = INGEST_STAGE_SECONDS.labels("body")
+_VALIDATE = INGEST_STAGE_SECONDS.labels("validate")
+_COMMIT = INGEST_STAGE_SECONDS.labels("commit")
+
 
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
 
 
+# The body is read and validated by hand (one validate_json call over the
+# raw bytes), so its schema is spelled out for the OpenAPI docs.
+_BATCH_SCHEMA = {"type": "array", "items": TypeAdapter(EventIn).json_schema()}
+
+
 @router.post(
     "",
     response_model=IngestResult,
-    status_code=status.HTTP_202_ACCEPTED
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": _BATCH_SCHEMA}},
+    }},
 )
 async def ingest_events(
-    batch: EventsBatchIn,
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     settings = get_settings()
+    # request.body() caches, so validate_json_body does not read it again
+    with _BODY.time():
+        await request.body()
+    # JSON decode and validation are one pydantic-core pass
+    with _VALIDATE.time():
+        batch = await validate_json_body(request, events_batch_adapter)
 
     if len(batch) == 0:
         raise HTTPException(status_code=422, detail="Empty batch")
@@ -38,10 +75,25 @@ async def ingest_events(
             status_code=413,
             detail=f"Batch too large. MAX_BATCH_SIZE={settings.MAX_BATCH_SIZE}",
         )
+    check_rate_limit(request, "ingest", cost=len(batch))
 
-    with Timer(INGEST_DURATION):
-        accepted, skipped = await insert_events_idempotent(db, batch)
-        await db.commit()
+    spool = get_spool()
+    if spool is not None:
+        with INGEST_DURATION.time():
+            spooled = await spool.try_append(batch)
+        if spooled:
+            # dedupe happens on replay; skipped shows up in events_ingest_skipped
+            EVENTS_INGESTED.labels("spooled").inc(len(batch))
+            return IngestResult(accepted=len(batch), skipped=0)
+
+    batcher = get_batcher()
+    with INGEST_DURATION.time():
+        if batcher is not None and batcher.running:
+            accepted, skipped = await batcher.submit(batch)
+        else:
+            accepted, skipped = await insert_events_idempotent(db, batch)
+            with _COMMIT.time():
+                await db.commit()
 
     if accepted:
         EVENTS_INGESTED.labels("accepted").inc(accepted)
@@ -49,3 +101,101 @@ async def ingest_events(
         EVENTS_INGESTED.labels("skipped").inc(skipped)
 
     return IngestResult(accepted=accepted, skipped=skipped)
+
+
+@router.post(
+    "/stream",
+    response_model=StreamIngestResult,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+    }},
+)
+async def ingest_events_stream(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    One event per line (NDJSON), optionally with Content-Encoding: gzip.
+    Lines are parsed as they arrive and committed every
+    INGEST_STREAM_BATCH events, so there is no size limit and a dropped
+    connection keeps what was committed; replays are deduplicated by
+    event_id. Invalid lines are counted and skipped, not fatal.
+    """
+    settings = get_settings()
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported Content-Encoding {encoding!r}, expected gzip or identity",
+        )
+    chunks = request.stream()
+    if encoding == "gzip":
+        chunks = gunzip(chunks)
+
+    accepted = skipped = invalid = 0
+    validating = 0.0
+    errors: List[LineError] = []
+    batch: List[EventIn] = []
+
+    def reject(line: int, error: str) -> None:
+        nonlocal invalid
+        invalid += 1
+        if len(errors) < settings.INGEST_STREAM_MAX_ERRORS:
+            errors.append(LineError(line=line, error=error))
+
+    async def flush() -> None:
+        nonlocal accepted, skipped, validating
+        # lines are timed one by one and observed once per batch
+        _VALIDATE.observe(validating)
+        validating = 0.0
+        # a stream cannot be answered 429 halfway, so it is slowed down instead
+        await wait_rate_limit(request, "ingest", len(batch))
+        with INGEST_DURATION.time():
+            a, s = await insert_events_idempotent(db, batch)
+            with _COMMIT.time():
+                await db.commit()
+        accepted += a
+        skipped += s
+        batch.clear()
+
+    lineno = 0
+    try:
+        async for lineno, line in iter_lines(chunks, settings.INGEST_STREAM_MAX_LINE_BYTES):
+            if line is None:
+                reject(lineno, f"Line longer than {settings.INGEST_STREAM_MAX_LINE_BYTES} bytes")
+                continue
+            t0 = time.perf_counter()
+            try:
+                batch.append(EventIn.model_validate_json(line))
+            except ValidationError as e:
+                reject(lineno, _describe(e))
+                continue
+            finally:
+                validating += time.perf_counter() - t0
+            if len(batch) >= settings.INGEST_STREAM_BATCH:
+                await flush()
+    except StreamDecodeError as e:
+        # everything decoded so far is still ingested and reported
+        reject(lineno + 1, str(e))
+    if batch:
+        await flush()
+
+    if accepted:
+        EVENTS_INGESTED.labels("accepted").inc(accepted)
+    if skipped:
+        EVENTS_INGESTED.labels("skipped").inc(skipped)
+    if invalid:
+        EVENTS_INGESTED.labels("invalid").inc(invalid)
+
+    return StreamIngestResult(
+        accepted=accepted, skipped=skipped, invalid=invalid, errors=errors,
+    )
+
+
+def _describe(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in e.errors(include_url=False)
+    )
@@ -1,41 +1,223 @@
 from __future__ import annotations
-from datetime import date
-from typing import List
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.fast_json import FastJSONResponse
 from app.api.schemas import (
     DATEDAU,
     TopEvent,
+    RetentionMatrixResponse,
     RetentionResponse,
-    RetentionWindow
+    UniqueUsers,
+)
+from app.db.session import AnalyticsSessionLocal
+from app.core.config import get_settings
+from app.core.rate_limit import rate_limit_dependency
+from app.services.day_versions_dao import range_version
+from app.services.parallel_stats import (
+    StatsTimeout,
+    get_dau_parallel,
+    get_top_events_parallel,
+    use_parallel,
+)
+from app.services.stats_cache import (
+    closed_range,
+    etag_for,
+    get_stats_cache,
+    get_version_map,
+)
+from app.services.stats_dao import (
+    get_dau,
+    get_dau_approx,
+    get_rolling_unique_users,
+    get_top_events,
+    get_retention,
+    get_retention_matrix,
+    get_unique_users,
+)
+
+# Endpoints return FastJSONResponse built straight from DAO rows, so
+# response_model only documents the shape and is not re-validated.
+router = APIRouter(
+    prefix="/stats", tags=["stats"], dependencies=[Depends(rate_limit_dependency)],
 )
-from app.db.session import AsyncSessionLocal
-from app.services.stats_dao import get_dau, get_top_events, get_retention
 
-router = APIRouter(prefix="/stats", tags=["stats"])
+MAX_MATRIX_COHORTS = 366
 
 
 async def get_db() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
+    async with AnalyticsSessionLocal() as session:
         yield session
 
 
+async def _cached(
+    version: int,
+    key: Tuple,
+    lo: date,
+    hi: date,
+    loader: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Serves loader() through the stats cache; [lo, hi] = days it reads,
+    version = their data version from _conditional.
+    """
+    cache = get_stats_cache()
+    if cache is None:
+        return await loader()
+    return await cache.get_or_load(key, lo, hi, loader, version)
+
+
+async def _timed_out(query: Awaitable[Any]) -> Any:
+    try:
+        return await query
+    except StatsTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _conditional(
+    request: Request,
+    db: AsyncSession,
+    key: Tuple,
+    lo: date,
+    hi: date,
+) -> Tuple[Dict[str, str], Optional[Response], int]:
+    """
+    ETag / Cache-Control headers for the response, plus a 304 to send
+    instead when the client's If-None-Match is still current, and the
+    data version of [lo, hi] for _cached.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    versions = get_version_map()
+    if if_none_match and versions is not None:
+        # this process's copy of the versions, up to
+        # STATS_VERSIONS_MAX_AGE_S old: a current tag costs no query
+        known = await versions.range_version(db, lo, hi)
+        headers = _validators(key, hi, known)
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return headers, Response(status_code=304, headers=headers), known
+
+    # from the same database as the data, so a lagging replica gives the
+    # version matching what it returns
+    version = await range_version(db, lo, hi)
+    headers = _validators(key, hi, version)
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return headers, Response(status_code=304, headers=headers), version
+    return headers, None, version
+
+
+def _validators(key: Tuple, hi: date, version: int) -> Dict[str, str]:
+    settings = get_settings()
+    # a lagging replica's response may already be stale: no proxy caching,
+    # revalidation against the version is one indexed read
+    on_replica = settings.ANALYTICS_DATABASE_URL != settings.DATABASE_URL
+    if closed_range(hi) and not on_replica:
+        cache_control = f"public, max-age={settings.STATS_HTTP_MAX_AGE_S}"
+    else:
+        cache_control = "no-cache"
+    return {"ETag": etag_for(key, hi, version), "Cache-Control": cache_control}
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        t.strip().removeprefix("W/") == opaque for t in if_none_match.split(",")
+    )
+
+
 @router.get("/dau", response_model=List[DATEDAU])
 async def stats_dau(
+    request: Request,
+    from_: date = Query(..., alias="from", description="YYYY-MM-DD inclusive"),
+    to:   date = Query(..., description="YYYY-MM-DD inclusive"),
+    approx: bool = Query(False, description="HyperLogLog estimate (~0.81% error)"),
+    db: AsyncSession = Depends(get_db),
+):
+    if to < from_:
+        raise HTTPException(status_code=422, detail="'to' must be >= 'from'")
+    key = ("dau_approx" if approx else "dau", from_, to)
+    headers, nm, version = await _conditional(request, db, key, from_, to)
+    if nm is not None:
+        return nm
+    if approx:
+        loader = get_dau_approx
+    else:
+        loader = get_dau_parallel if use_parallel(from_, to) else get_dau
+    rows = await _cached(version, key, from_, to, lambda: _timed_out(loader(db, from_, to)))
+    return FastJSONResponse(
+        [{"date": d, "unique_users": n} for d, n in rows], headers=headers,
+    )
+
+
+@router.get("/wau", response_model=List[DATEDAU])
+async def stats_wau(
+    request: Request,
     from_: date = Query(..., alias="from", description="YYYY-MM-DD inclusive"),
     to:   date = Query(..., description="YYYY-MM-DD inclusive"),
     db: AsyncSession = Depends(get_db),
 ):
+    """Approximate users active in the 7 days ending on each date."""
     if to < from_:
         raise HTTPException(status_code=422, detail="'to' must be >= 'from'")
-    rows = await get_dau(db, from_, to)
-    return [{"date": d, "unique_users": n} for d, n in rows]
+    key, lo = ("wau", from_, to), from_ - timedelta(days=6)
+    headers, nm, version = await _conditional(request, db, key, lo, to)
+    if nm is not None:
+        return nm
+    rows = await _cached(version, key, lo, to,
+                         lambda: get_rolling_unique_users(db, from_, to, 7))
+    return FastJSONResponse(
+        [{"date": d, "unique_users": n} for d, n in rows], headers=headers,
+    )
+
+
+@router.get("/mau", response_model=List[DATEDAU])
+async def stats_mau(
+    request: Request,
+    from_: date = Query(..., alias="from", description="YYYY-MM-DD inclusive"),
+    to:   date = Query(..., description="YYYY-MM-DD inclusive"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Approximate users active in the 30 days ending on each date."""
+    if to < from_:
+        raise HTTPException(status_code=422, detail="'to' must be >= 'from'")
+    key, lo = ("mau", from_, to), from_ - timedelta(days=29)
+    headers, nm, version = await _conditional(request, db, key, lo, to)
+    if nm is not None:
+        return nm
+    rows = await _cached(version, key, lo, to,
+                         lambda: get_rolling_unique_users(db, from_, to, 30))
+    return FastJSONResponse(
+        [{"date": d, "unique_users": n} for d, n in rows], headers=headers,
+    )
+
+
+@router.get("/unique-users", response_model=UniqueUsers)
+async def stats_unique_users(
+    request: Request,
+    from_: date = Query(..., alias="from", description="YYYY-MM-DD inclusive"),
+    to:   date = Query(..., description="YYYY-MM-DD inclusive"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Approximate distinct users over the whole range."""
+    if to < from_:
+        raise HTTPException(status_code=422, detail="'to' must be >= 'from'")
+    key = ("unique_users", from_, to)
+    headers, nm, version = await _conditional(request, db, key, from_, to)
+    if nm is not None:
+        return nm
+    n = await _cached(version, key, from_, to, lambda: get_unique_users(db, from_, to))
+    return FastJSONResponse(
+        {"date_from": from_, "date_to": to, "unique_users": n}, headers=headers,
+    )
 
 
 @router.get("/top-events", response_model=List[TopEvent])
 async def stats_top_events(
+    request: Request,
     from_: str = Query(..., alias="from", description="YYYY-MM-DD inclusive"),
     to:   str = Query(..., description="YYYY-MM-DD inclusive"),
     limit: int = Query(
@@ -60,12 +242,21 @@ async def stats_top_events(
     if d_to < d_from:
         raise HTTPException(status_code=422, detail="'to' must be >= 'from'")
 
-    rows = await get_top_events(db, d_from, d_to, limit)
-    return [{"event_type": et, "count": c} for et, c in rows]
+    key = ("top_events", d_from, d_to, limit)
+    headers, nm, version = await _conditional(request, db, key, d_from, d_to)
+    if nm is not None:
+        return nm
+    loader = get_top_events_parallel if use_parallel(d_from, d_to) else get_top_events
+    rows = await _cached(version, key, d_from, d_to,
+                         lambda: _timed_out(loader(db, d_from, d_to, limit)))
+    return FastJSONResponse(
+        [{"event_type": et, "count": c} for et, c in rows], headers=headers,
+    )
 
 
 @router.get("/retention", response_model=RetentionResponse)
 async def stats_retention(
+    request: Request,
     start_date: date = Query(
         ...,
         description="YYYY-MM-DD; cohort = users with first event on this date"
@@ -78,14 +269,64 @@ async def stats_retention(
     ),
     db: AsyncSession = Depends(get_db),
 ):
-    cohort_size, points = await get_retention(db, start_date, windows)
+    # a late event on any earlier day can move users out of the cohort
+    key, hi = ("retention", start_date, windows), start_date + timedelta(days=windows)
+    headers, nm, version = await _conditional(request, db, key, date.min, hi)
+    if nm is not None:
+        return nm
+    cohort_size, points = await _cached(
+        version, key, date.min, hi, lambda: get_retention(db, start_date, windows),
+    )
+    return FastJSONResponse({
+        "cohort_size": cohort_size,
+        "windows": _retention_windows(cohort_size, points),
+    }, headers=headers)
+
+
+@router.get("/retention/matrix", response_model=RetentionMatrixResponse)
+async def stats_retention_matrix(
+    request: Request,
+    from_: date = Query(..., alias="from", description="First cohort date, inclusive"),
+    to:   date = Query(..., description="Last cohort date, inclusive"),
+    windows: int = Query(
+        3,
+        ge=0,
+        le=60,
+        description="Number of daily windows (D0..D{windows})"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    if to < from_:
+        raise HTTPException(status_code=422, detail="'to' must be >= 'from'")
+    if (to - from_).days >= MAX_MATRIX_COHORTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {MAX_MATRIX_COHORTS} cohorts per request"
+        )
+    key, hi = ("retention_matrix", from_, to, windows), to + timedelta(days=windows)
+    headers, nm, version = await _conditional(request, db, key, date.min, hi)
+    if nm is not None:
+        return nm
+    matrix = await _cached(
+        version, key, date.min, hi, lambda: get_retention_matrix(db, from_, to, windows),
+    )
+    return FastJSONResponse({"cohorts": [
+        {
+            "cohort_date": day,
+            "cohort_size": size,
+            "windows": _retention_windows(size, points),
+        }
+        for day, size, points in matrix
+    ]}, headers=headers)
+
 
-    windows_resp: List[RetentionWindow] = []
+def _retention_windows(cohort_size: int, points) -> List[Dict[str, Any]]:
+    windows_resp: List[Dict[str, Any]] = []
     for day, cnt in points:
         rate = (cnt / cohort_size) if cohort_size > 0 else 0.0
-        windows_resp.append(RetentionWindow(
-            day=day,
-            count=cnt,
-            rate=round(rate, 4)
-        ))
-    return RetentionResponse(cohort_size=cohort_size, windows=windows_resp)
+        windows_resp.append({
+            "day": day,
+            "count": cnt,
+            "rate": round(rate, 4),
+        })
+    return windows_resp
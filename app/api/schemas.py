@@ -1,6 +1,6 @@
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, NamedTuple, Optional
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
 from uuid import UUID
 
 
@@ -21,6 +21,20 @@ class EventIn(BaseModel):
 
 
 EventsBatchIn = List[EventIn]
+events_batch_adapter = TypeAdapter(EventsBatchIn)
+
+
+class EventRow(NamedTuple):
+    """
+    Compact, already-validated event for bulk paths (CLI import).
+    Field order matches the COPY column list in events_dao, and
+    properties_json is the JSON text of an object.
+    """
+    event_id: UUID
+    occurred_at: datetime
+    user_id: str
+    event_type: str
+    properties_json: str
 
 
 class IngestResult(BaseModel):
@@ -28,11 +42,29 @@ class IngestResult(BaseModel):
     skipped: int
 
 
+class LineError(BaseModel):
+    line: int  # 1-based line of the NDJSON body
+    error: str
+
+
+class StreamIngestResult(BaseModel):
+    accepted: int
+    skipped: int
+    invalid: int
+    errors: List[LineError]  # first INGEST_STREAM_MAX_ERRORS of `invalid`
+
+
 class DATEDAU(BaseModel):
     date: date
     unique_users: int
 
 
+class UniqueUsers(BaseModel):
+    date_from: date
+    date_to: date
+    unique_users: int
+
+
 class TopEvent(BaseModel):
     event_type: str
     count: int
@@ -49,6 +81,18 @@ class RetentionResponse(BaseModel):
     windows: List[RetentionWindow]
 
 
+class RetentionCohort(BaseModel):
+    cohort_date: date
+    cohort_size: int
+    windows: List[RetentionWindow]
+
+
+class RetentionMatrixResponse(BaseModel):
+    cohorts: List[RetentionCohort]
+
+
 DATEDAU.model_rebuild()
 RetentionWindow.model_rebuild()
 RetentionResponse.model_rebuild()
+RetentionCohort.model_rebuild()
+RetentionMatrixResponse.model_rebuild()
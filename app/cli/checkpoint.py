@@ -0,0 +1,85 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+_HEAD_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class BatchMark:
+    """Position right after the last row of a batch."""
+    seq: int
+    offset: int
+    rows: int
+
+
+@dataclass
+class Checkpoint:
+    identity: str
+    offset: int = 0
+    rows: int = 0
+
+
+def default_checkpoint_path(path: str) -> str:
+    return f"{path}.checkpoint"
+
+
+def file_identity(path: str) -> str:
+    """
+    Size + mtime + hash of the first 64KB. Appending to a file changes it,
+    so a stale checkpoint is never applied to different contents.
+    """
+    st = os.stat(path)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        h.update(f.read(_HEAD_BYTES))
+    return f"{st.st_size}:{st.st_mtime_ns}:{h.hexdigest()[:16]}"
+
+
+def load_checkpoint(cp_path: str) -> Optional[Checkpoint]:
+    try:
+        with open(cp_path, "r", encoding="utf-8") as f:
+            return Checkpoint(**json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(cp_path: str, cp: Checkpoint) -> None:
+    tmp = f"{cp_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(cp), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, cp_path)
+
+
+class CheckpointTracker:
+    """
+    Batches commit out of order when several writers run; the checkpoint
+    only moves over the contiguous prefix of committed batches.
+    """
+
+    def __init__(self, cp_path: str, base: Checkpoint):
+        self.cp_path = cp_path
+        self.committed = base
+        self._next_seq = 0
+        self._done: Dict[int, BatchMark] = {}
+
+    def mark_committed(self, mark: BatchMark) -> bool:
+        self._done[mark.seq] = mark
+        advanced = False
+        while self._next_seq in self._done:
+            m = self._done.pop(self._next_seq)
+            self.committed = Checkpoint(
+                identity=self.committed.identity,
+                offset=m.offset,
+                rows=m.rows,
+            )
+            self._next_seq += 1
+            advanced = True
+        if advanced:
+            save_checkpoint(self.cp_path, self.committed)
+        return advanced
@@ -0,0 +1,230 @@
+"""
+Parquet / Arrow IPC files for the import and export CLIs.
+
+Files have the CSV columns (properties_json as JSON text; a struct or map
+`properties` column is accepted too). Import reads one row group (Parquet)
+or record batch (IPC) at a time, so memory is bounded by their size, and
+validates column-wise: one pass per column instead of a dict per row, and
+properties_json is checked as JSON objects in a single Arrow JSON parse.
+Requires pyarrow, imported only when such a file is used.
+"""
+from __future__ import annotations
+import io
+import json
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+import structlog
+
+from app.api.schemas import EventRow
+from app.cli.checkpoint import BatchMark
+from app.cli.import_events import (
+    COLUMNAR_FORMATS,
+    REQUIRED_COLUMNS,
+    _parse_dt_iso8601,
+    _parse_properties_json,
+)
+
+log = structlog.get_logger()
+
+SCHEMA = pa.schema([
+    ("event_id", pa.string()),
+    ("occurred_at", pa.timestamp("us", tz="UTC")),
+    ("user_id", pa.string()),
+    ("event_type", pa.string()),
+    ("properties_json", pa.string()),
+])
+
+# every line a JSON object, no fields materialised
+_OBJECTS_ONLY = pa_json.ParseOptions(
+    explicit_schema=pa.schema([]), unexpected_field_behavior="ignore",
+)
+
+
+# --- import -----------------------------------------------------------------
+
+def iter_record_batches(
+    path: str,
+    fmt: str,
+    batch_size: int,
+    start_rows: int = 0,
+) -> Iterator[Tuple[pa.RecordBatch, BatchMark]]:
+    """
+    Batches of at most batch_size rows with their checkpoint marks. The
+    mark's offset is the row index, so start_rows resumes by skipping
+    whole row groups / record batches without reading them.
+    """
+    seq = 0
+    rows_done = start_rows
+    for group in _iter_groups(path, fmt, start_rows):
+        for batch in group.to_batches(max_chunksize=batch_size):
+            rows_done += batch.num_rows
+            yield batch, BatchMark(seq, rows_done, rows_done)
+            seq += 1
+
+
+def _iter_groups(path: str, fmt: str, skip: int) -> Iterator[pa.Table]:
+    if fmt == "parquet":
+        pf = pq.ParquetFile(path)
+        columns = _columns(pf.schema_arrow)
+        for i in range(pf.num_row_groups):
+            n = pf.metadata.row_group(i).num_rows
+            if skip >= n:
+                skip -= n
+                continue
+            yield pf.read_row_group(i, columns=columns).select(columns).slice(skip)
+            skip = 0
+        return
+
+    with pa.memory_map(path) as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            batches = iter(pa.ipc.open_stream(source))
+        columns = None
+        for batch in batches:
+            columns = columns or _columns(batch.schema)
+            if skip >= batch.num_rows:
+                skip -= batch.num_rows
+                continue
+            yield pa.Table.from_batches([batch.select(columns).slice(skip)])
+            skip = 0
+
+
+def _columns(schema: pa.Schema) -> List[str]:
+    names = set(schema.names)
+    props = "properties_json" if "properties_json" in names else "properties"
+    missing = (REQUIRED_COLUMNS - {"properties_json"} | {props}) - names
+    if missing:
+        raise RuntimeError(f"File is missing required columns: {sorted(missing)}")
+    return ["event_id", "occurred_at", "user_id", "event_type", props]
+
+
+def parse_record_batch(batch: pa.RecordBatch) -> Tuple[List[EventRow], int]:
+    """
+    Columnar counterpart of import_events._parse_batch, with the same
+    accept/reject rules. Runs inside the parse worker processes.
+    """
+    columns = [
+        _event_ids(batch.column(0)),
+        _timestamps(batch.column(1)),
+        _non_empty(batch.column(2)),
+        _non_empty(batch.column(3)),
+        _properties(batch.column(4)),
+    ]
+    bad = sorted({i for c in columns for i, v in enumerate(c) if v is None})
+    for i in bad:
+        log.warning("import_row_skipped_invalid",
+                    error="invalid " + ", ".join(
+                        batch.schema.names[c] for c in range(5) if columns[c][i] is None
+                    ),
+                    row=batch.slice(i, 1).to_pylist()[0])
+    rows = zip(*columns)
+    if bad:
+        skip = set(bad)
+        rows = (r for i, r in enumerate(rows) if i not in skip)
+    return list(map(EventRow._make, rows)), len(bad)
+
+
+def _each(values: Sequence[Any], fn) -> List[Any]:
+    out = []
+    for v in values:
+        try:
+            out.append(None if v is None else fn(v))
+        except (ValueError, TypeError, AttributeError):
+            out.append(None)
+    return out
+
+
+def _event_ids(col: pa.Array) -> List[Optional[UUID]]:
+    if pa.types.is_fixed_size_binary(col.type) and col.type.byte_width == 16:
+        return _each(col.to_pylist(), lambda b: UUID(bytes=b))
+    return _each(col.cast(pa.string()).to_pylist(), UUID)
+
+
+def _timestamps(col: pa.Array) -> list:
+    if pa.types.is_timestamp(col.type):
+        # Values are UTC instants (naive ones are taken as UTC, like a
+        # trailing "Z"). ISO text + fromisoformat is several times faster
+        # than to_pylist() on a tz-aware column.
+        utc = pc.cast(col, pa.timestamp("us"), safe=False).cast(pa.string())
+        iso = pc.binary_join_element_wise(utc, "+00:00", "")
+        return _each(iso.to_pylist(), datetime.fromisoformat)
+    return _each(col.cast(pa.string()).to_pylist(), _parse_dt_iso8601)
+
+
+def _non_empty(col: pa.Array) -> List[Optional[str]]:
+    trimmed = pc.utf8_trim_whitespace(col.cast(pa.string()))
+    empty = pc.equal(pc.utf8_length(trimmed), 0)
+    return pc.if_else(empty, pa.scalar(None, pa.string()), trimmed).to_pylist()
+
+
+def _properties(col: pa.Array) -> List[str]:
+    if pa.types.is_struct(col.type):
+        return [json.dumps(v) if v is not None else "{}" for v in col.to_pylist()]
+    if pa.types.is_map(col.type):
+        return [json.dumps(dict(v)) if v is not None else "{}" for v in col.to_pylist()]
+
+    col = col.cast(pa.string())
+    blank = pc.fill_null(pc.equal(pc.utf8_length(pc.utf8_trim_whitespace(col)), 0), True)
+    filled = pc.if_else(blank, "{}", col)
+    values = filled.to_pylist()
+    if _all_json_objects(filled, values):
+        return values
+    # some value is not an object: apply the CSV rules row by row
+    return [_parse_properties_json(v) for v in col.fill_null("").to_pylist()]
+
+
+def _all_json_objects(col: pa.Array, values: List[str]) -> bool:
+    if not values:
+        return True
+    if pc.any(pc.match_substring_regex(col, r"[\r\n]")).as_py():
+        return False  # the line-based parse below would split the value
+    data = "\n".join(values).encode()
+    try:
+        parsed = pa_json.read_json(io.BytesIO(data), parse_options=_OBJECTS_ONLY)
+    except pa.ArrowInvalid:
+        return False
+    # "{}{}" on one line parses as two rows, a blank line as none
+    return parsed.num_rows == len(values)
+
+
+# --- export -----------------------------------------------------------------
+
+class ColumnarWriter:
+    """Writes export chunks, one row group / record batch per chunk."""
+
+    def __init__(self, path: str, fmt: str):
+        self.fmt = fmt
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, SCHEMA, compression="zstd")
+        elif fmt == "arrow":
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, SCHEMA)
+        else:
+            raise ValueError(
+                f"Unknown columnar format {fmt!r}, expected one of {COLUMNAR_FORMATS}"
+            )
+
+    def write(self, rows: Sequence) -> None:
+        event_ids, occurred, users, types, props = zip(*rows) if rows else ([],) * 5
+        batch = pa.record_batch([
+            pa.array([str(e) for e in event_ids], pa.string()),
+            pa.array(occurred, SCHEMA.field("occurred_at").type),
+            pa.array(users, pa.string()),
+            pa.array(types, pa.string()),
+            pa.array(props, pa.string()),
+        ], schema=SCHEMA)
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+        if self.fmt == "arrow":
+            self._sink.close()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import gzip
+import sys
+import time
+from datetime import date
+from typing import Optional
+
+import structlog
+
+from app.cli.import_events import COLUMNAR_FORMATS, columnar_format
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.services.export_dao import EXPORT_FORMATS, iter_event_rows, iter_export
+
+log = structlog.get_logger()
+
+
+def _guess_format(path: str) -> str:
+    name = path.removesuffix(".gz")
+    return columnar_format(name) or ("csv" if name.endswith(".csv") else "ndjson")
+
+
+def _open(path: str, compress: bool):
+    if path == "-":
+        # closing the gzip wrapper leaves stdout open
+        if compress:
+            return gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb")
+        return sys.stdout.buffer
+    if compress:
+        return gzip.open(path, "wb")
+    return open(path, "wb")
+
+
+async def _run(
+    path: str,
+    date_from: date,
+    date_to: date,
+    event_type: Optional[str] = None,
+    fmt: Optional[str] = None,
+    compress: Optional[bool] = None,
+    chunk_rows: Optional[int] = None,
+) -> int:
+    fmt = fmt or _guess_format(path)
+    if compress is None:
+        compress = path.endswith(".gz")
+    chunk_rows = chunk_rows or get_settings().EXPORT_CHUNK_ROWS
+    started = time.perf_counter()
+    log.info("export_start", path=path, format=fmt, gzip=compress,
+             date_from=str(date_from), date_to=str(date_to), event_type=event_type)
+
+    if fmt in COLUMNAR_FORMATS:
+        rows = await _export_columnar(path, fmt, date_from, date_to, event_type, chunk_rows)
+    else:
+        rows = await _export_text(path, fmt, compress, date_from, date_to, event_type, chunk_rows)
+
+    elapsed = time.perf_counter() - started
+    log.info("export_complete", path=path, rows=rows,
+             rows_per_s=round(rows / elapsed, 1) if elapsed > 0 else 0.0)
+    return rows
+
+
+async def _export_text(path, fmt, compress, date_from, date_to, event_type, chunk_rows) -> int:
+    rows = 0
+    out = _open(path, compress)
+    try:
+        async with AsyncSessionLocal() as session:
+            async for chunk, n in iter_export(
+                session, date_from, date_to, event_type, fmt, chunk_rows=chunk_rows,
+            ):
+                out.write(chunk.encode())
+                rows += n
+                log.info("export_chunk_done", rows=n, total_rows=rows)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        if path == "-":
+            sys.stdout.buffer.flush()
+    return rows
+
+
+async def _export_columnar(path, fmt, date_from, date_to, event_type, chunk_rows) -> int:
+    from app.cli.columnar import ColumnarWriter  # pyarrow is only needed here
+
+    rows = 0
+    writer = ColumnarWriter(path, fmt)
+    try:
+        async with AsyncSessionLocal() as session:
+            async for chunk in iter_event_rows(
+                session, date_from, date_to, event_type, chunk_rows=chunk_rows,
+            ):
+                writer.write(chunk)
+                rows += len(chunk)
+                log.info("export_chunk_done", rows=len(chunk), total_rows=rows)
+    finally:
+        writer.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export events to NDJSON, CSV, Parquet or Arrow IPC "
+                    "(all but NDJSON re-import with app.cli.import_events)."
+    )
+    parser.add_argument("path", help="Output file, '-' for stdout; a .gz suffix implies --gzip")
+    parser.add_argument("--from", dest="date_from", required=True, type=date.fromisoformat,
+                        help="YYYY-MM-DD inclusive")
+    parser.add_argument("--to", dest="date_to", required=True, type=date.fromisoformat,
+                        help="YYYY-MM-DD inclusive")
+    parser.add_argument("--event-type", default=None, help="Only this event type")
+    parser.add_argument("--format", choices=EXPORT_FORMATS + COLUMNAR_FORMATS, default=None,
+                        help="Default: from the file extension, else ndjson")
+    parser.add_argument("--gzip", action="store_true", default=None,
+                        help="Compress the output")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="Rows per cursor fetch (default EXPORT_CHUNK_ROWS)")
+    args = parser.parse_args()
+    if args.date_to < args.date_from:
+        parser.error("--to must be >= --from")
+    fmt = args.format or _guess_format(args.path)
+    if fmt in COLUMNAR_FORMATS and (args.gzip or args.path == "-"):
+        parser.error(f"{fmt} output is compressed internally and needs a file path")
+
+    # stdout may carry the export itself
+    structlog.configure(logger_factory=structlog.PrintLoggerFactory(sys.stderr))
+    asyncio.run(_run(
+        args.path,
+        args.date_from,
+        args.date_to,
+        event_type=args.event_type,
+        fmt=fmt,
+        compress=args.gzip,
+        chunk_rows=args.chunk_rows,
+    ))
+
+
+if __name__ == "__main__":
+    main()
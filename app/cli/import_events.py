@@ -1,17 +1,29 @@
 from __future__ import annotations
 import csv
 import json
+import time
 import argparse
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Dict, Iterator, Optional, Tuple
 from uuid import UUID
 
 from datetime import datetime
 import asyncio
 import structlog
 
+from app.cli.checkpoint import (
+    BatchMark,
+    Checkpoint,
+    CheckpointTracker,
+    default_checkpoint_path,
+    file_identity,
+    load_checkpoint,
+)
 from app.core.config import get_settings
 from app.db.session import AsyncSessionLocal
-from app.api.schemas import EventIn
+from app.api.schemas import EventRow
 from app.services.events_dao import insert_events_idempotent
 
 log = structlog.get_logger()
@@ -25,50 +37,270 @@ def _parse_dt_iso8601(value: str) -> datetime:
     return datetime.fromisoformat(v)
 
 
-def _parse_properties(value: str) -> Dict[str, Any]:
+def _parse_properties_json(value: str) -> str:
+    """
+    Returns JSON text of an object. Valid objects are passed through as-is,
+    so the common case costs one json.loads and no re-encoding.
+    """
     if not value or value.strip() == "":
-        return {}
+        return "{}"
     try:
         obj = json.loads(value)
-        if isinstance(obj, dict):
-            return obj
-
-        return {"_value": obj}
     except json.JSONDecodeError:
-        return {"_raw": value}
+        return json.dumps({"_raw": value})
+    if isinstance(obj, dict):
+        return value
+    return json.dumps({"_value": obj})
+
+
+def _parse_row(r: Dict[str, str]) -> EventRow:
+    # Same accept/reject rules as EventIn, without building a model.
+    user_id = r["user_id"].strip()
+    if not user_id:
+        raise ValueError("user_id: must be non-empty")
+    event_type = r["event_type"].strip()
+    if not event_type:
+        raise ValueError("event_type: must be non-empty")
+    return EventRow(
+        UUID(r["event_id"]),
+        _parse_dt_iso8601(r["occurred_at"]),
+        user_id,
+        event_type,
+        _parse_properties_json(r.get("properties_json", "")),
+    )
+
+
+REQUIRED_COLUMNS = {
+    "event_id",
+    "occurred_at",
+    "user_id",
+    "event_type",
+    "properties_json"
+}
+
+# read through app.cli.columnar (pyarrow) instead of the csv module
+COLUMNAR_SUFFIXES = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".ipc": "arrow",
+    ".feather": "arrow",
+}
+COLUMNAR_FORMATS = ("parquet", "arrow")
 
 
-async def _process_batch(rows: List[Dict[str, str]]) -> tuple[int, int]:
+def columnar_format(path: str) -> Optional[str]:
+    """'parquet' / 'arrow' by file extension, None for CSV."""
+    for suffix, fmt in COLUMNAR_SUFFIXES.items():
+        if path.endswith(suffix):
+            return fmt
+    return None
 
-    events: List[EventIn] = []
+
+def _parse_batch(rows: List[Dict[str, str]]) -> Tuple[List[EventRow], int]:
+    """Validate raw CSV rows. Runs inside the parse worker processes."""
+    events: List[EventRow] = []
+    invalid = 0
     for r in rows:
         try:
-            e = EventIn(
-                event_id=UUID(r["event_id"]),
-                occurred_at=_parse_dt_iso8601(r["occurred_at"]),
-                user_id=r["user_id"].strip(),
-                event_type=r["event_type"].strip(),
-                properties=_parse_properties(r.get("properties_json", "")),
-            )
-            events.append(e)
+            events.append(_parse_row(r))
         except Exception as ex:
+            invalid += 1
             log.warning("import_row_skipped_invalid", error=str(ex), row=r)
+    return events, invalid
+
 
+async def _write_batch(events: List[EventRow], invalid: int) -> tuple[int, int]:
     if not events:
-        return (0, len(rows))
+        return (0, invalid)
 
     async with AsyncSessionLocal() as session:
         accepted, skipped = await insert_events_idempotent(session, events)
         await session.commit()
-        return (accepted, skipped + (len(rows) - len(events)))
+        return (accepted, skipped + invalid)
+
+
+class _OffsetLines:
+    """
+    Line iterator over a binary file that knows the byte offset of the
+    last line handed to csv, so committed progress can be seeked back to.
+    """
+
+    def __init__(self, fb):
+        self.fb = fb
+        self.offset = fb.tell()
+
+    def seek(self, offset: int) -> None:
+        self.fb.seek(offset)
+        self.offset = offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.fb.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode("utf-8")
+
+
+def _open_reader(lines: _OffsetLines) -> csv.DictReader:
+    reader = csv.DictReader(lines)
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+    if missing:
+        raise RuntimeError(
+            f"CSV is missing required columns: {sorted(missing)}"
+        )
+    return reader
+
+
+def _iter_batches(
+    reader: csv.DictReader,
+    lines: _OffsetLines,
+    batch_size: int,
+    start_rows: int = 0,
+) -> Iterator[Tuple[List[Dict[str, str]], BatchMark]]:
+    seq = 0
+    rows_done = start_rows
+    buf: List[Dict[str, str]] = []
+    for row in reader:
+        buf.append(row)
+        if len(buf) >= batch_size:
+            rows_done += len(buf)
+            yield buf, BatchMark(seq, lines.offset, rows_done)
+            seq += 1
+            buf = []
+    if buf:
+        rows_done += len(buf)
+        yield buf, BatchMark(seq, lines.offset, rows_done)
+
+
+@dataclass
+class _Progress:
+    started: float = field(default_factory=time.perf_counter)
+    total_read: int = 0
+    total_written: int = 0
+    total_accepted: int = 0
+    total_skipped: int = 0
+
+    def rows_per_s(self, rows: int) -> float:
+        elapsed = time.perf_counter() - self.started
+        return round(rows / elapsed, 1) if elapsed > 0 else 0.0
+
 
+def _open_batches(
+    stack: ExitStack,
+    path: str,
+    batch_size: int,
+    base: Checkpoint,
+) -> Tuple[Iterator[Tuple[Any, BatchMark]], Callable[[Any], Tuple[List[EventRow], int]]]:
+    """Batches of raw rows from the file, and the function that parses one."""
+    fmt = columnar_format(path)
+    if fmt is not None:
+        from app.cli import columnar  # pyarrow is only needed for these files
 
-async def _run(path: str, batch_size: int, dry_run: bool) -> None:
+        batches = columnar.iter_record_batches(path, fmt, batch_size, start_rows=base.rows)
+        return batches, columnar.parse_record_batch
+
+    lines = _OffsetLines(stack.enter_context(open(path, "rb")))
+    reader = _open_reader(lines)
+    if base.offset:
+        lines.seek(base.offset)
+    return _iter_batches(reader, lines, batch_size, start_rows=base.rows), _parse_batch
+
+
+async def _read_stage(
+    batches: Iterator[Tuple[Any, BatchMark]],
+    parse: Callable[[Any], Tuple[List[EventRow], int]],
+    parse_q: asyncio.Queue,
+    pool: ProcessPoolExecutor | None,
+    progress: _Progress,
+) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await asyncio.to_thread(next, batches, None)
+        if item is None:
+            break
+        rows, mark = item
+        progress.total_read += len(rows)
+        if pool is None:
+            fut = loop.create_future()
+            fut.set_result(parse(rows))
+        else:
+            fut = loop.run_in_executor(pool, parse, rows)
+        # bounded queue: the reader stalls once enough batches are in flight
+        await parse_q.put((len(rows), mark, fut))
+    await parse_q.put(None)
+
+
+async def _parse_stage(
+    parse_q: asyncio.Queue,
+    write_q: asyncio.Queue,
+    writers: int,
+) -> None:
+    while (item := await parse_q.get()) is not None:
+        read, mark, fut = item
+        events, invalid = await fut
+        await write_q.put((read, mark, events, invalid))
+    for _ in range(writers):
+        await write_q.put(None)
+
+
+async def _write_stage(
+    write_q: asyncio.Queue,
+    progress: _Progress,
+    tracker: CheckpointTracker,
+) -> None:
+    while (item := await write_q.get()) is not None:
+        read, mark, events, invalid = item
+        a, s = await _write_batch(events, invalid)
+        tracker.mark_committed(mark)
+        progress.total_written += read
+        progress.total_accepted += a
+        progress.total_skipped += s
+        log.info("import_batch_done",
+                 read=read,
+                 accepted=a,
+                 skipped=s,
+                 total_accepted=progress.total_accepted,
+                 total_skipped=progress.total_skipped,
+                 total_read=progress.total_read,
+                 rows_per_s=progress.rows_per_s(progress.total_written)
+                 )
+
+
+async def _run(
+    path: str,
+    batch_size: int,
+    dry_run: bool,
+    workers: int = 1,
+    writers: int = 1,
+    resume: bool = False,
+    checkpoint_path: str | None = None,
+) -> _Progress:
     settings = get_settings()
     bs = min(batch_size, settings.MAX_BATCH_SIZE)
-    total_read = total_accepted = total_skipped = 0
+    progress = _Progress()
+    cp_path = checkpoint_path or default_checkpoint_path(path)
+    base = Checkpoint(identity=file_identity(path))
+
+    if resume:
+        saved = load_checkpoint(cp_path)
+        if saved is None:
+            log.info("import_resume_no_checkpoint", checkpoint=cp_path)
+        elif saved.identity != base.identity:
+            log.warning(
+                "import_resume_checkpoint_mismatch",
+                checkpoint=cp_path,
+                note="File changed since the checkpoint; starting over"
+            )
+        else:
+            base = saved
 
-    log.info("import_start", path=path, batch_size=bs, dry_run=dry_run)
+    log.info("import_start", path=path, batch_size=bs, dry_run=dry_run,
+             workers=workers, writers=writers,
+             resume_offset=base.offset, resume_rows=base.rows)
 
     if dry_run:
         log.info(
@@ -76,80 +308,53 @@ async def _run(path: str, batch_size: int, dry_run: bool) -> None:
             note="Файл буде прочитано, але в БД нічого не пишемо"
         )
 
-    with open(path, "r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        required = {
-            "event_id",
-            "occurred_at",
-            "user_id",
-            "event_type",
-            "properties_json"
-        }
-        missing = required - set(reader.fieldnames or [])
-        if missing:
-            raise RuntimeError(
-                f"CSV is missing required columns: {sorted(missing)}"
-            )
+    with ExitStack() as stack:
+        batches, parse = _open_batches(stack, path, bs, base)
 
-        buf: List[Dict[str, str]] = []
-        for row in reader:
-            buf.append(row)
-            if len(buf) >= bs:
-                total_read += len(buf)
-                if dry_run:
-                    log.info(
-                        "import_batch_dry",
-                        read=len(buf),
-                        total_read=total_read
-                    )
-                else:
-                    a, s = await _process_batch(buf)
-                    total_accepted += a
-                    total_skipped += s
-                    log.info("import_batch_done",
-                             read=len(buf),
-                             accepted=a,
-                             skipped=s,
-                             total_accepted=total_accepted,
-                             total_skipped=total_skipped,
-                             total_read=total_read
-                             )
-                buf = []
-
-        if buf:
-            total_read += len(buf)
-            if dry_run:
+        if dry_run:
+            for buf, _ in batches:
+                progress.total_read += len(buf)
                 log.info(
                     "import_batch_dry",
                     read=len(buf),
-                    total_read=total_read
+                    total_read=progress.total_read,
+                    rows_per_s=progress.rows_per_s(progress.total_read)
                 )
-            else:
-                a, s = await _process_batch(buf)
-                total_accepted += a
-                total_skipped += s
-                log.info("import_batch_done",
-                         read=len(buf),
-                         accepted=a,
-                         skipped=s,
-                         total_accepted=total_accepted,
-                         total_skipped=total_skipped,
-                         total_read=total_read
-                         )
+        else:
+            parse_q: asyncio.Queue = asyncio.Queue(maxsize=max(workers, 1) * 2)
+            write_q: asyncio.Queue = asyncio.Queue(maxsize=writers * 2)
+            pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+            tracker = CheckpointTracker(cp_path, base)
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(_read_stage(batches, parse, parse_q, pool, progress))
+                    tg.create_task(_parse_stage(parse_q, write_q, writers))
+                    for _ in range(writers):
+                        tg.create_task(_write_stage(write_q, progress, tracker))
+            except* Exception as eg:
+                raise eg.exceptions[0]
+            finally:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
 
     log.info(
         "import_complete",
-        total_read=total_read,
-        total_accepted=total_accepted,
-        total_skipped=total_skipped
+        total_read=progress.total_read,
+        total_accepted=progress.total_accepted,
+        total_skipped=progress.total_skipped,
+        rows_per_s=progress.rows_per_s(progress.total_read)
     )
+    return progress
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Import events from CSV (idempotent)."
+        description="Import events from CSV, Parquet or Arrow IPC (idempotent)."
+    )
+    parser.add_argument(
+        "path",
+        help="Path to CSV file; .parquet/.pq and .arrow/.ipc/.feather are read column-wise"
     )
-    parser.add_argument("path", help="Path to CSV file")
     parser.add_argument(
         "--batch-size",
         type=int,
@@ -161,9 +366,41 @@ def main():
         action="store_true",
         help="Read file but do not write to DB"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse/validate worker processes (0 = parse in the main process)"
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=1,
+        help="Concurrent DB writer sessions"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip rows already committed according to the checkpoint"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Checkpoint file (default: <path>.checkpoint)"
+    )
     args = parser.parse_args()
+    if args.workers < 0 or args.writers < 1:
+        parser.error("--workers must be >= 0 and --writers >= 1")
 
-    asyncio.run(_run(args.path, args.batch_size, args.dry_run))
+    asyncio.run(_run(
+        args.path,
+        args.batch_size,
+        args.dry_run,
+        workers=args.workers,
+        writers=args.writers,
+        resume=args.resume,
+        checkpoint_path=args.checkpoint,
+    ))
 
 
 if __name__ == "__main__":
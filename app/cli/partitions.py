@@ -0,0 +1,84 @@
+from __future__ import annotations
+import argparse
+import asyncio
+from datetime import date, datetime, timezone
+
+import structlog
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.services.partitions_dao import (
+    PARTITION_INTERVALS,
+    detach_partitions,
+    ensure_partitions,
+    list_partitions,
+    partition_for,
+)
+
+log = structlog.get_logger()
+
+
+async def _ensure(d_from: date, ahead: int, interval: str) -> None:
+    d_to = d_from
+    for _ in range(ahead):
+        d_to = partition_for(d_to, interval)[2]
+    async with AsyncSessionLocal() as session:
+        created = await ensure_partitions(session, d_from, d_to, interval)
+        await session.commit()
+    for name in created:
+        log.info("partition_created", partition=name)
+    log.info("partitions_ensure_complete", created=len(created),
+             date_from=str(d_from), date_to=str(d_to), interval=interval)
+
+
+async def _detach(before: date, drop: bool) -> None:
+    async with AsyncSessionLocal() as session:
+        done = await detach_partitions(session, before, drop=drop)
+        await session.commit()
+    for name in done:
+        log.info("partition_dropped" if drop else "partition_detached", partition=name)
+    log.info("partitions_detach_complete", count=len(done), before=str(before))
+
+
+async def _list() -> None:
+    async with AsyncSessionLocal() as session:
+        parts = await list_partitions(session)
+    for name, start, end in parts:
+        print(f"{name}\t{start}\t{end}")
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        description="Maintain the occurred_at range partitions of events."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="Print partitions with their [start, end) bounds")
+
+    p = sub.add_parser("ensure", help="Create partitions up to --ahead periods from --from")
+    p.add_argument("--from", dest="date_from", type=date.fromisoformat,
+                   default=datetime.now(timezone.utc).date(),
+                   help="YYYY-MM-DD, default today (UTC)")
+    p.add_argument("--ahead", type=int, default=settings.EVENTS_PARTITIONS_AHEAD,
+                   help="Future periods to create")
+    p.add_argument("--interval", choices=PARTITION_INTERVALS,
+                   default=settings.EVENTS_PARTITION_INTERVAL)
+
+    p = sub.add_parser("detach", help="Detach partitions ending on or before --before")
+    p.add_argument("--before", required=True, type=date.fromisoformat,
+                   help="YYYY-MM-DD exclusive upper bound of detached data")
+    p.add_argument("--drop", action="store_true",
+                   help="Drop the detached tables instead of keeping them")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        asyncio.run(_list())
+    elif args.command == "ensure":
+        asyncio.run(_ensure(args.date_from, args.ahead, args.interval))
+    else:
+        asyncio.run(_detach(args.before, args.drop))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import sys
+from datetime import date, timedelta
+
+import structlog
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.services.rollup_folder import RollupFolder
+from app.services.rollups_dao import check_rollups, rebuild_rollups
+
+log = structlog.get_logger()
+
+
+async def _rebuild(d_from: date, d_to: date, chunk_days: int) -> None:
+    log.info("rollups_rebuild_start", date_from=str(d_from), date_to=str(d_to))
+    day = d_from
+    while day <= d_to:
+        chunk_to = min(day + timedelta(days=chunk_days - 1), d_to)
+        # one transaction per chunk keeps the rollup table lock short
+        async with AsyncSessionLocal() as session:
+            await rebuild_rollups(session, day, chunk_to)
+            await session.commit()
+        log.info("rollups_rebuild_chunk", date_from=str(day), date_to=str(chunk_to))
+        day = chunk_to + timedelta(days=1)
+    log.info("rollups_rebuild_complete")
+
+
+async def _check(d_from: date, d_to: date) -> int:
+    async with AsyncSessionLocal() as session:
+        mismatches = await check_rollups(session, d_from, d_to)
+    for kind, day, key, raw, rollup in mismatches:
+        log.warning("rollups_mismatch", kind=kind, day=str(day), key=key,
+                    raw=raw, rollup=rollup)
+    log.info("rollups_check_complete", mismatches=len(mismatches))
+    return 1 if mismatches else 0
+
+
+async def _fold() -> None:
+    folder = RollupFolder(interval=0, batch=get_settings().ROLLUPS_FOLD_BATCH)
+    total = 0
+    while True:
+        moved = await folder.fold_once()
+        total += moved
+        if moved < folder.batch:
+            break
+    log.info("rollups_fold_complete", deltas=total)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild, verify or fold the daily DAU / event-count rollups."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_ in (
+        ("rebuild", "Recompute rollups from raw events and mark days covered"),
+        ("check", "Compare rollups with raw events; exit 1 on mismatch"),
+    ):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("--from", dest="date_from", required=True,
+                       type=date.fromisoformat, help="YYYY-MM-DD inclusive")
+        p.add_argument("--to", dest="date_to", required=True,
+                       type=date.fromisoformat, help="YYYY-MM-DD inclusive")
+        if name == "rebuild":
+            p.add_argument("--chunk-days", type=int, default=7,
+                           help="Days per rebuild transaction")
+    sub.add_parser("fold", help="Fold all pending ingest deltas into the rollup tables")
+
+    args = parser.parse_args()
+    if args.command == "fold":
+        asyncio.run(_fold())
+        return
+    if args.date_to < args.date_from:
+        parser.error("--to must be >= --from")
+
+    if args.command == "rebuild":
+        asyncio.run(_rebuild(args.date_from, args.date_to, args.chunk_days))
+    else:
+        sys.exit(asyncio.run(_check(args.date_from, args.date_to)))
+
+
+if __name__ == "__main__":
+    main()
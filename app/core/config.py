@@ -8,11 +8,94 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "events"
     POSTGRES_PASSWORD: str = "change_me"
 
+    # Optional read replica for /stats and /events/export (same db/user);
+    # empty host = the primary above
+    POSTGRES_REPLICA_HOST: str = ""
+    POSTGRES_REPLICA_PORT: int = 5432
+
+    # Connection pools: "ingest" for writes (POST /events, CLIs, drainers),
+    # "analytics" for /stats and exports, so slow reads cannot starve ingest
+    DB_INGEST_POOL_SIZE: int = 10
+    DB_INGEST_MAX_OVERFLOW: int = 10
+    DB_INGEST_POOL_TIMEOUT_S: float = 5.0
+    DB_ANALYTICS_POOL_SIZE: int = 5
+    DB_ANALYTICS_MAX_OVERFLOW: int = 5
+    DB_ANALYTICS_POOL_TIMEOUT_S: float = 30.0
+
     APP_PORT: int = 8000
     RATE_LIMIT_RPS: int = 20
     MAX_BATCH_SIZE: int = 5000
     RATE_LIMIT_BURST: int = 40
 
+    # Per-client token buckets: /stats/* in requests (RATE_LIMIT_RPS/BURST),
+    # /events and /events/stream in events; at most MAX_KEYS clients tracked
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_INGEST_EPS: int = 5000
+    RATE_LIMIT_INGEST_BURST: int = 20000
+    RATE_LIMIT_MAX_KEYS: int = 250_000
+    # "memory" — buckets per worker process, "shared" — one mmap table in
+    # RATE_LIMIT_SHARED_DIR for all workers on the host
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SHARED_DIR: str = "/dev/shm/events-analytics"
+
+    # "values" — multi-row INSERT ... VALUES, "copy" — binary COPY via staging table
+    INGEST_ENGINE: str = "values"
+
+    # Coalesce concurrent POST /events into shared INSERT + COMMIT
+    INGEST_BATCHER_ENABLED: bool = False
+    INGEST_BATCHER_MAX_EVENTS: int = 5000
+    INGEST_BATCHER_MAX_DELAY_MS: int = 10
+    INGEST_BATCHER_MAX_PENDING_EVENTS: int = 50000
+
+    # Acknowledge POST /events once the batch is fsync'ed to a local spool
+    INGEST_SPOOL_ENABLED: bool = False
+    INGEST_SPOOL_DIR: str = "/var/lib/events-analytics/spool"
+    INGEST_SPOOL_SEGMENT_BYTES: int = 64 * 1024 * 1024
+    INGEST_SPOOL_FSYNC_INTERVAL_MS: int = 2
+    INGEST_SPOOL_MAX_BYTES: int = 1024 * 1024 * 1024
+    INGEST_SPOOL_DRAIN_BATCH: int = 5000
+
+    # POST /events/stream: events per INSERT + COMMIT, longest accepted line
+    # and how many per-line errors the response lists (the count is exact)
+    INGEST_STREAM_BATCH: int = 1000
+    INGEST_STREAM_MAX_LINE_BYTES: int = 64 * 1024
+    INGEST_STREAM_MAX_ERRORS: int = 100
+
+    # Rows per server-side cursor fetch for GET /events/export and the CLI
+    EXPORT_CHUNK_ROWS: int = 5000
+
+    # Maintain daily_event_counts / daily_active_users on ingest and serve
+    # /stats/dau and /stats/top-events from them when the range is covered
+    ROLLUPS_ENABLED: bool = True
+    # Ingest appends rollup deltas; the API folds them into the rollup tables
+    # every FOLD_INTERVAL_S (0 = not in this process), FOLD_BATCH at a time
+    ROLLUPS_FOLD_INTERVAL_S: float = 5.0
+    ROLLUPS_FOLD_BATCH: int = 50000
+
+    # Range partitioning of events: "month" or "day" partitions, and how many
+    # future periods `app.cli.partitions ensure` (and the migration) create
+    EVENTS_PARTITION_INTERVAL: str = "month"
+    EVENTS_PARTITIONS_AHEAD: int = 3
+
+    # Split raw-event /stats/dau and /stats/top-events ranges longer than
+    # CHUNK_DAYS into chunks run on up to DEGREE analytics sessions at once;
+    # the timeout applies to each chunk's statement
+    STATS_PARALLEL_ENABLED: bool = False
+    STATS_PARALLEL_CHUNK_DAYS: int = 31
+    STATS_PARALLEL_DEGREE: int = 4
+    STATS_STATEMENT_TIMEOUT_MS: int = 30000
+
+    # In-process LRU for /stats results; closed (past-only) ranges live longer
+    STATS_CACHE_ENABLED: bool = True
+    STATS_CACHE_MAX_ENTRIES: int = 1024
+    STATS_CACHE_TTL_S: float = 5.0
+    STATS_CACHE_CLOSED_TTL_S: float = 3600.0
+    # Cache-Control max-age of /stats responses covering only past days
+    STATS_HTTP_MAX_AGE_S: int = 300
+    # If-None-Match is first checked against this process's copy of
+    # day_versions, reloaded when older than this (0 = one query per request)
+    STATS_VERSIONS_MAX_AGE_S: float = 1.0
+
     @property
     def DATABASE_URL(self) -> str:
         return (
@@ -20,6 +103,15 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def ANALYTICS_DATABASE_URL(self) -> str:
+        if not self.POSTGRES_REPLICA_HOST:
+            return self.DATABASE_URL
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_REPLICA_HOST}:{self.POSTGRES_REPLICA_PORT}/{self.POSTGRES_DB}"
+        )
+
     @property
     def SYNC_DATABASE_URL(self) -> str:
         return (
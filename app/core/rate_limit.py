@@ -1,80 +1,202 @@
+"""
+Per-client token buckets for POST /events, /events/stream and /stats/*.
+
+Buckets live in shards (hash(key) -> shard), each an LRU OrderedDict with
+its own lock, so there is no global lock and a decision touches a single
+dict. A bucket untouched for capacity / rate seconds is full again, so it
+is dropped on the next insert into its shard without changing any
+decision; RATE_LIMIT_MAX_KEYS bounds memory when even that is not enough
+(the least recently used client then starts over with a full bucket).
+
+These buckets are per process; RATE_LIMIT_BACKEND=shared switches to the
+host-wide table in app.core.shared_rate_limit for multi-worker uvicorn.
+"""
 from __future__ import annotations
-import time
 import asyncio
-from dataclasses import dataclass
-from typing import Dict, Optional
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple, Union
 
 from fastapi import Request, HTTPException, status
 from app.core.config import get_settings
+from app.observability.metrics import (
+    RATE_LIMIT_DELAY,
+    RATE_LIMIT_EVICTIONS,
+    RATE_LIMIT_KEYS,
+    RATE_LIMIT_REJECTED,
+)
+
+
+class _Bucket:
+    __slots__ = ("tokens", "stamp")
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
 
 
-@dataclass
-class Bucket:
-    capacity: int
-    tokens: float
-    refill_rate: float
-    last_refill: float
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
 
 
 class TokenBucketRateLimiter:
-    def __init__(self, rps: int, burst: int):
+    def __init__(
+        self,
+        rps: float,
+        burst: int,
+        *,
+        max_keys: int = 250_000,
+        shards: int = 16,
+        name: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rps <= 0 or burst <= 0:
+            raise ValueError("rps and burst must be positive")
         self.refill_rate = float(rps)
         self.capacity = int(burst)
-        self._buckets: Dict[str, Bucket] = {}
-        self._lock = asyncio.Lock()
-
-    def _now(self) -> float:
-        return time.monotonic()
+        self.name = name
+        self.idle_after = self.capacity / self.refill_rate
+        self._shards = [_Shard() for _ in range(shards)]
+        self._n = shards
+        self._per_shard = max(1, max_keys // shards)
+        self._clock = clock
+        self._evicted_idle = RATE_LIMIT_EVICTIONS.labels(name, "idle")
+        self._evicted_over = RATE_LIMIT_EVICTIONS.labels(name, "capacity")
 
-    def _refill(self, b: Bucket) -> None:
-        now = self._now()
-        elapsed = max(0.0, now - b.last_refill)
-        b.tokens = min(self.capacity, b.tokens + elapsed * b.refill_rate)
-        b.last_refill = now
+    def __len__(self) -> int:
+        return sum(len(s.buckets) for s in self._shards)
 
-    async def allow(self, key: str, cost: int = 1) -> bool:
-        async with self._lock:
-            b = self._buckets.get(key)
+    def acquire(self, key: str, cost: int = 1) -> float:
+        """
+        Takes cost tokens and returns 0.0, or takes nothing and returns the
+        seconds until cost tokens are available. A cost above the burst is
+        capped at it, so any single request can eventually pass.
+        """
+        cost = min(cost, self.capacity)
+        shard = self._shards[hash(key) % self._n]
+        evicted = None
+        with shard.lock:
+            now = self._clock()
+            buckets = shard.buckets
+            b = buckets.get(key)
             if b is None:
-                b = Bucket(
-                    capacity=self.capacity,
-                    tokens=float(self.capacity),
-                    refill_rate=self.refill_rate,
-                    last_refill=self._now(),
-                )
-                self._buckets[key] = b
-            self._refill(b)
+                b = buckets[key] = _Bucket(self.capacity, now)
+                evicted = self._evict(buckets, now)
+            else:
+                tokens = b.tokens + (now - b.stamp) * self.refill_rate
+                b.tokens = tokens if tokens < self.capacity else self.capacity
+                b.stamp = now
+                buckets.move_to_end(key)
             if b.tokens >= cost:
                 b.tokens -= cost
-                return True
-            return False
+                wait = 0.0
+            else:
+                wait = (cost - b.tokens) / self.refill_rate
+        if evicted:
+            idle, over = evicted
+            if idle:
+                self._evicted_idle.inc(idle)
+            if over:
+                self._evicted_over.inc(over)
+        return wait
+
+    def _evict(
+        self, buckets: "OrderedDict[str, _Bucket]", now: float,
+    ) -> Optional[Tuple[int, int]]:
+        # LRU order is last-use order, so idle buckets sit at the front
+        idle = 0
+        cutoff = now - self.idle_after
+        while next(iter(buckets.values())).stamp <= cutoff:
+            buckets.popitem(last=False)
+            idle += 1
+        over = max(0, len(buckets) - self._per_shard)
+        for _ in range(over):
+            buckets.popitem(last=False)
+        return (idle, over) if idle or over else None
+
+    async def allow(self, key: str, cost: int = 1) -> bool:
+        return self.acquire(key, cost) == 0.0
 
 
-_settings_cached: Optional[tuple[int,int]] = None
-_limiter: Optional[TokenBucketRateLimiter] = None
+if TYPE_CHECKING:
+    from app.core.shared_rate_limit import SharedTokenBucketRateLimiter
 
+Limiter = Union["TokenBucketRateLimiter", "SharedTokenBucketRateLimiter"]
 
-def get_limiter() -> TokenBucketRateLimiter:
-    global _limiter, _settings_cached
+# limit name -> (rate setting, burst setting)
+LIMITS: Dict[str, Tuple[str, str]] = {
+    "stats": ("RATE_LIMIT_RPS", "RATE_LIMIT_BURST"),
+    "ingest": ("RATE_LIMIT_INGEST_EPS", "RATE_LIMIT_INGEST_BURST"),
+}
+
+_limiters: Dict[str, Tuple[tuple, "Limiter"]] = {}
+
+
+def get_limiter(name: str = "stats") -> "Limiter":
     s = get_settings()
-    conf = (s.RATE_LIMIT_RPS, s.RATE_LIMIT_BURST)
-    if _limiter is None or _settings_cached != conf:
-        _limiter = TokenBucketRateLimiter(
-            rps=s.RATE_LIMIT_RPS,
-            burst=s.RATE_LIMIT_BURST
+    rate_attr, burst_attr = LIMITS[name]
+    conf = (
+        getattr(s, rate_attr), getattr(s, burst_attr), s.RATE_LIMIT_MAX_KEYS,
+        s.RATE_LIMIT_BACKEND, s.RATE_LIMIT_SHARED_DIR,
+    )
+    cached = _limiters.get(name)
+    if cached is None or cached[0] != conf:
+        limiter = _make_limiter(name, *conf)
+        if cached is not None and hasattr(cached[1], "close"):
+            cached[1].close()
+        _limiters[name] = (conf, limiter)
+        RATE_LIMIT_KEYS.labels(name).set_function(limiter.__len__)
+        return limiter
+    return cached[1]
+
+
+def _make_limiter(name, rate, burst, max_keys, backend, shared_dir) -> "Limiter":
+    if backend == "memory":
+        return TokenBucketRateLimiter(rps=rate, burst=burst, max_keys=max_keys, name=name)
+    if backend == "shared":
+        from app.core.shared_rate_limit import SharedTokenBucketRateLimiter
+        return SharedTokenBucketRateLimiter(
+            rps=rate, burst=burst, max_keys=max_keys, name=name,
+            path=os.path.join(shared_dir, f"rate-limit-{name}"),
         )
-        _settings_cached = conf
-    return _limiter
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend!r}, expected memory or shared")
 
 
-async def rate_limit_dependency(request: Request):
-    client_ip = request.client.host if request.client else "unknown"
-    limiter = get_limiter()
-    allowed = await limiter.allow(client_ip, cost=1)
-    if not allowed:
+def client_key(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
 
+
+def check_rate_limit(request: Request, name: str, cost: int = 1) -> None:
+    """Raises 429 with Retry-After when the client is over the named limit."""
+    if not get_settings().RATE_LIMIT_ENABLED:
+        return
+    wait = get_limiter(name).acquire(client_key(request), cost)
+    if wait:
+        RATE_LIMIT_REJECTED.labels(name).inc()
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded",
-            headers={"Retry-After": "1"},
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
         )
+
+
+async def wait_rate_limit(request: Request, name: str, cost: int) -> None:
+    """Sleeps until the client may spend cost tokens (for streamed bodies)."""
+    if not get_settings().RATE_LIMIT_ENABLED:
+        return
+    limiter = get_limiter(name)
+    key = client_key(request)
+    while (wait := limiter.acquire(key, cost)):
+        RATE_LIMIT_DELAY.labels(name).inc(wait)
+        await asyncio.sleep(wait)
+
+
+async def rate_limit_dependency(request: Request):
+    check_rate_limit(request, "stats")
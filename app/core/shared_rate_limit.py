@@ -0,0 +1,151 @@
+"""
+Token buckets shared by every uvicorn worker on a host.
+
+The buckets live in a memory-mapped file (RATE_LIMIT_SHARED_DIR, /dev/shm
+by default) laid out as a set-associative hash table: a key's 64-bit
+blake2b fingerprint picks one set of WAYS slots, and its bucket is one of
+them. A decision locks just that set's bytes with fcntl.lockf, reads the
+set with one struct call, updates one slot and unlocks, so there is no
+server process and a crashed worker cannot leave a set locked (the kernel
+drops its locks). Refill uses time.monotonic, which on Linux is the same
+clock in every process.
+
+A set that is full reuses its least recently used slot: for free when that
+bucket has been idle burst / rate seconds (it would be full again), as an
+eviction otherwise.
+"""
+from __future__ import annotations
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable
+
+from app.observability.metrics import RATE_LIMIT_EVICTIONS
+
+MAGIC = b"EVRLBKT1"
+WAYS = 8
+_HEADER = struct.Struct("<8sQQ")  # magic, sets, ways
+_HEADER_BYTES = 64
+# a set: WAYS fingerprints (0 = empty slot), then WAYS (tokens, last use)
+_FPS = struct.Struct(f"<{WAYS}Q")
+_FPS_SLOT = struct.Struct("<Q")
+_STATE = struct.Struct("<dd")
+_STATES = struct.Struct(f"<{2 * WAYS}d")
+_SET_BYTES = _FPS.size + _STATES.size
+_LOCAL_LOCKS = 64
+
+
+def _fingerprint(key: str) -> int:
+    fp = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return fp or 1
+
+
+class SharedTokenBucketRateLimiter:
+    """Same interface as TokenBucketRateLimiter, state in a shared file."""
+
+    def __init__(
+        self,
+        rps: float,
+        burst: int,
+        *,
+        path: str,
+        max_keys: int = 250_000,
+        name: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rps <= 0 or burst <= 0:
+            raise ValueError("rps and burst must be positive")
+        self.refill_rate = float(rps)
+        self.capacity = int(burst)
+        self.name = name
+        self.idle_after = self.capacity / self.refill_rate
+        self._sets = max(1, -(-max_keys // WAYS))
+        # the geometry is part of the name, so resizing never remaps a
+        # file another worker still uses
+        self.path = f"{path}.{self._sets}x{WAYS}"
+        self._clock = clock
+        # fcntl locks are per process; these keep threads of one process apart
+        self._local = [threading.Lock() for _ in range(_LOCAL_LOCKS)]
+        self._fd, self._mm = self._open()
+        self._evicted_idle = RATE_LIMIT_EVICTIONS.labels(name, "idle")
+        self._evicted_over = RATE_LIMIT_EVICTIONS.labels(name, "capacity")
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        size = _HEADER_BYTES + self._sets * _SET_BYTES
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX, _HEADER_BYTES, 0)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    os.ftruncate(fd, size)  # zero-filled: every slot empty
+                    os.pwrite(fd, _HEADER.pack(MAGIC, self._sets, WAYS), 0)
+                magic, sets, ways = _HEADER.unpack(os.pread(fd, _HEADER.size, 0))
+                if (magic, sets, ways) != (MAGIC, self._sets, WAYS) \
+                        or os.fstat(fd).st_size != size:
+                    raise RuntimeError(f"{self.path} is not a rate limit table of this size")
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, _HEADER_BYTES, 0)
+            return fd, mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    def __len__(self) -> int:
+        """Buckets that are not full again yet (idle ones count as gone)."""
+        cutoff = self._clock() - self.idle_after
+        n = 0
+        for off in range(_HEADER_BYTES, len(self._mm), _SET_BYTES):
+            fps = _FPS.unpack_from(self._mm, off)
+            states = _STATES.unpack_from(self._mm, off + _FPS.size)
+            n += sum(1 for w in range(WAYS) if fps[w] and states[2 * w + 1] > cutoff)
+        return n
+
+    def acquire(self, key: str, cost: int = 1) -> float:
+        """See TokenBucketRateLimiter.acquire."""
+        cost = min(cost, self.capacity)
+        fp = _fingerprint(key)
+        s = fp % self._sets
+        off = _HEADER_BYTES + s * _SET_BYTES
+        reused = None
+        with self._local[s % _LOCAL_LOCKS]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _SET_BYTES, off)
+            try:
+                now = self._clock()
+                try:
+                    w = _FPS.unpack_from(self._mm, off).index(fp)
+                except ValueError:
+                    # least recently used slot; empty ones have stamp 0
+                    stamps = _STATES.unpack_from(self._mm, off + _FPS.size)[1::2]
+                    w = stamps.index(min(stamps))
+                    if stamps[w]:
+                        reused = stamps[w] <= now - self.idle_after
+                    tokens = float(self.capacity)
+                    _FPS_SLOT.pack_into(self._mm, off + w * _FPS_SLOT.size, fp)
+                else:
+                    tokens, stamp = _STATE.unpack_from(self._mm, off + _FPS.size + w * _STATE.size)
+                    tokens += (now - stamp) * self.refill_rate
+                    if tokens > self.capacity:
+                        tokens = self.capacity
+                if tokens >= cost:
+                    tokens -= cost
+                    wait = 0.0
+                else:
+                    wait = (cost - tokens) / self.refill_rate
+                _STATE.pack_into(self._mm, off + _FPS.size + w * _STATE.size, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, _SET_BYTES, off)
+        if reused is not None:
+            (self._evicted_idle if reused else self._evicted_over).inc()
+        return wait
+
+    async def allow(self, key: str, cost: int = 1) -> bool:
+        return self.acquire(key, cost) == 0.0
@@ -1,25 +1,118 @@
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 from app.core.config import get_settings
+from app.observability.metrics import (
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_IN_USE,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUTS,
+)
 
 settings = get_settings()
 TESTING = os.getenv("TESTING") == "1"
 
-engine_kwargs = {
-    "echo": False,
-    "pool_pre_ping": True,
-}
 
-if TESTING:
-    engine_kwargs["poolclass"] = NullPool
-    engine_kwargs["pool_pre_ping"] = False
+class _TimedQueue(AsyncAdaptedQueue):
+    """Idle connections of a pool; times every wait for one."""
+
+    observe = None
+
+    def get(self, block=True, timeout=None):
+        t0 = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that reports checkout waits and timeouts under its
+    logging_name. Only the wait for a free slot is timed: opening a new
+    connection and pre_ping are not.
+    """
+
+    _queue_class = _TimedQueue
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool.observe = DB_POOL_CHECKOUT_WAIT.labels(self.logging_name).observe
+
+    def connect(self):
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.logging_name).inc()
+            raise
+
 
-engine = create_async_engine(settings.DATABASE_URL, **engine_kwargs)
+def make_engine(
+    name: str,
+    url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    null_pool: bool = TESTING,
+) -> AsyncEngine:
+    """Engine with its own pool; name labels the db_pool_* metrics."""
+    engine_kwargs = {
+        "echo": False,
+        "pool_pre_ping": True,
+        # occurred_at::date in SQL is then the UTC day, like the partition
+        # bounds, day_versions and the days ingest computes in Python
+        "connect_args": {"server_settings": {"timezone": "UTC"}},
+    }
+    if null_pool:
+        engine_kwargs["poolclass"] = NullPool
+        engine_kwargs["pool_pre_ping"] = False
+    else:
+        engine_kwargs.update(
+            poolclass=InstrumentedPool,
+            pool_logging_name=name,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+        )
+    engine = create_async_engine(url, **engine_kwargs)
+    if not null_pool:
+        # engine.pool is looked up on each scrape: dispose() replaces it
+        DB_POOL_SIZE.labels(name).set(pool_size)
+        DB_POOL_IN_USE.labels(name).set_function(lambda: engine.pool.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set_function(lambda: max(0, engine.pool.overflow()))
+    return engine
+
+
+engine = make_engine(
+    "ingest",
+    settings.DATABASE_URL,
+    settings.DB_INGEST_POOL_SIZE,
+    settings.DB_INGEST_MAX_OVERFLOW,
+    settings.DB_INGEST_POOL_TIMEOUT_S,
+)
+
+# /stats and exports; a read replica when POSTGRES_REPLICA_HOST is set
+analytics_engine = make_engine(
+    "analytics",
+    settings.ANALYTICS_DATABASE_URL,
+    settings.DB_ANALYTICS_POOL_SIZE,
+    settings.DB_ANALYTICS_MAX_OVERFLOW,
+    settings.DB_ANALYTICS_POOL_TIMEOUT_S,
+)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+
+AnalyticsSessionLocal = sessionmaker(
+    bind=analytics_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
@@ -1 +1,12 @@
-from app.models.event import Event
+from app.models.event import Event, EventId
+from app.models.rollups import (
+    DailyActiveUser,
+    DailyEventCount,
+    DailyEventCountDelta,
+    DailyUserSketch,
+    DailyUserSketchDelta,
+    DayVersion,
+    RollupCoverage,
+    RollupState,
+    UserFirstSeen,
+)
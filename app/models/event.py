@@ -1,4 +1,4 @@
-from sqlalchemy import Text, Index, DateTime
+from sqlalchemy import DDL, Text, Index, DateTime, event
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
@@ -7,6 +7,11 @@ from datetime import datetime
 
 
 class Event(Base):
+    """
+    Range-partitioned on occurred_at (see app.services.partitions_dao).
+    A partitioned table's primary key must contain the partition key, so
+    event_id uniqueness across partitions is kept by EventId.
+    """
     __tablename__ = "events"
 
     event_id: Mapped[uuid.UUID] = mapped_column(
@@ -16,6 +21,7 @@ class Event(Base):
     )
     occurred_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         nullable=False
     )
     user_id: Mapped[str] = mapped_column(
@@ -35,4 +41,29 @@ class Event(Base):
         Index("ix_events_occurred_at", "occurred_at"),
         Index("ix_events_user_id", "user_id"),
         Index("ix_events_event_type", "event_type"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
     )
+
+
+class EventId(Base):
+    """
+    Every event_id accepted into an attached partition; the idempotency
+    guard for ingest. Rows are deleted with the partition holding their
+    occurred_at (partitions_dao.detach_partitions).
+    """
+    __tablename__ = "event_ids"
+
+    event_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_event_ids_occurred_at_brin", "occurred_at", postgresql_using="brin"),
+    )
+
+
+# rows outside every range partition land here until a partition exists
+event.listen(
+    Event.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT"),
+)
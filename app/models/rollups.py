@@ -0,0 +1,112 @@
+from sqlalchemy import (
+    BigInteger, CheckConstraint, Date, DateTime, Identity, Index, LargeBinary, SmallInteger,
+    Text,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+from datetime import date, datetime
+
+
+class DailyEventCount(Base):
+    __tablename__ = "daily_event_counts"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    event_type: Mapped[str] = mapped_column(Text, primary_key=True)
+    cnt: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class DailyEventCountDelta(Base):
+    """
+    Counts added by ingest, insert-only so concurrent ingests share no
+    row; folded into daily_event_counts in the background.
+    """
+    __tablename__ = "daily_event_count_deltas"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(always=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    event_type: Mapped[str] = mapped_column(Text, nullable=False)
+    cnt: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_daily_event_count_deltas_day", "day"),
+    )
+
+
+class DailyActiveUser(Base):
+    __tablename__ = "daily_active_users"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    user_id: Mapped[str] = mapped_column(Text, primary_key=True)
+
+
+class DailyUserSketch(Base):
+    """HyperLogLog registers of the day's user_ids (see app.services.hll)."""
+    __tablename__ = "daily_user_sketches"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    registers: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+class DailyUserSketchDelta(Base):
+    """
+    (day, user_id) pairs new to daily_active_users, insert-only; folded
+    into daily_user_sketches in the background.
+    """
+    __tablename__ = "daily_user_sketch_deltas"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(always=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    user_id: Mapped[str] = mapped_column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_daily_user_sketch_deltas_day", "day"),
+    )
+
+
+class UserFirstSeen(Base):
+    """Earliest event of every user; the retention cohorts index."""
+    __tablename__ = "user_first_seen"
+
+    user_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    first_seen_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    first_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    __table_args__ = (
+        Index("ix_user_first_seen_first_date", "first_date"),
+    )
+
+
+class RollupCoverage(Base):
+    """Days whose rollups were rebuilt from raw events."""
+    __tablename__ = "rollup_coverage"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+
+class RollupState(Base):
+    """
+    Single row. Every day >= maintained_since has been maintained by
+    ingest from its first event, so its rollups are complete.
+    """
+    __tablename__ = "rollup_state"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=1)
+    maintained_since: Mapped[date] = mapped_column(Date, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("id = 1", name="ck_rollup_state_single_row"),
+    )
+
+
+class DayVersion(Base):
+    """
+    Change counter per day of events, bumped in the writing transaction
+    (see app.services.day_versions_dao). day = date.min stands for "every
+    day", e.g. after partitions were detached.
+    """
+    __tablename__ = "day_versions"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
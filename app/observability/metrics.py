@@ -1,7 +1,8 @@
-from prometheus_client import Counter, Histogram, CollectorRegistry
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry
 
 REGISTRY = CollectorRegistry()
 
+# path / route label is the route template, never the raw URL path
 REQUESTS = Counter(
     "http_requests",
     "Total HTTP requests",
@@ -12,6 +13,7 @@ REQUESTS = Counter(
 REQUEST_LATENCY = Histogram(
     "http_request_duration_seconds",
     "HTTP request latency seconds",
+    ["method", "route"],
     buckets=(
         0.005, 0.01, 0.025, 0.05, 0.1,
         0.25, 0.5, 1.0, 2.5, 5.0, 10.0
@@ -30,3 +32,209 @@ EVENTS_SKIPPED = Counter(
     "Total skipped events (duplicates/invalid)",
     registry=REGISTRY,
 )
+
+EVENTS_INGESTED = Counter(
+    "events_ingested",
+    "Events answered by /events and /events/stream, by result (accepted, skipped, invalid, spooled)",
+    ["result"],
+    registry=REGISTRY,
+)
+
+INGEST_DURATION = Histogram(
+    "ingest_duration_seconds",
+    "Duration of the write part of an /events request or /events/stream batch",
+    registry=REGISTRY,
+)
+
+# body, validate, build, execute, rollups, commit
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds",
+    "Time per ingest stage",
+    ["stage"],
+    buckets=(
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+        0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+    ),
+    registry=REGISTRY,
+)
+
+INGEST_BATCH_SIZE = Histogram(
+    "ingest_batch_events",
+    "Events per insert into Postgres",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+    registry=REGISTRY,
+)
+
+INGEST_DUPLICATE_RATIO = Histogram(
+    "ingest_duplicate_ratio",
+    "Share of an insert's events skipped as already seen",
+    buckets=(0.0, 0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.99, 1.0),
+    registry=REGISTRY,
+)
+
+INGEST_BATCHER_FLUSH_SIZE = Histogram(
+    "ingest_batcher_flush_events",
+    "Events written per coalesced /events flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+    registry=REGISTRY,
+)
+
+INGEST_BATCHER_FLUSH_REQUESTS = Histogram(
+    "ingest_batcher_flush_requests",
+    "Requests merged into one coalesced /events flush",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+    registry=REGISTRY,
+)
+
+INGEST_BATCHER_WAIT = Histogram(
+    "ingest_batcher_wait_seconds",
+    "Time from submit until the request's events are committed",
+    buckets=(
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+        0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+    ),
+    registry=REGISTRY,
+)
+
+INGEST_BATCHER_PENDING = Gauge(
+    "ingest_batcher_pending_events",
+    "Events buffered in the coalescing batcher",
+    registry=REGISTRY,
+)
+
+INGEST_SPOOL_LAG_BYTES = Gauge(
+    "ingest_spool_lag_bytes",
+    "Spooled /events bytes not yet replayed into Postgres",
+    registry=REGISTRY,
+)
+
+INGEST_SPOOL_LAG_SECONDS = Gauge(
+    "ingest_spool_lag_seconds",
+    "Age of the oldest spooled batch not yet replayed into Postgres",
+    registry=REGISTRY,
+)
+
+INGEST_SPOOL_FSYNC = Histogram(
+    "ingest_spool_fsync_seconds",
+    "Duration of grouped spool fsyncs",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+    registry=REGISTRY,
+)
+
+ROLLUP_DELTAS_FOLDED = Counter(
+    "rollup_deltas_folded",
+    "Rollup delta rows folded into the daily rollup tables",
+    ["table"],
+    registry=REGISTRY,
+)
+
+STATS_CACHE_REQUESTS = Counter(
+    "stats_cache_requests",
+    "Stats cache lookups by result (hit, miss, coalesced)",
+    ["endpoint", "result"],
+    registry=REGISTRY,
+)
+
+STATS_CACHE_EVICTIONS = Counter(
+    "stats_cache_evictions",
+    "Stats cache entries dropped by reason (lru, expired, invalidated)",
+    ["reason"],
+    registry=REGISTRY,
+)
+
+STATS_CACHE_ENTRIES = Gauge(
+    "stats_cache_entries",
+    "Entries currently held in the stats cache",
+    registry=REGISTRY,
+)
+
+RATE_LIMIT_REJECTED = Counter(
+    "rate_limit_rejected",
+    "Requests answered 429 by limit (stats, ingest)",
+    ["limit"],
+    registry=REGISTRY,
+)
+
+RATE_LIMIT_DELAY = Counter(
+    "rate_limit_delay_seconds",
+    "Time /events/stream was paused waiting for ingest tokens",
+    ["limit"],
+    registry=REGISTRY,
+)
+
+RATE_LIMIT_EVICTIONS = Counter(
+    "rate_limit_evictions",
+    "Rate limit buckets dropped by reason (idle, capacity)",
+    ["limit", "reason"],
+    registry=REGISTRY,
+)
+
+RATE_LIMIT_KEYS = Gauge(
+    "rate_limit_keys",
+    "Client buckets currently tracked per limit",
+    ["limit"],
+    registry=REGISTRY,
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled connection (ingest, analytics)",
+    ["pool"],
+    buckets=(
+        0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025,
+        0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+    ),
+    registry=REGISTRY,
+)
+
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Checkouts that gave up after the pool timeout",
+    ["pool"],
+    registry=REGISTRY,
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    registry=REGISTRY,
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size (bounded by max_overflow)",
+    ["pool"],
+    registry=REGISTRY,
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured pool_size",
+    ["pool"],
+    registry=REGISTRY,
+)
+
+STATS_PARALLEL_CHUNK_SECONDS = Histogram(
+    "stats_parallel_chunk_seconds",
+    "Duration of one date-range chunk of a parallel /stats query",
+    ["endpoint"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    registry=REGISTRY,
+)
+
+STATS_QUERY_SECONDS = Histogram(
+    "stats_query_seconds",
+    "Duration of one stats_dao call",
+    ["query"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    registry=REGISTRY,
+)
+
+STATS_QUERY_ROWS = Histogram(
+    "stats_query_rows",
+    "Rows returned by one stats_dao call",
+    ["query"],
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+    registry=REGISTRY,
+)
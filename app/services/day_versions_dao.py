@@ -0,0 +1,67 @@
+"""
+Per-day data versions shared by every process that writes events.
+
+Writers bump a counter per day they touched, in their own transaction;
+readers turn the counters of a day range into one version number (their
+sum: counters only grow, so the sum changes on every committed bump,
+whatever order concurrent writers commit in). The /stats cache and ETags
+are keyed on it, so a late event written by another worker, the importer
+or the spool drainer of another slot is seen on the next request.
+
+Only days before today are versioned. Every ingest writes today, and one
+counter row updated by all of them would serialize their commits; ranges
+reaching today are open and already limited to the short cache TTL.
+"""
+from __future__ import annotations
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# "every day": counted in the version of any range
+ALL_DAYS = date.min
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+async def bump_day_versions(
+    session: AsyncSession,
+    days: Optional[Iterable[date]],
+) -> None:
+    """Bumps the closed days among days; None bumps every day."""
+    if days is None:
+        keys = [ALL_DAYS]
+    else:
+        today = utc_today()
+        # sorted, so concurrent writers lock rows in the same order
+        keys = sorted({d for d in days if d < today})
+        if not keys:
+            return
+    await session.execute(text("""
+        INSERT INTO day_versions (day, version)
+        SELECT unnest(CAST(:days AS date[])), 1
+        ON CONFLICT (day) DO UPDATE SET version = day_versions.version + 1
+    """), {"days": keys})
+
+
+async def range_version(session: AsyncSession, lo: date, hi: date) -> int:
+    """
+    Version of the data of days [lo, hi]. Read it before the data it
+    describes: a write landing in between then only costs a reload.
+    """
+    # SUM of bigint is numeric: an int, like VersionMap's, for the ETag
+    return int((await session.execute(text("""
+        SELECT COALESCE(SUM(version), 0)
+        FROM day_versions
+        WHERE day BETWEEN :lo AND :hi OR day = :all_days
+    """), {"lo": lo, "hi": hi, "all_days": ALL_DAYS})).scalar_one())
+
+
+async def load_day_versions(session: AsyncSession) -> List[Tuple[date, int]]:
+    """Every day's counter, ALL_DAYS included, by day."""
+    return [tuple(r) for r in (await session.execute(text(
+        "SELECT day, version FROM day_versions ORDER BY day"
+    ))).all()]
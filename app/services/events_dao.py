@@ -1,40 +1,241 @@
 from __future__ import annotations
-from typing import Iterable, Tuple
+import json
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Tuple, Union
+from uuid import UUID
+from sqlalchemy import (
+    BigInteger, Date, bindparam, cast, column, func, insert, select, table, text,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import insert as pg_insert
-from app.models.event import Event
-from app.api.schemas import EventIn
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from app.models.event import Event, EventId
+from app.api.schemas import EventIn, EventRow
+from app.core.config import get_settings
+from app.observability.metrics import (
+    EVENTS_ACCEPTED,
+    EVENTS_SKIPPED,
+    INGEST_BATCH_SIZE,
+    INGEST_DUPLICATE_RATIO,
+    INGEST_STAGE_SECONDS,
+)
+from app.services.day_versions_dao import bump_day_versions
+from app.services.rollups_dao import apply_rollups
+from app.services.stats_cache import mark_days_dirty
+
+INGEST_ENGINES = ("values", "copy")
+
+_STAGE_TABLE = "_events_stage"
+_STAGE_COLUMNS = ("event_id", "occurred_at", "user_id", "event_type", "properties")
+
+AnyEvent = Union[EventIn, EventRow]
+
+_BUILD = INGEST_STAGE_SECONDS.labels("build")
+_EXECUTE = INGEST_STAGE_SECONDS.labels("execute")
+_ROLLUPS = INGEST_STAGE_SECONDS.labels("rollups")
 
 
 async def insert_events_idempotent(
     session: AsyncSession,
-    events: Iterable[EventIn],
+    events: Iterable[AnyEvent],
 ) -> Tuple[int, int]:
 
-    payload = [
-        {
-            "event_id": e.event_id,
-            "occurred_at": e.occurred_at,
-            "user_id": e.user_id,
-            "event_type": e.event_type,
-            "properties": e.properties or {},
-        }
-        for e in events
-    ]
-    if not payload:
-        return (0, 0)
-
-    stmt = pg_insert(Event).values(payload).on_conflict_do_nothing(
-        index_elements=["event_id"]
-    )
-    result = await session.execute(stmt)
+    accepted, total, _ = await _ingest(session, events, want_ids=False)
+    return accepted, total - accepted
 
-    accepted = result.rowcount if result.rowcount is not None else 0
-    skipped = len(payload) - accepted
-    from app.observability.metrics import EVENTS_ACCEPTED, EVENTS_SKIPPED
 
-    EVENTS_ACCEPTED.inc(accepted)
+async def insert_events_returning_ids(
+    session: AsyncSession,
+    events: Iterable[AnyEvent],
+) -> List[UUID]:
+    """Same as insert_events_idempotent, but returns the inserted event_ids."""
+    _, _, ids = await _ingest(session, events, want_ids=True)
+    return ids or []
+
+
+async def _ingest(
+    session: AsyncSession,
+    events: Iterable[AnyEvent],
+    want_ids: bool,
+) -> Tuple[int, int, Optional[List[UUID]]]:
+    rollups = get_settings().ROLLUPS_ENABLED
+    events = events if isinstance(events, list) else list(events)
+    result, total = await _insert(session, events, returning=want_ids or rollups)
+    if result is None:
+        return 0, 0, [] if want_ids else None
+
+    ids = None
+    if want_ids or rollups:
+        # (event_id, day, user_id, event_type, occurred_at) of the rows
+        # actually inserted
+        rows = result.all()
+        accepted = len(rows)
+        if rollups:
+            with _ROLLUPS.time():
+                await apply_rollups(session, rows)
+        if want_ids:
+            ids = [r[0] for r in rows]
+        days = {r[1] for r in rows}
+    else:
+        accepted = result.rowcount if result.rowcount is not None else 0
+        # which rows were new is unknown; every day of the batch is a superset
+        days = {_utc_date(e.occurred_at) for e in events} if accepted else set()
+    if days:
+        await bump_day_versions(session, days)
+        mark_days_dirty(session, days)
 
+    _count(accepted, total - accepted)
+    return accepted, total, ids
+
+
+def _utc_date(ts: datetime) -> date:
+    # naive timestamps are stored as UTC
+    return (ts.astimezone(timezone.utc) if ts.tzinfo else ts).date()
+
+
+def _count(accepted: int, skipped: int) -> None:
+    EVENTS_ACCEPTED.inc(accepted)
     EVENTS_SKIPPED.inc(skipped)
+    total = accepted + skipped
+    if total:
+        INGEST_BATCH_SIZE.observe(total)
+        INGEST_DUPLICATE_RATIO.observe(skipped / total)
+
+
+async def _insert(
+    session: AsyncSession,
+    events: Iterable[AnyEvent],
+    returning: bool,
+):
+    engine = get_settings().INGEST_ENGINE
+    if engine == "copy":
+        return await _insert_copy(session, events, returning)
+    if engine == "values":
+        return await _insert_values(session, events, returning)
+    raise ValueError(
+        f"Unknown INGEST_ENGINE={engine!r}, expected one of {INGEST_ENGINES}"
+    )
+
+
+def _values_row(e: AnyEvent) -> tuple:
+    if isinstance(e, EventRow):
+        properties = json.loads(e.properties_json)
+    else:
+        properties = e.properties or {}
+    return (e.event_id, e.occurred_at, e.user_id, e.event_type, properties)
+
+
+def _copy_record(e: AnyEvent) -> tuple:
+    if isinstance(e, EventRow):
+        return e
+    return (
+        e.event_id,
+        e.occurred_at,
+        e.user_id,
+        e.event_type,
+        json.dumps(e.properties or {}),
+    )
+
+
+async def _insert_values(
+    session: AsyncSession,
+    events: Iterable[AnyEvent],
+    returning: bool = False,
+):
+    """
+    One array parameter per column, unnested WITH ORDINALITY: five bind
+    parameters whatever the batch size (asyncpg allows 32767), and the
+    batch order comes from the server.
+    """
+    with _BUILD.time():
+        rows = [_values_row(e) for e in events]
+        if not rows:
+            return None, 0
+
+        src = func.unnest(*(
+            bindparam(c.name, list(vals), type_=ARRAY(c.type))
+            for c, vals in zip(_event_columns(), zip(*rows))
+        )).table_valued(
+            *_event_columns(), with_ordinality="ord",
+        ).render_derived(name="v")
+    with _EXECUTE.time():
+        result = await session.execute(_guarded_insert(src, returning))
+    return result, len(rows)
+
+
+def _event_columns():
+    return [column(c, Event.__table__.c[c].type) for c in _STAGE_COLUMNS]
+
+
+def _guarded_insert(src, returning: bool):
+    """
+    INSERT of src's rows whose event_id was never seen before. events is
+    partitioned, so it cannot carry a unique index on event_id alone; the
+    event_ids insert decides which rows are new (and, being a unique
+    index insert, waits for concurrent ingests of the same id). Within
+    the batch the first occurrence of an id wins, as it did with
+    ON CONFLICT (event_id) DO NOTHING.
+    """
+    first = (
+        select(*(src.c[c] for c in _STAGE_COLUMNS))
+        .distinct(src.c.event_id)
+        .order_by(src.c.event_id, src.c.ord)
+        .cte("first")
+    )
+    guard = (
+        pg_insert(EventId)
+        .from_select(["event_id", "occurred_at"], select(first.c.event_id, first.c.occurred_at))
+        .on_conflict_do_nothing()
+        .returning(EventId.event_id)
+        .cte("guard")
+    )
+    stmt = insert(Event).from_select(
+        list(_STAGE_COLUMNS),
+        select(*(first.c[c] for c in _STAGE_COLUMNS))
+        .join(guard, guard.c.event_id == first.c.event_id),
+    )
+    if returning:
+        stmt = stmt.returning(
+            Event.event_id,
+            cast(Event.occurred_at, Date),
+            Event.user_id,
+            Event.event_type,
+            Event.occurred_at,
+        )
+    return stmt
+
+
+async def _insert_copy(
+    session: AsyncSession,
+    events: Iterable[AnyEvent],
+    returning: bool = False,
+):
+    """
+    Binary COPY into a per-connection temp table, then one guarded
+    INSERT ... SELECT (see _guarded_insert).
+    """
+    with _BUILD.time():
+        records: List[tuple] = [_copy_record(e) for e in events]
+    if not records:
+        return None, 0
+
+    with _EXECUTE.time():
+        # Running the DDL through the session opens the transaction, so the
+        # COPY below on the raw driver connection happens inside it as well.
+        await session.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} "
+            f"(LIKE events INCLUDING DEFAULTS, "
+            f"ord bigint GENERATED ALWAYS AS IDENTITY) ON COMMIT DELETE ROWS"
+        ))
+        await session.execute(text(f"TRUNCATE {_STAGE_TABLE}"))
+
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            _STAGE_TABLE,
+            records=records,
+            columns=_STAGE_COLUMNS,
+        )
 
-    return accepted, skipped
+        stage = table(_STAGE_TABLE, column("ord", BigInteger), *_event_columns())
+        result = await session.execute(_guarded_insert(stage, returning))
+    return result, len(records)
@@ -0,0 +1,174 @@
+"""
+HyperLogLog distinct counter for per-day user sketches.
+
+Precision 14: 16384 one-byte registers (16KB per sketch), relative
+standard error 1.04 / sqrt(16384) ~= 0.81%, i.e. ~2.4% at three sigma.
+Estimates use Ertl's improved raw estimator ("New cardinality estimation
+algorithms for HyperLogLog sketches", 2017), which has no bias bump around
+the linear-counting switch-over and is near exact for small sets.
+user_id is hashed with 64-bit BLAKE2b.
+
+Registers are also handled as one big int so that a merge (lane-wise max)
+is a handful of big-int operations instead of a Python loop over 16K
+registers.
+"""
+from __future__ import annotations
+import math
+from hashlib import blake2b
+from typing import Iterable, List, Optional
+
+P = 14
+M = 1 << P
+_IDX_MASK = M - 1
+_W_BITS = 64 - P
+_Q = _W_BITS  # register values are 0..Q+1
+_ALPHA_INF = 1 / (2 * math.log(2))
+
+# 8-bit lanes; register values are <= 51, so bit 7 of every lane is free
+_HI = int.from_bytes(b"\x80" * M, "little")
+_ALL = (1 << (8 * M)) - 1
+
+RELATIVE_ERROR = 1.04 / math.sqrt(M)
+
+
+def hash_user(user_id: str) -> int:
+    return int.from_bytes(
+        blake2b(user_id.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def _lane_max(a: int, b: int) -> int:
+    ge = ((a | _HI) - b) & _HI  # bit 7 set where a >= b
+    mask = (ge >> 7) * 0xFF
+    return (a & mask) | (b & (mask ^ _ALL))
+
+
+class HyperLogLog:
+    __slots__ = ("registers",)
+
+    def __init__(self, registers: Optional[bytes] = None):
+        if not registers:
+            self.registers = bytearray(M)
+        elif len(registers) != M:
+            raise ValueError(f"Expected {M} registers, got {len(registers)}")
+        else:
+            self.registers = bytearray(registers)
+
+    @classmethod
+    def of(cls, user_ids: Iterable[str]) -> "HyperLogLog":
+        h = cls()
+        h.update(user_ids)
+        return h
+
+    def add(self, user_id: str) -> None:
+        self.add_hash(hash_user(user_id))
+
+    def add_hash(self, h: int) -> None:
+        idx = h & _IDX_MASK
+        rank = _W_BITS - (h >> P).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def update(self, user_ids: Iterable[str]) -> None:
+        regs = self.registers
+        for u in user_ids:
+            h = hash_user(u)
+            idx = h & _IDX_MASK
+            rank = _W_BITS - (h >> P).bit_length() + 1
+            if rank > regs[idx]:
+                regs[idx] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """In-place lane-wise max; returns self."""
+        merged = _lane_max(
+            int.from_bytes(self.registers, "little"),
+            int.from_bytes(other.registers, "little"),
+        )
+        self.registers[:] = merged.to_bytes(M, "little")
+        return self
+
+    def copy(self) -> "HyperLogLog":
+        return HyperLogLog(bytes(self.registers))
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.registers)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, HyperLogLog) and self.registers == other.registers
+
+    def estimate(self) -> int:
+        regs = bytes(self.registers)
+        counts = [0] * (_Q + 2)
+        seen = 0
+        for v in range(_Q + 2):
+            counts[v] = regs.count(v)
+            seen += counts[v]
+            if seen == M:
+                break
+        if counts[0] == M:
+            return 0
+
+        z = M * _tau(1 - counts[_Q + 1] / M)
+        for k in range(_Q, 0, -1):
+            z = 0.5 * (z + counts[k])
+        z += M * _sigma(counts[0] / M)
+        return int(round(_ALPHA_INF * M * M / z))
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        z_old = z
+        z += x * y
+        y += y
+        if z == z_old:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        z_old = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == z_old:
+            return z / 3
+
+
+def merge_all(sketches: Iterable[HyperLogLog]) -> HyperLogLog:
+    acc = 0
+    for s in sketches:
+        acc = _lane_max(acc, int.from_bytes(s.registers, "little"))
+    return HyperLogLog(acc.to_bytes(M, "little"))
+
+
+def rolling_merge(sketches: List[HyperLogLog], window: int) -> List[HyperLogLog]:
+    """
+    Union of every `window` consecutive sketches: out[i] covers
+    sketches[i .. i + window - 1]. Van Herk / Gil-Werman block prefix and
+    suffix maxima, so about three merges per output whatever the window.
+    """
+    n = len(sketches)
+    if window <= 0 or n < window:
+        return []
+    v = [int.from_bytes(s.registers, "little") for s in sketches]
+    prefix = v[:]
+    suffix = v[:]
+    for i in range(1, n):
+        if i % window:
+            prefix[i] = _lane_max(prefix[i - 1], v[i])
+    for i in range(n - 2, -1, -1):
+        if (i + 1) % window:
+            suffix[i] = _lane_max(suffix[i + 1], v[i])
+    return [
+        HyperLogLog(
+            _lane_max(suffix[i], prefix[i + window - 1]).to_bytes(M, "little")
+        )
+        for i in range(n - window + 1)
+    ]
@@ -0,0 +1,192 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Sequence, Tuple
+
+import structlog
+
+from app.api.schemas import EventIn
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.observability.metrics import (
+    INGEST_BATCHER_FLUSH_REQUESTS,
+    INGEST_BATCHER_FLUSH_SIZE,
+    INGEST_BATCHER_PENDING,
+    INGEST_BATCHER_WAIT,
+    INGEST_STAGE_SECONDS,
+)
+from app.services.events_dao import insert_events_returning_ids
+
+log = structlog.get_logger()
+
+
+@dataclass
+class _Pending:
+    events: Sequence[EventIn]
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class IngestBatcher:
+    """
+    Write-behind micro-batcher for POST /events.
+
+    Concurrent requests are merged into one INSERT + COMMIT, flushed once
+    max_events are buffered or max_delay has passed since the oldest
+    buffered request. Every request still gets its own (accepted, skipped),
+    resolved only after the flush has committed. Buffered plus in-flight
+    events are capped at max_pending_events; submitters wait beyond that.
+    """
+
+    def __init__(
+        self,
+        max_events: int,
+        max_delay: float,
+        max_pending_events: int,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.max_events = max_events
+        self.max_delay = max_delay
+        self.max_pending_events = max_pending_events
+        self._session_factory = session_factory
+        self._queue: Deque[_Pending] = deque()
+        self._buffered = 0
+        self._pending = 0
+        self._cond = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything that is buffered and stop the flusher."""
+        if self._task is None:
+            return
+        async with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        await self._task
+        self._task = None
+
+    async def submit(self, events: Sequence[EventIn]) -> Tuple[int, int]:
+        n = len(events)
+        item = _Pending(events, asyncio.get_running_loop().create_future())
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: self._closing
+                or self._pending == 0
+                or self._pending + n <= self.max_pending_events
+            )
+            if self._closing:
+                raise RuntimeError("Ingest batcher is stopped")
+            self._queue.append(item)
+            self._buffered += n
+            self._pending += n
+            INGEST_BATCHER_PENDING.set(self._pending)
+            self._cond.notify_all()
+        # shield: a disconnected client must not cancel a shared flush
+        return await asyncio.shield(item.future)
+
+    async def _run(self) -> None:
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self._queue or self._closing)
+                if not self._queue:
+                    return
+                deadline = self._queue[0].enqueued + self.max_delay
+                while not self._closing and self._buffered < self.max_events:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch = self._take()
+            await self._flush(batch)
+
+    def _take(self) -> List[_Pending]:
+        batch: List[_Pending] = []
+        size = 0
+        while self._queue:
+            n = len(self._queue[0].events)
+            if batch and size + n > self.max_events:
+                break
+            batch.append(self._queue.popleft())
+            size += n
+        self._buffered -= size
+        return batch
+
+    async def _flush(self, batch: List[_Pending]) -> None:
+        size = sum(len(p.events) for p in batch)
+        try:
+            try:
+                await self._write(batch)
+            except Exception:
+                if len(batch) == 1:
+                    raise
+                # one bad request must not fail the others merged with it
+                log.exception("ingest_batcher_flush_failed", requests=len(batch))
+                for p in batch:
+                    try:
+                        await self._write([p])
+                    except Exception as ex:
+                        if not p.future.done():
+                            p.future.set_exception(ex)
+        except Exception as ex:
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(ex)
+        finally:
+            INGEST_BATCHER_FLUSH_SIZE.observe(size)
+            INGEST_BATCHER_FLUSH_REQUESTS.observe(len(batch))
+            async with self._cond:
+                self._pending -= size
+                INGEST_BATCHER_PENDING.set(self._pending)
+                self._cond.notify_all()
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        events = [e for p in batch for e in p.events]
+        async with self._session_factory() as session:
+            inserted = set(await insert_events_returning_ids(session, events))
+            with INGEST_STAGE_SECONDS.labels("commit").time():
+                await session.commit()
+
+        now = time.perf_counter()
+        for p in batch:
+            # first occurrence of an inserted event_id gets the credit,
+            # like within a single INSERT ... ON CONFLICT DO NOTHING
+            accepted = 0
+            for e in p.events:
+                if e.event_id in inserted:
+                    inserted.discard(e.event_id)
+                    accepted += 1
+            INGEST_BATCHER_WAIT.observe(now - p.enqueued)
+            if not p.future.done():
+                p.future.set_result((accepted, len(p.events) - accepted))
+
+
+_batcher: Optional[IngestBatcher] = None
+
+
+def get_batcher() -> Optional[IngestBatcher]:
+    global _batcher
+    s = get_settings()
+    if not s.INGEST_BATCHER_ENABLED:
+        return None
+    if _batcher is None:
+        _batcher = IngestBatcher(
+            max_events=s.INGEST_BATCHER_MAX_EVENTS,
+            max_delay=s.INGEST_BATCHER_MAX_DELAY_MS / 1000.0,
+            max_pending_events=s.INGEST_BATCHER_MAX_PENDING_EVENTS,
+        )
+    return _batcher
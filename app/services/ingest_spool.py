@@ -0,0 +1,483 @@
+from __future__ import annotations
+import asyncio
+import fcntl
+import itertools
+import json
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.api.schemas import EventIn, events_batch_adapter
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.observability.metrics import (
+    INGEST_SPOOL_FSYNC,
+    INGEST_SPOOL_LAG_BYTES,
+    INGEST_SPOOL_LAG_SECONDS,
+    INGEST_STAGE_SECONDS,
+)
+from app.services.events_dao import insert_events_idempotent
+
+log = structlog.get_logger()
+
+# frame = header + JSON array of events
+# header = payload length, crc32 of payload, event count, append time
+_HEADER = struct.Struct("<IIId")
+_SEGMENT_FMT = "segment-{:012d}.log"
+_CURSOR = "cursor.json"
+_REJECTED = "rejected.log"
+
+
+def _segment_seq(name: str) -> Optional[int]:
+    if name.startswith("segment-") and name.endswith(".log"):
+        return int(name[len("segment-"):-len(".log")])
+    return None
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _lock_slot(d: str) -> Optional[int]:
+    """Locked fd of d's LOCK file, or None when another process holds it."""
+    fd = os.open(os.path.join(d, "LOCK"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _list_segments(d: str) -> List[int]:
+    return sorted(s for s in map(_segment_seq, os.listdir(d)) if s is not None)
+
+
+def _segment_file(d: str, seq: int) -> str:
+    return os.path.join(d, _SEGMENT_FMT.format(seq))
+
+
+def _read_cursor(d: str, seqs: List[int]) -> Tuple[int, int]:
+    try:
+        with open(os.path.join(d, _CURSOR), "r", encoding="utf-8") as f:
+            c = json.load(f)
+        cursor = (c["seq"], c["offset"])
+    except FileNotFoundError:
+        cursor = (seqs[0] if seqs else 0, 0)
+    for s in seqs:
+        if s < cursor[0]:
+            # drained, but the process died before removing it
+            os.remove(_segment_file(d, s))
+    return cursor
+
+
+def _write_cursor(d: str, seq: int, offset: int) -> None:
+    path = os.path.join(d, _CURSOR)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"seq": seq, "offset": offset}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _pending_bytes(d: str, seqs: List[int], cursor: Tuple[int, int]) -> int:
+    """Bytes of d's segments past cursor; one stat per segment."""
+    seq, offset = cursor
+    total = -offset
+    for s in seqs:
+        if s >= seq:
+            try:
+                total += os.path.getsize(_segment_file(d, s))
+            except FileNotFoundError:
+                pass
+    return max(total, 0)
+
+
+def read_frames(
+    path: str,
+    offset: int,
+    limit: int,
+    max_events: int,
+) -> Tuple[List[Tuple[int, float, bytes]], bool]:
+    """
+    Reads frames starting at offset, stopping at limit or before the frame
+    that would take the total past max_events (the first frame is always
+    taken, so one oversized frame still drains). Returns ([(end_offset,
+    ts, payload)], torn) where torn means an incomplete or corrupt frame
+    was hit, i.e. the tail of a segment that was being written during a
+    crash.
+    """
+    frames: List[Tuple[int, float, bytes]] = []
+    events = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        pos = offset
+        while pos < limit:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return frames, True
+            length, crc, count, ts = _HEADER.unpack(header)
+            if frames and events + count > max_events:
+                break
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return frames, True
+            pos += _HEADER.size + length
+            frames.append((pos, ts, payload))
+            events += count
+    return frames, False
+
+
+class SpoolFull(Exception):
+    pass
+
+
+class IngestSpool:
+    """
+    Local write-ahead log for POST /events.
+
+    append() writes a CRC-framed batch to the active segment and returns
+    once a grouped fsync covers it; a background drainer replays segments
+    into `events` through insert_events_idempotent and persists its cursor
+    after every commit. Replays after a crash repeat at most the last
+    uncommitted frames, which event_id dedupe absorbs.
+
+    Each process locks its own slot-N directory, so several uvicorn
+    workers can share one INGEST_SPOOL_DIR and a restarted worker picks up
+    whatever its slot left behind. Slots nobody claims again, e.g. after
+    the worker count went down, are locked and drained by an idle drainer.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        segment_bytes: int,
+        fsync_interval: float,
+        max_bytes: int,
+        drain_batch: int,
+        drain: bool = True,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.drain_batch = drain_batch
+        self.drain = drain
+        self._session_factory = session_factory
+
+        self.dir: Optional[str] = None
+        self._lock_fd: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._active_seq = 0
+        self._active_offset = 0
+        self._active_synced = 0
+        self._written = 0
+        self._synced = 0
+        # appended but not drained yet, kept up to date instead of stat'ing
+        self._lag = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._dirty = asyncio.Event()
+        self._appended = asyncio.Event()
+        self._cursor = (0, 0)
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not self._closing
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._claim_slot()
+        seqs = self._segments()
+        self._cursor = self._load_cursor(seqs)
+        self._lag = _pending_bytes(self.dir, seqs, self._cursor)
+        self._open_segment(max(max(seqs, default=-1) + 1, self._cursor[0]))
+        self._closing = False
+        self._tasks = [asyncio.create_task(self._sync_loop())]
+        if self.drain:
+            self._tasks.append(asyncio.create_task(self._drain_loop()))
+        log.info("ingest_spool_started", dir=self.dir, cursor=self._cursor,
+                 active_segment=self._active_seq)
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        if not self._tasks:
+            return
+        self._closing = True
+        self._dirty.set()
+        self._appended.set()
+        sync_task, *drain_tasks = self._tasks
+        await sync_task
+        if drain_tasks:
+            try:
+                await asyncio.wait_for(drain_tasks[0], drain_timeout)
+            except asyncio.TimeoutError:
+                log.warning("ingest_spool_stop_undrained", lag_bytes=self.lag_bytes())
+        self._tasks = []
+        os.close(self._fd)
+        os.close(self._lock_fd)
+        self._fd = self._lock_fd = None
+
+    def _claim_slot(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        for n in itertools.count():
+            d = os.path.join(self.root, f"slot-{n}")
+            os.makedirs(d, exist_ok=True)
+            fd = _lock_slot(d)
+            if fd is not None:
+                self.dir, self._lock_fd = d, fd
+                return
+
+    def _segments(self) -> List[int]:
+        return _list_segments(self.dir)
+
+    def _segment_path(self, seq: int) -> str:
+        return _segment_file(self.dir, seq)
+
+    def _open_segment(self, seq: int) -> None:
+        self._fd = os.open(
+            self._segment_path(seq),
+            os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+            0o644,
+        )
+        _fsync_dir(self.dir)
+        self._active_seq = seq
+        self._active_offset = self._active_synced = 0
+
+    async def try_append(self, events: Sequence[EventIn]) -> bool:
+        """False when the spool is not running or over INGEST_SPOOL_MAX_BYTES."""
+        if not self.running:
+            return False
+        try:
+            await self.append(events)
+        except SpoolFull:
+            return False
+        return True
+
+    async def append(self, events: Sequence[EventIn]) -> None:
+        if self._lag >= self.max_bytes:
+            raise SpoolFull()
+        payload = events_batch_adapter.dump_json(list(events))
+        header = _HEADER.pack(
+            len(payload), zlib.crc32(payload), len(events), time.time()
+        )
+        _write_all(self._fd, header + payload)
+        size = len(header) + len(payload)
+        self._active_offset += size
+        self._written += size
+        self._lag += size
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((self._written, fut))
+        self._dirty.set()
+        await fut
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            if self._written == self._synced:
+                if self._closing:
+                    return
+                continue
+            if self.fsync_interval and not self._closing:
+                # let concurrent appends pile up behind one fsync
+                await asyncio.sleep(self.fsync_interval)
+
+            written, seq, offset, fd = (
+                self._written, self._active_seq, self._active_offset, self._fd
+            )
+            t0 = time.perf_counter()
+            try:
+                await asyncio.to_thread(os.fsync, fd)
+            except OSError as ex:
+                log.exception("ingest_spool_fsync_failed")
+                while self._waiters and self._waiters[0][0] <= written:
+                    self._waiters.popleft()[1].set_exception(ex)
+                continue
+            INGEST_SPOOL_FSYNC.observe(time.perf_counter() - t0)
+
+            self._synced = written
+            if seq == self._active_seq:
+                self._active_synced = offset
+            while self._waiters and self._waiters[0][0] <= written:
+                fut = self._waiters.popleft()[1]
+                if not fut.done():
+                    fut.set_result(None)
+            self._appended.set()
+
+            # rotate only when everything written so far is durable
+            if (self._active_offset >= self.segment_bytes
+                    and self._written == self._synced and not self._closing):
+                old = self._fd
+                self._open_segment(self._active_seq + 1)
+                os.close(old)
+            if self._written != self._synced:
+                self._dirty.set()
+
+    def _load_cursor(self, seqs: List[int]) -> Tuple[int, int]:
+        return _read_cursor(self.dir, seqs)
+
+    def _save_cursor(self, seq: int, offset: int) -> None:
+        _write_cursor(self.dir, seq, offset)
+        self._cursor = (seq, offset)
+
+    def lag_bytes(self) -> int:
+        return self._lag
+
+    async def _drain_loop(self) -> None:
+        backoff = 0.1
+        while True:
+            try:
+                progressed = await self._drain_once()
+                backoff = 0.1
+            except Exception:
+                log.exception("ingest_spool_drain_failed", cursor=self._cursor)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+            if progressed:
+                continue
+            INGEST_SPOOL_LAG_SECONDS.set(0)
+            if self._closing and self._written == self._synced:
+                return
+            try:
+                await self._drain_orphans()
+            except Exception:
+                log.exception("ingest_spool_orphan_drain_failed")
+            self._appended.clear()
+            try:
+                await asyncio.wait_for(self._appended.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _drain_once(self) -> bool:
+        seq, offset = self._cursor
+        path = self._segment_path(seq)
+        sealed = seq < self._active_seq
+        limit = os.path.getsize(path) if sealed else self._active_synced
+
+        frames, torn = await asyncio.to_thread(
+            read_frames, path, offset, limit, self.drain_batch
+        )
+        if frames:
+            INGEST_SPOOL_LAG_SECONDS.set(max(0.0, time.time() - frames[0][1]))
+            await self._replay(self.dir, seq, offset, [p for _, _, p in frames])
+            self._save_cursor(seq, frames[-1][0])
+            self._lag -= frames[-1][0] - offset
+            INGEST_SPOOL_LAG_BYTES.set(self._lag)
+            return True
+
+        if sealed:
+            if torn:
+                log.warning("ingest_spool_torn_tail", segment=path, offset=offset)
+            self._save_cursor(seq + 1, 0)
+            os.remove(path)
+            # the torn tail, if any
+            self._lag -= limit - offset
+            INGEST_SPOOL_LAG_BYTES.set(self._lag)
+            return True
+        INGEST_SPOOL_LAG_BYTES.set(self._lag)
+        return False
+
+    async def _drain_orphans(self) -> None:
+        """
+        Drains the other slots no process holds. Their segments are all
+        sealed: nobody appends to a slot without its lock.
+        """
+        for name in sorted(os.listdir(self.root)):
+            d = os.path.join(self.root, name)
+            if d == self.dir or not name.startswith("slot-"):
+                continue
+            fd = _lock_slot(d)
+            if fd is None:
+                continue
+            try:
+                await self._drain_orphan(d)
+            finally:
+                os.close(fd)
+
+    async def _drain_orphan(self, d: str) -> None:
+        seqs = _list_segments(d)
+        seq, offset = _read_cursor(d, seqs)
+        for s in seqs:
+            if s < seq:
+                continue
+            path = _segment_file(d, s)
+            limit = os.path.getsize(path)
+            while True:
+                frames, torn = await asyncio.to_thread(
+                    read_frames, path, offset, limit, self.drain_batch
+                )
+                if not frames:
+                    break
+                await self._replay(d, s, offset, [p for _, _, p in frames])
+                offset = frames[-1][0]
+                _write_cursor(d, s, offset)
+            if torn:
+                log.warning("ingest_spool_torn_tail", segment=path, offset=offset)
+            _write_cursor(d, s + 1, 0)
+            os.remove(path)
+            offset = 0
+            log.info("ingest_spool_orphan_segment_drained", segment=path)
+
+    async def _replay(self, d: str, seq: int, offset: int, payloads: List[bytes]) -> None:
+        events = [e for p in payloads for e in events_batch_adapter.validate_json(p)]
+        try:
+            await self._insert(events)
+        except (DataError, IntegrityError):
+            # deterministic rejections: keep the good frames, park the bad
+            for p in payloads:
+                try:
+                    await self._insert(events_batch_adapter.validate_json(p))
+                except (DataError, IntegrityError) as ex:
+                    log.error("ingest_spool_frame_rejected", segment=seq,
+                              offset=offset, error=str(ex))
+                    with open(os.path.join(d, _REJECTED), "ab") as f:
+                        f.write(p + b"\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+
+    async def _insert(self, events: List[EventIn]) -> None:
+        async with self._session_factory() as session:
+            await insert_events_idempotent(session, events)
+            with INGEST_STAGE_SECONDS.labels("commit").time():
+                await session.commit()
+
+
+_spool: Optional[IngestSpool] = None
+
+
+def get_spool() -> Optional[IngestSpool]:
+    global _spool
+    s = get_settings()
+    if not s.INGEST_SPOOL_ENABLED:
+        return None
+    if _spool is None:
+        _spool = IngestSpool(
+            root=s.INGEST_SPOOL_DIR,
+            segment_bytes=s.INGEST_SPOOL_SEGMENT_BYTES,
+            fsync_interval=s.INGEST_SPOOL_FSYNC_INTERVAL_MS / 1000.0,
+            max_bytes=s.INGEST_SPOOL_MAX_BYTES,
+            drain_batch=s.INGEST_SPOOL_DRAIN_BATCH,
+        )
+    return _spool
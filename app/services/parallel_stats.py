@@ -0,0 +1,178 @@
+"""
+Range-split execution of long /stats/dau and /stats/top-events queries.
+
+A query over raw events is one backend, i.e. one DB core. Here the date
+range is cut into STATS_PARALLEL_CHUNK_DAYS chunks that run concurrently,
+at most STATS_PARALLEL_DEGREE at a time, each on its own pooled session
+with STATS_STATEMENT_TIMEOUT_MS, and the results are merged: DAU rows are
+concatenated (a chunk holds whole days), per-type counts are summed and
+re-ranked. Ranges covered by rollups are already cheap and run as before.
+
+Every chunk's duration goes to stats_parallel_chunk_seconds and to a
+stats_parallel_chunks log line, to tune the chunk size.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AnalyticsSessionLocal
+from app.observability.metrics import STATS_PARALLEL_CHUNK_SECONDS
+from app.services.rollups_dao import get_dau_rollup, get_top_events_rollup
+from app.services.stats_dao import _use_rollups, get_dau_raw, get_top_events_raw
+
+log = structlog.get_logger()
+
+_QUERY_CANCELED = "57014"
+
+
+class StatsTimeout(Exception):
+    """A chunk hit the statement timeout."""
+
+
+@dataclass
+class ChunkTiming:
+    date_from: date
+    date_to: date
+    seconds: float
+    rows: int
+
+
+def split_range(date_from: date, date_to: date, chunk_days: int) -> List[Tuple[date, date]]:
+    chunks = []
+    lo = date_from
+    while lo <= date_to:
+        hi = min(date_to, lo + timedelta(days=chunk_days - 1))
+        chunks.append((lo, hi))
+        lo = hi + timedelta(days=1)
+    return chunks
+
+
+def use_parallel(date_from: date, date_to: date) -> bool:
+    s = get_settings()
+    return (
+        s.STATS_PARALLEL_ENABLED
+        and (date_to - date_from).days + 1 > s.STATS_PARALLEL_CHUNK_DAYS
+    )
+
+
+async def run_chunks(
+    endpoint: str,
+    chunks: List[Tuple[date, date]],
+    query: Callable[[AsyncSession, date, date], Awaitable[List[Any]]],
+    parallelism: int,
+    timeout_ms: int,
+    session_factory=AnalyticsSessionLocal,
+) -> Tuple[List[List[Any]], List[ChunkTiming]]:
+    """Runs query over every chunk; results and timings are in chunk order."""
+    sem = asyncio.Semaphore(parallelism)
+    histogram = STATS_PARALLEL_CHUNK_SECONDS.labels(endpoint)
+
+    async def one(lo: date, hi: date) -> Tuple[List[Any], ChunkTiming]:
+        async with sem, session_factory() as session:
+            t0 = time.perf_counter()
+            await session.execute(
+                text("SELECT set_config('statement_timeout', :v, true)"),
+                {"v": f"{timeout_ms}ms"},
+            )
+            try:
+                rows = await query(session, lo, hi)
+            except exc.DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) == _QUERY_CANCELED:
+                    raise StatsTimeout(
+                        f"{endpoint} chunk {lo}..{hi} exceeded {timeout_ms} ms"
+                    ) from e
+                raise
+            seconds = time.perf_counter() - t0
+        histogram.observe(seconds)
+        return rows, ChunkTiming(lo, hi, seconds, len(rows))
+
+    # a failed chunk cancels the rest
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(one(lo, hi)) for lo, hi in chunks]
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+    results = [t.result() for t in tasks]
+    timings = [timing for _, timing in results]
+    log.info(
+        "stats_parallel_chunks",
+        endpoint=endpoint,
+        chunks=[
+            {"from": str(t.date_from), "to": str(t.date_to),
+             "ms": round(t.seconds * 1000, 1), "rows": t.rows}
+            for t in timings
+        ],
+    )
+    return [rows for rows, _ in results], timings
+
+
+def _options() -> Tuple[int, int, int]:
+    s = get_settings()
+    return (
+        s.STATS_PARALLEL_CHUNK_DAYS,
+        s.STATS_PARALLEL_DEGREE,
+        s.STATS_STATEMENT_TIMEOUT_MS,
+    )
+
+
+async def get_dau_parallel(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> List[Tuple[date, int]]:
+    """get_dau with the raw-events path split by date range."""
+    if await _use_rollups(session, date_from, date_to):
+        return await get_dau_rollup(session, date_from, date_to)
+    # the caller's connection goes back to the pool while the chunks run
+    await session.rollback()
+    chunk_days, degree, timeout_ms = _options()
+    parts, _ = await run_chunks(
+        "dau", split_range(date_from, date_to, chunk_days),
+        get_dau_raw, degree, timeout_ms,
+    )
+    return [row for part in parts for row in part]
+
+
+async def get_top_events_parallel(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    limit: int = 10,
+) -> List[Tuple[str, int]]:
+    """get_top_events with the raw-events path split by date range."""
+    if await _use_rollups(session, date_from, date_to):
+        return await get_top_events_rollup(session, date_from, date_to, limit)
+    # the caller's connection goes back to the pool while the chunks run
+    await session.rollback()
+    chunk_days, degree, timeout_ms = _options()
+    parts, _ = await run_chunks(
+        "top-events", split_range(date_from, date_to, chunk_days),
+        _counts_by_type, degree, timeout_ms,
+    )
+    return merge_top_events(parts, limit)
+
+
+async def _counts_by_type(session: AsyncSession, lo: date, hi: date) -> List[Tuple[str, int]]:
+    # every type, not just the chunk's top: a type can win on the sum alone
+    return await get_top_events_raw(session, lo, hi, limit=None)
+
+
+def merge_top_events(
+    parts: List[List[Tuple[str, int]]],
+    limit: Optional[int],
+) -> List[Tuple[str, int]]:
+    totals: Counter = Counter()
+    for part in parts:
+        for event_type, cnt in part:
+            totals[event_type] += cnt
+    ranked = sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))
+    return ranked[:limit]
@@ -0,0 +1,144 @@
+"""
+Range partitions of `events` on occurred_at.
+
+Partitions are named after the period they hold: events_p2025_10 (month)
+or events_p2025_10_20 (day). Bounds are UTC midnights, matching the
+occurred_at::date days used by stats and rollups. events_default catches
+rows no partition covers; creating a partition moves its rows out of it.
+"""
+from __future__ import annotations
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.day_versions_dao import bump_day_versions
+
+PARTITION_INTERVALS = ("month", "day")
+DEFAULT_PARTITION = "events_default"
+
+_NAME_RE = re.compile(r"^events_p(\d{4})_(\d{2})(?:_(\d{2}))?$")
+
+Partition = Tuple[str, date, date]  # name, start (incl.), end (excl.)
+
+
+def partition_for(day: date, interval: str) -> Partition:
+    if interval == "month":
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return f"events_p{start:%Y_%m}", start, end
+    if interval == "day":
+        return f"events_p{day:%Y_%m_%d}", day, day + timedelta(days=1)
+    raise ValueError(
+        f"Unknown partition interval {interval!r}, expected one of {PARTITION_INTERVALS}"
+    )
+
+
+def parse_partition(name: str) -> Optional[Partition]:
+    m = _NAME_RE.match(name)
+    if m is None:
+        return None
+    y, mo, d = m.groups()
+    if d is None:
+        return partition_for(date(int(y), int(mo), 1), "month")
+    return partition_for(date(int(y), int(mo), int(d)), "day")
+
+
+async def list_partitions(session: AsyncSession) -> List[Partition]:
+    """Range partitions of events, oldest first (the default one excluded)."""
+    names = (await session.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'events'::regclass
+    """))).scalars().all()
+    parts = [p for p in map(parse_partition, names) if p is not None]
+    return sorted(parts, key=lambda p: p[1])
+
+
+async def ensure_partitions(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    interval: str,
+) -> List[str]:
+    """
+    Creates the missing partitions covering [date_from, date_to] and
+    returns their names. Periods overlapping an existing partition (e.g.
+    after switching from monthly to daily) are left alone.
+    """
+    existing = await list_partitions(session)
+    created = []
+    day = date_from
+    while day <= date_to:
+        name, start, end = partition_for(day, interval)
+        day = end
+        if any(s < end and start < e for _, s, e in existing):
+            continue
+        await _create_partition(session, name, start, end)
+        existing.append((name, start, end))
+        created.append(name)
+    return created
+
+
+async def _create_partition(
+    session: AsyncSession,
+    name: str,
+    start: date,
+    end: date,
+) -> None:
+    # Attaching checks events_default holds nothing in the new range, so
+    # such rows are moved into the new table first. The ACCESS EXCLUSIVE
+    # lock taken by ATTACH on the default partition blocks ingest for the
+    # duration; it is short as long as partitions are created ahead of time.
+    lo, hi = _utc(start), _utc(end)
+    await session.execute(text(
+        f"CREATE TABLE {name} (LIKE events INCLUDING DEFAULTS)"
+    ))
+    await session.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+    await session.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE occurred_at >= :lo AND occurred_at < :hi
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"lo": lo, "hi": hi})
+    await session.execute(text(
+        f"ALTER TABLE events ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+    ))
+
+
+async def detach_partitions(
+    session: AsyncSession,
+    before: date,
+    drop: bool = False,
+) -> List[str]:
+    """
+    Detaches (and optionally drops) every partition ending on or before
+    `before`. Rollups of those days are kept, so covered stats still
+    answer. Their event_ids go with them: dedupe only reaches back to the
+    oldest attached partition, and an event older than that sent again
+    is accepted again (into events_default).
+    """
+    done = []
+    for name, start, end in await list_partitions(session):
+        if end > before:
+            break
+        await session.execute(text(f"ALTER TABLE events DETACH PARTITION {name}"))
+        if drop:
+            await session.execute(text(f"DROP TABLE {name}"))
+        await session.execute(text("""
+            DELETE FROM event_ids WHERE occurred_at >= :lo AND occurred_at < :hi
+        """), {"lo": _utc(start), "hi": _utc(end)})
+        done.append(name)
+    if done:
+        await bump_day_versions(session, None)
+    return done
+
+
+def _utc(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import asyncio
+from typing import Optional
+
+import structlog
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.observability.metrics import ROLLUP_DELTAS_FOLDED
+from app.services.rollups_dao import fold_event_counts
+from app.services.sketches_dao import fold_sketches
+
+log = structlog.get_logger()
+
+
+class RollupFolder:
+    """
+    Background task folding the insert-only rollup deltas written by
+    ingest into the daily rollup tables: batches of up to batch rows, back
+    to back while there is a backlog, then every interval seconds. Readers
+    add up the deltas not folded yet, so folding only bounds how many they
+    have to read. Several processes may fold at once.
+    """
+
+    def __init__(self, interval: float, batch: int, session_factory=AsyncSessionLocal):
+        self.interval = interval
+        self.batch = batch
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping.is_set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def fold_once(self) -> int:
+        """
+        Folds one batch of each delta table, a transaction each; returns
+        the most deltas moved from one table.
+        """
+        moved = []
+        for table, fold in (("event_counts", fold_event_counts), ("sketches", fold_sketches)):
+            async with self._session_factory() as session:
+                n = await fold(session, self.batch)
+                await session.commit()
+            ROLLUP_DELTAS_FOLDED.labels(table).inc(n)
+            moved.append(n)
+        return max(moved)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                moved = await self.fold_once()
+            except Exception:
+                log.exception("rollup_fold_failed")
+                moved = 0
+            if moved < self.batch:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+_folder: Optional[RollupFolder] = None
+
+
+def get_rollup_folder() -> Optional[RollupFolder]:
+    global _folder
+    s = get_settings()
+    if not s.ROLLUPS_ENABLED or s.ROLLUPS_FOLD_INTERVAL_S <= 0:
+        return None
+    if _folder is None:
+        _folder = RollupFolder(
+            interval=s.ROLLUPS_FOLD_INTERVAL_S,
+            batch=s.ROLLUPS_FOLD_BATCH,
+        )
+    return _folder
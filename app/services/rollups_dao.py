@@ -0,0 +1,333 @@
+from __future__ import annotations
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.day_versions_dao import bump_day_versions
+from app.services.sketches_dao import rebuild_sketches
+
+
+# late events may move a user's first event earlier, never later
+_FIRST_SEEN_UPSERT = """
+    ON CONFLICT (user_id) DO UPDATE
+    SET first_seen_at = EXCLUDED.first_seen_at,
+        first_date = EXCLUDED.first_date
+    WHERE EXCLUDED.first_seen_at < user_first_seen.first_seen_at
+"""
+
+
+# folded counts plus the deltas not folded yet, of days [:d_from, :d_to]
+_EVENT_COUNTS = """
+    SELECT day, event_type, cnt FROM daily_event_counts
+    WHERE day BETWEEN :d_from AND :d_to
+    UNION ALL
+    SELECT day, event_type, cnt FROM daily_event_count_deltas
+    WHERE day BETWEEN :d_from AND :d_to
+"""
+
+
+def _days(date_from: date, date_to: date) -> List[date]:
+    return [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+
+
+def _bounds(date_from: date, date_to: date) -> Tuple[datetime, datetime]:
+    start_ts = datetime.combine(date_from, datetime.min.time())
+    end_ts = datetime.combine(date_to, datetime.min.time()) + timedelta(days=1)
+    return start_ts, end_ts
+
+
+async def apply_rollups(session: AsyncSession, rows: Sequence) -> None:
+    """
+    Adds freshly inserted events to the daily rollups, in the caller's
+    transaction. rows are (event_id, day, user_id, event_type, occurred_at)
+    of events that were actually inserted, so duplicates are never counted
+    twice.
+    Counts go to daily_event_count_deltas and new active users also to
+    daily_user_sketch_deltas, both insert-only: every ingest writing today
+    would otherwise update the same counter and sketch rows and wait for
+    each other's commit. The rollup folder moves them over later.
+    User keys are sorted so concurrent ingests lock them in the same order
+    and cannot deadlock.
+    """
+    if not rows:
+        return
+
+    counts = Counter((r[1], r[3]) for r in rows)
+    await session.execute(
+        text("""
+            INSERT INTO daily_event_count_deltas (day, event_type, cnt)
+            SELECT * FROM unnest(
+                CAST(:days AS date[]),
+                CAST(:types AS text[]),
+                CAST(:cnts AS bigint[])
+            )
+        """),
+        {
+            "days": [k[0] for k in counts],
+            "types": [k[1] for k in counts],
+            "cnts": list(counts.values()),
+        },
+    )
+
+    # pairs new to daily_active_users are all the HLL sketches need
+    users = sorted({(r[1], r[2]) for r in rows})
+    await session.execute(
+        text("""
+            WITH new AS (
+                INSERT INTO daily_active_users (day, user_id)
+                SELECT * FROM unnest(CAST(:days AS date[]), CAST(:users AS text[]))
+                ON CONFLICT DO NOTHING
+                RETURNING day, user_id
+            )
+            INSERT INTO daily_user_sketch_deltas (day, user_id)
+            SELECT day, user_id FROM new
+        """),
+        {"days": [u[0] for u in users], "users": [u[1] for u in users]},
+    )
+
+    first: dict = {}
+    for r in rows:
+        if r[2] not in first or r[4] < first[r[2]]:
+            first[r[2]] = r[4]
+    first_users = sorted(first)
+    await session.execute(
+        text(f"""
+            INSERT INTO user_first_seen (user_id, first_seen_at, first_date)
+            SELECT u, ts, ts::date
+            FROM unnest(CAST(:users AS text[]), CAST(:ts AS timestamptz[]))
+                 AS v(u, ts)
+            {_FIRST_SEEN_UPSERT}
+        """),
+        {"users": first_users, "ts": [first[u] for u in first_users]},
+    )
+
+
+async def fold_event_counts(session: AsyncSession, limit: int) -> int:
+    """
+    Moves up to limit of the oldest count deltas into daily_event_counts,
+    in one statement, so readers see them on either side but never both.
+    Rows another folder holds are skipped. Returns the deltas moved.
+    """
+    return (await session.execute(text("""
+        WITH moved AS (
+            DELETE FROM daily_event_count_deltas
+            WHERE id IN (
+                SELECT id FROM daily_event_count_deltas
+                ORDER BY id
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING day, event_type, cnt
+        ), folded AS (
+            INSERT INTO daily_event_counts (day, event_type, cnt)
+            SELECT day, event_type, SUM(cnt) FROM moved
+            GROUP BY day, event_type
+            ORDER BY day, event_type
+            ON CONFLICT (day, event_type)
+            DO UPDATE SET cnt = daily_event_counts.cnt + EXCLUDED.cnt
+        )
+        SELECT count(*) FROM moved
+    """), {"limit": limit})).scalar_one()
+
+
+async def rebuild_rollups(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> None:
+    """
+    Recomputes the rollups of [date_from, date_to] from raw events and
+    marks those days as covered. user_first_seen is only lowered from the
+    range's events, never reset, since it depends on the whole history.
+    The table lock waits for in-flight ingests (so their events are
+    visible here) and holds new ones back until the caller commits.
+    """
+    start_ts, end_ts = _bounds(date_from, date_to)
+    params = {"d_from": date_from, "d_to": date_to}
+    ts = {"start_ts": start_ts, "end_ts": end_ts}
+
+    await session.execute(text(
+        "LOCK TABLE daily_event_counts, daily_event_count_deltas, daily_active_users, "
+        "daily_user_sketches, daily_user_sketch_deltas IN SHARE ROW EXCLUSIVE MODE"
+    ))
+    for table in ("daily_event_counts", "daily_event_count_deltas"):
+        await session.execute(text(
+            f"DELETE FROM {table} WHERE day BETWEEN :d_from AND :d_to"
+        ), params)
+    await session.execute(text(
+        "DELETE FROM daily_active_users WHERE day BETWEEN :d_from AND :d_to"
+    ), params)
+    await session.execute(text("""
+        INSERT INTO daily_event_counts (day, event_type, cnt)
+        SELECT occurred_at::date, event_type, COUNT(*)
+        FROM events
+        WHERE occurred_at >= :start_ts AND occurred_at < :end_ts
+        GROUP BY 1, 2
+    """), ts)
+    await session.execute(text("""
+        INSERT INTO daily_active_users (day, user_id)
+        SELECT DISTINCT occurred_at::date, user_id
+        FROM events
+        WHERE occurred_at >= :start_ts AND occurred_at < :end_ts
+    """), ts)
+    await rebuild_sketches(session, date_from, date_to)
+    await session.execute(text(f"""
+        INSERT INTO user_first_seen (user_id, first_seen_at, first_date)
+        SELECT user_id, MIN(occurred_at), MIN(occurred_at)::date
+        FROM events
+        WHERE occurred_at >= :start_ts AND occurred_at < :end_ts
+        GROUP BY user_id
+        {_FIRST_SEEN_UPSERT}
+    """), ts)
+    await session.execute(text("""
+        INSERT INTO rollup_coverage (day)
+        SELECT generate_series(
+            CAST(:d_from AS date), CAST(:d_to AS date), INTERVAL '1 day'
+        )::date
+        ON CONFLICT DO NOTHING
+    """), params)
+    # covered days are now read from the rebuilt rollups
+    await bump_day_versions(session, _days(date_from, date_to))
+
+
+async def maintained_since(session: AsyncSession) -> Optional[date]:
+    """First day the rollups are kept up to date by ingest itself."""
+    return (await session.execute(text(
+        "SELECT maintained_since FROM rollup_state WHERE id = 1"
+    ))).scalar_one_or_none()
+
+
+async def rollup_covers(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> bool:
+    covered = (await session.execute(text("""
+        SELECT NOT EXISTS (
+            SELECT 1
+            FROM generate_series(
+                CAST(:d_from AS date), CAST(:d_to AS date), INTERVAL '1 day'
+            ) AS g(d)
+            WHERE g.d::date < COALESCE(
+                (SELECT maintained_since FROM rollup_state WHERE id = 1),
+                'infinity'::date
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM rollup_coverage c WHERE c.day = g.d::date
+            )
+        )
+    """), {"d_from": date_from, "d_to": date_to})).scalar_one()
+    return bool(covered)
+
+
+async def covered_days(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> Set[date]:
+    rows = (await session.execute(text("""
+        SELECT g.d::date AS day
+        FROM generate_series(
+            CAST(:d_from AS date), CAST(:d_to AS date), INTERVAL '1 day'
+        ) AS g(d)
+        WHERE g.d::date >= COALESCE(
+            (SELECT maintained_since FROM rollup_state WHERE id = 1),
+            'infinity'::date
+        )
+        OR EXISTS (SELECT 1 FROM rollup_coverage c WHERE c.day = g.d::date)
+    """), {"d_from": date_from, "d_to": date_to})).all()
+    return {r.day for r in rows}
+
+
+async def get_dau_rollup(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> List[Tuple[date, int]]:
+    rows = (await session.execute(text("""
+        SELECT day, COUNT(*) AS unique_users
+        FROM daily_active_users
+        WHERE day BETWEEN :d_from AND :d_to
+        GROUP BY day
+        ORDER BY day
+    """), {"d_from": date_from, "d_to": date_to})).all()
+    return [(r.day, r.unique_users) for r in rows]
+
+
+async def get_top_events_rollup(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    limit: int = 10,
+) -> List[Tuple[str, int]]:
+    rows = (await session.execute(text(f"""
+        SELECT event_type, SUM(cnt)::bigint AS cnt
+        FROM ({_EVENT_COUNTS}) c
+        GROUP BY event_type
+        ORDER BY SUM(cnt) DESC, event_type
+        LIMIT :limit
+    """), {"d_from": date_from, "d_to": date_to, "limit": limit})).all()
+    return [(r.event_type, r.cnt) for r in rows]
+
+
+async def check_rollups(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> List[Tuple[str, date, str, int, int]]:
+    """
+    Compares rollups with aggregates over raw events. Returns mismatches
+    as (kind, day, key, raw, rollup); an empty list means consistent.
+    """
+    start_ts, end_ts = _bounds(date_from, date_to)
+    params = {
+        "d_from": date_from, "d_to": date_to,
+        "start_ts": start_ts, "end_ts": end_ts,
+    }
+    counts = (await session.execute(text(f"""
+        WITH raw AS (
+            SELECT occurred_at::date AS day, event_type, COUNT(*) AS cnt
+            FROM events
+            WHERE occurred_at >= :start_ts AND occurred_at < :end_ts
+            GROUP BY 1, 2
+        ), r AS (
+            SELECT day, event_type, SUM(cnt) AS cnt
+            FROM ({_EVENT_COUNTS}) c
+            GROUP BY day, event_type
+        )
+        SELECT COALESCE(raw.day, r.day) AS day,
+               COALESCE(raw.event_type, r.event_type) AS key,
+               COALESCE(raw.cnt, 0) AS raw,
+               COALESCE(r.cnt, 0) AS rollup
+        FROM raw FULL JOIN r
+          ON raw.day = r.day AND raw.event_type = r.event_type
+        WHERE raw.cnt IS DISTINCT FROM r.cnt
+        ORDER BY 1, 2
+    """), params)).all()
+    dau = (await session.execute(text("""
+        WITH raw AS (
+            SELECT occurred_at::date AS day, COUNT(DISTINCT user_id) AS n
+            FROM events
+            WHERE occurred_at >= :start_ts AND occurred_at < :end_ts
+            GROUP BY 1
+        ), r AS (
+            SELECT day, COUNT(*) AS n
+            FROM daily_active_users
+            WHERE day BETWEEN :d_from AND :d_to
+            GROUP BY 1
+        )
+        SELECT COALESCE(raw.day, r.day) AS day,
+               COALESCE(raw.n, 0) AS raw,
+               COALESCE(r.n, 0) AS rollup
+        FROM raw FULL JOIN r ON raw.day = r.day
+        WHERE raw.n IS DISTINCT FROM r.n
+        ORDER BY 1
+    """), params)).all()
+
+    return (
+        [("event_counts", r.day, r.key, r.raw, r.rollup) for r in counts]
+        + [("dau", r.day, "", r.raw, r.rollup) for r in dau]
+    )
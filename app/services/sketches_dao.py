@@ -0,0 +1,163 @@
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.hll import HyperLogLog
+
+
+async def fold_sketches(session: AsyncSession, limit: int) -> int:
+    """
+    Merges up to limit of the oldest sketch deltas (see apply_rollups)
+    into the per-day HyperLogLog sketches, in the caller's transaction.
+    Rows another folder holds are skipped; sketch rows are only rewritten
+    when a register actually changed. Returns the deltas moved.
+    """
+    moved = (await session.execute(text("""
+        DELETE FROM daily_user_sketch_deltas
+        WHERE id IN (
+            SELECT id FROM daily_user_sketch_deltas
+            ORDER BY id
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING day, user_id
+    """), {"limit": limit})).all()
+    if not moved:
+        return 0
+
+    by_day: Dict[date, HyperLogLog] = {}
+    for day, user_id in moved:
+        by_day.setdefault(day, HyperLogLog()).add(user_id)
+    days = sorted(by_day)
+
+    # make sure the rows exist so FOR UPDATE serialises concurrent folders
+    await session.execute(text("""
+        INSERT INTO daily_user_sketches (day, registers)
+        SELECT unnest(CAST(:days AS date[])), ''::bytea
+        ON CONFLICT DO NOTHING
+    """), {"days": days})
+    current = {
+        r.day: r.registers
+        for r in (await session.execute(text("""
+            SELECT day, registers FROM daily_user_sketches
+            WHERE day = ANY(CAST(:days AS date[]))
+            ORDER BY day
+            FOR UPDATE
+        """), {"days": days})).all()
+    }
+
+    changed_days, changed = [], []
+    for day in days:
+        old = current.get(day) or b""
+        merged = HyperLogLog(old).merge(by_day[day])
+        if bytes(merged) != old:
+            changed_days.append(day)
+            changed.append(bytes(merged))
+    if changed_days:
+        await session.execute(text("""
+            UPDATE daily_user_sketches s
+            SET registers = v.registers
+            FROM unnest(CAST(:days AS date[]), CAST(:regs AS bytea[]))
+                 AS v(day, registers)
+            WHERE s.day = v.day
+        """), {"days": changed_days, "regs": changed})
+    return len(moved)
+
+
+async def rebuild_sketches(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> None:
+    """
+    Recomputes sketches of [date_from, date_to] from daily_active_users.
+    Meant to run inside rebuild_rollups, after that table was rebuilt.
+    """
+    params = {"d_from": date_from, "d_to": date_to}
+    for table in ("daily_user_sketches", "daily_user_sketch_deltas"):
+        await session.execute(text(
+            f"DELETE FROM {table} WHERE day BETWEEN :d_from AND :d_to"
+        ), params)
+
+    sketches = await _sketch_stream(session, text("""
+        SELECT day, user_id FROM daily_active_users
+        WHERE day BETWEEN :d_from AND :d_to
+    """), params)
+    if sketches:
+        days = sorted(sketches)
+        await session.execute(text("""
+            INSERT INTO daily_user_sketches (day, registers)
+            SELECT * FROM unnest(CAST(:days AS date[]), CAST(:regs AS bytea[]))
+        """), {"days": days, "regs": [bytes(sketches[d]) for d in days]})
+
+
+async def load_sketches(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> Dict[date, HyperLogLog]:
+    """
+    Per-day sketches for the range. Covered days come from
+    daily_user_sketches plus the deltas not folded yet, read in one
+    statement so a fold committing in between is seen whole or not at all;
+    the rest are built from raw events on the fly. Days without events are
+    absent.
+    """
+    from app.services.rollups_dao import covered_days
+
+    covered = (
+        await covered_days(session, date_from, date_to)
+        if get_settings().ROLLUPS_ENABLED else set()
+    )
+    out: Dict[date, HyperLogLog] = {}
+    if covered:
+        result = await session.stream(text("""
+            SELECT day, registers, NULL AS user_id FROM daily_user_sketches
+            WHERE day = ANY(CAST(:days AS date[])) AND registers <> ''::bytea
+            UNION ALL
+            SELECT day, NULL, user_id FROM daily_user_sketch_deltas
+            WHERE day = ANY(CAST(:days AS date[]))
+        """), {"days": sorted(covered)})
+        async for chunk in result.partitions(10000):
+            for day, registers, user_id in chunk:
+                sk = out.get(day)
+                if sk is None:
+                    sk = out[day] = HyperLogLog()
+                if registers is not None:
+                    sk.merge(HyperLogLog(registers))
+                else:
+                    sk.add(user_id)
+
+    uncovered = []
+    day = date_from
+    while day <= date_to:
+        if day not in covered:
+            uncovered.append(day)
+        day += timedelta(days=1)
+    if uncovered:
+        start_ts = datetime.combine(uncovered[0], datetime.min.time())
+        end_ts = datetime.combine(uncovered[-1], datetime.min.time()) + timedelta(days=1)
+        raw = await _sketch_stream(session, text("""
+            SELECT DISTINCT occurred_at::date AS day, user_id
+            FROM events
+            WHERE occurred_at >= :start_ts AND occurred_at < :end_ts
+        """), {"start_ts": start_ts, "end_ts": end_ts})
+        wanted = set(uncovered)
+        out.update((d, s) for d, s in raw.items() if d in wanted)
+    return out
+
+
+async def _sketch_stream(session: AsyncSession, stmt, params) -> Dict[date, HyperLogLog]:
+    sketches: Dict[date, HyperLogLog] = {}
+    result = await session.stream(stmt, params)
+    async for chunk in result.partitions(10000):
+        for day, user_id in chunk:
+            sk = sketches.get(day)
+            if sk is None:
+                sk = sketches[day] = HyperLogLog()
+            sk.add(user_id)
+    return sketches
@@ -0,0 +1,316 @@
+"""
+In-process cache for /stats results.
+
+Every entry remembers the span of days [lo, hi] its result depends on and
+the data version of that span (app.services.day_versions_dao) read before
+the query ran. A hit is only served while the span's version is still the
+same, so writes from any process - other uvicorn workers, the importer,
+another spool slot - are seen on the next request. Ingest in this process
+also marks the days it wrote on the session, and once that session
+commits the entries whose span contains one of them are dropped at once.
+Spans entirely before today are closed and get the long TTL; spans
+reaching today are not versioned for today and use the short one.
+
+Identical concurrent misses are coalesced: one caller runs the query,
+the others await its result.
+
+The stats router derives ETags from the same data versions, so every
+worker answers a conditional request alike. A matching If-None-Match is
+answered from VersionMap, a copy of day_versions reloaded at most every
+STATS_VERSIONS_MAX_AGE_S, without a query; a tag it does not match is
+checked against the database before sending the data.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.services.day_versions_dao import ALL_DAYS, load_day_versions, utc_today
+from app.observability.metrics import (
+    STATS_CACHE_ENTRIES,
+    STATS_CACHE_EVICTIONS,
+    STATS_CACHE_REQUESTS,
+)
+
+_DIRTY_KEY = "stats_cache_dirty_days"
+CLOSED_GRACE = timedelta(minutes=5)
+_RETRY = object()
+
+
+class _Entry:
+    __slots__ = ("value", "lo", "hi", "expires", "version")
+
+    def __init__(self, value: Any, lo: date, hi: date, expires: float,
+                 version: Optional[int] = None):
+        self.value = value
+        self.lo = lo
+        self.hi = hi
+        self.expires = expires
+        self.version = version
+
+
+class StatsCache:
+    def __init__(self, max_entries: int, ttl: float, closed_ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.closed_ttl = closed_ttl
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # recent invalidations, so a query that started before one of them
+        # does not store its now stale result
+        self._epoch = 0
+        self._recent: deque = deque(maxlen=256)
+
+    async def get_or_load(
+        self,
+        key: Tuple,
+        lo: date,
+        hi: date,
+        loader: Callable[[], Awaitable[Any]],
+        version: Optional[int] = None,
+    ) -> Any:
+        """
+        key[0] names the endpoint in metrics. version is the data version
+        of [lo, hi], read before calling; an entry stored under another
+        version is not served.
+        """
+        name = key[0]
+        flight = (key, version)
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version != version:
+                    self._drop(key, "invalidated")
+                elif entry.expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    STATS_CACHE_REQUESTS.labels(name, "hit").inc()
+                    return entry.value
+                else:
+                    self._drop(key, "expired")
+
+            inflight = self._inflight.get(flight)
+            if inflight is None:
+                break
+            STATS_CACHE_REQUESTS.labels(name, "coalesced").inc()
+            result = await asyncio.shield(inflight)
+            if result is not _RETRY:
+                return result
+            # the leader was cancelled; try again, possibly as the new leader
+
+        STATS_CACHE_REQUESTS.labels(name, "miss").inc()
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[flight] = fut
+        epoch = self._epoch
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            fut.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            # waiters get the error; nobody else needs to retrieve it
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(flight, None)
+
+        fut.set_result(value)
+        if not self._invalidated_since(epoch, lo, hi):
+            self._store(key, _Entry(value, lo, hi, self._expiry(hi), version))
+        return value
+
+    def invalidate_days(self, days: Optional[Iterable[date]]) -> None:
+        """Drops entries depending on any of days; None drops everything."""
+        if days is not None:
+            days = sorted(set(days))
+            if not days:
+                return
+        self._epoch += 1
+        if days is None:
+            self._recent.append((self._epoch, None))
+            for key in list(self._entries):
+                self._drop(key, "invalidated")
+            return
+
+        self._recent.append((self._epoch, days))
+        for key, entry in list(self._entries.items()):
+            if _intersects(days, entry.lo, entry.hi):
+                self._drop(key, "invalidated")
+
+    def clear(self) -> None:
+        self.invalidate_days(None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expiry(self, hi: date) -> float:
+        return time.monotonic() + (self.closed_ttl if closed_range(hi) else self.ttl)
+
+    def _store(self, key: Hashable, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            old = next(iter(self._entries))
+            self._drop(old, "lru")
+        STATS_CACHE_ENTRIES.set(len(self._entries))
+
+    def _drop(self, key: Hashable, reason: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            STATS_CACHE_EVICTIONS.labels(reason).inc()
+            STATS_CACHE_ENTRIES.set(len(self._entries))
+
+    def _invalidated_since(self, epoch: int, lo: date, hi: date) -> bool:
+        if self._epoch == epoch:
+            return False
+        if not self._recent or self._recent[0][0] > epoch + 1:
+            # older invalidations were forgotten; assume the worst
+            return True
+        for e, days in self._recent:
+            if e > epoch and (days is None or _intersects(days, lo, hi)):
+                return True
+        return False
+
+
+def closed_range(hi: date) -> bool:
+    # a transaction that wrote "today" just before midnight may commit
+    # just after it, unversioned; the grace keeps such days open
+    return hi < (datetime.now(timezone.utc) - CLOSED_GRACE).date()
+
+
+def etag_for(key: Tuple, hi: date, version: int) -> str:
+    """
+    Validator for a stats response over days ending at hi, from the data
+    version of its range (day_versions_dao.range_version), so every worker
+    derives the same tag. Today is not versioned, so open ranges also
+    change tag every STATS_CACHE_TTL_S.
+    """
+    if closed_range(hi):
+        bucket = None
+    else:
+        ttl = get_settings().STATS_CACHE_TTL_S
+        bucket = int(time.time() // ttl) if ttl > 0 else time.time_ns()
+    digest = hashlib.blake2b(
+        repr((key, version, bucket)).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+class VersionMap:
+    """
+    Process-local copy of day_versions giving range versions without a
+    query. It is reloaded once older than max_age, so a write from another
+    process shows within max_age; a commit in this process that bumps a
+    version drops it at once.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._days: List[date] = []
+        # _prefix[i] = sum of the versions of _days[:i]
+        self._prefix: List[int] = [0]
+        self._all = 0
+        self._loaded = float("-inf")
+        self._dropped = float("-inf")
+
+    async def range_version(self, session: AsyncSession, lo: date, hi: date) -> int:
+        """Same as day_versions_dao.range_version, up to max_age old."""
+        if (self._loaded <= self._dropped
+                or time.monotonic() - self._loaded > self.max_age):
+            await self._reload(session)
+        i = bisect_left(self._days, lo)
+        j = bisect_right(self._days, hi)
+        return self._prefix[j] - self._prefix[i] + self._all
+
+    def invalidate(self) -> None:
+        # also makes a reload already running count as stale
+        self._dropped = time.monotonic()
+
+    async def _reload(self, session: AsyncSession) -> None:
+        started = time.monotonic()
+        rows = await load_day_versions(session)
+        if started < self._loaded:
+            # a concurrent reload started later and is newer
+            return
+        self._all = sum(v for d, v in rows if d == ALL_DAYS)
+        self._days = [d for d, _ in rows if d != ALL_DAYS]
+        prefix = [0]
+        for d, v in rows:
+            if d != ALL_DAYS:
+                prefix.append(prefix[-1] + v)
+        self._prefix = prefix
+        self._loaded = started
+
+
+def _intersects(days: list, lo: date, hi: date) -> bool:
+    i = bisect_left(days, lo)
+    return i < len(days) and days[i] <= hi
+
+
+def mark_days_dirty(session, days: Optional[Iterable[date]]) -> None:
+    """
+    Records days written in session's transaction; cache entries covering
+    them are dropped once it commits. None means unknown days.
+    """
+    info = session.info
+    if days is None:
+        info[_DIRTY_KEY] = None
+    elif info.get(_DIRTY_KEY, ()) is not None:
+        info.setdefault(_DIRTY_KEY, set()).update(days)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if _DIRTY_KEY not in session.info:
+        return
+    days = session.info.pop(_DIRTY_KEY)
+    if _cache is not None:
+        _cache.invalidate_days(days)
+    if _versions is not None:
+        # only days before today are versioned
+        today = utc_today()
+        if days is None or any(d < today for d in days):
+            _versions.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
+
+
+_cache: Optional[StatsCache] = None
+
+
+def get_stats_cache() -> Optional[StatsCache]:
+    global _cache
+    s = get_settings()
+    if not s.STATS_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = StatsCache(
+            max_entries=s.STATS_CACHE_MAX_ENTRIES,
+            ttl=s.STATS_CACHE_TTL_S,
+            closed_ttl=s.STATS_CACHE_CLOSED_TTL_S,
+        )
+    return _cache
+
+
+_versions: Optional[VersionMap] = None
+
+
+def get_version_map() -> Optional[VersionMap]:
+    global _versions
+    s = get_settings()
+    if s.STATS_VERSIONS_MAX_AGE_S <= 0:
+        return None
+    if _versions is None:
+        _versions = VersionMap(max_age=s.STATS_VERSIONS_MAX_AGE_S)
+    return _versions
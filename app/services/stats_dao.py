@@ -1,19 +1,75 @@
 from __future__ import annotations
+import functools
+import time
 from datetime import date, datetime, timedelta
-from typing import List, Tuple
+from typing import Any, Callable, List, Tuple
 
 from sqlalchemy import select, func, cast, Date, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.models.event import Event
+from app.observability.metrics import STATS_QUERY_ROWS, STATS_QUERY_SECONDS
+from app.services.hll import HyperLogLog, merge_all, rolling_merge
+from app.services.rollups_dao import (
+    get_dau_rollup,
+    get_top_events_rollup,
+    rollup_covers,
+)
+from app.services.sketches_dao import load_sketches
 
 
+def _instrumented(rows: Callable[[Any], int] = len):
+    """Records each call's duration and row count under the function's name."""
+    def wrap(fn):
+        seconds = STATS_QUERY_SECONDS.labels(fn.__name__)
+        counts = STATS_QUERY_ROWS.labels(fn.__name__)
+
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            result = await fn(*args, **kwargs)
+            seconds.observe(time.perf_counter() - t0)
+            counts.observe(rows(result))
+            return result
+        return timed
+    return wrap
+
+
+def _one(_: Any) -> int:
+    return 1
+
+
+def _retention_rows(result: Tuple[int, List[Tuple[int, int]]]) -> int:
+    return len(result[1])
+
+
+async def _use_rollups(session: AsyncSession, date_from: date, date_to: date) -> bool:
+    return (
+        get_settings().ROLLUPS_ENABLED
+        and await rollup_covers(session, date_from, date_to)
+    )
+
+
+@_instrumented()
 async def get_dau(
     session: AsyncSession,
     date_from: date,
     date_to: date,
 ) -> List[Tuple[date, int]]:
 
+    if await _use_rollups(session, date_from, date_to):
+        return await get_dau_rollup(session, date_from, date_to)
+    return await get_dau_raw(session, date_from, date_to)
+
+
+@_instrumented()
+async def get_dau_raw(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> List[Tuple[date, int]]:
+
     start_ts = datetime.combine(date_from, datetime.min.time())
     end_ts   = datetime.combine(
         date_to,
@@ -34,6 +90,55 @@ async def get_dau(
     return [(r.day, r.unique_users) for r in rows]
 
 
+@_instrumented()
+async def get_dau_approx(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> List[Tuple[date, int]]:
+    sketches = await load_sketches(session, date_from, date_to)
+    return [(d, sketches[d].estimate()) for d in sorted(sketches)]
+
+
+@_instrumented(rows=_one)
+async def get_unique_users(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+) -> int:
+    """Approximate number of distinct users over the whole range."""
+    sketches = await load_sketches(session, date_from, date_to)
+    return merge_all(sketches.values()).estimate()
+
+
+@_instrumented()
+async def get_rolling_unique_users(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    window: int,
+) -> List[Tuple[date, int]]:
+    """
+    Approximate distinct users over the trailing `window` days ending on
+    each day of [date_from, date_to] (WAU for 7, MAU for 30). Days whose
+    window has no events are omitted, like in get_dau.
+    """
+    start = date_from - timedelta(days=window - 1)
+    sketches = await load_sketches(session, start, date_to)
+    if not sketches:
+        return []
+    days = [start + timedelta(days=i) for i in range((date_to - start).days + 1)]
+    empty = HyperLogLog()
+    windows = rolling_merge([sketches.get(d, empty) for d in days], window)
+    out = []
+    for d, sk in zip(days[window - 1:], windows):
+        n = sk.estimate()
+        if n:
+            out.append((d, n))
+    return out
+
+
+@_instrumented()
 async def get_top_events(
     session: AsyncSession,
     date_from: date,
@@ -41,6 +146,19 @@ async def get_top_events(
     limit: int = 10,
 ) -> List[Tuple[str, int]]:
 
+    if await _use_rollups(session, date_from, date_to):
+        return await get_top_events_rollup(session, date_from, date_to, limit)
+    return await get_top_events_raw(session, date_from, date_to, limit)
+
+
+@_instrumented()
+async def get_top_events_raw(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    limit: int = 10,
+) -> List[Tuple[str, int]]:
+
     start_ts = datetime.combine(date_from, datetime.min.time())
     end_ts = datetime.combine(
         date_to,
@@ -51,19 +169,141 @@ async def get_top_events(
         select(Event.event_type, func.count().label("cnt"))
         .where(Event.occurred_at >= start_ts, Event.occurred_at < end_ts)
         .group_by(Event.event_type)
-        .order_by(func.count().desc())
+        .order_by(func.count().desc(), Event.event_type)
         .limit(limit)
     )
     rows = (await session.execute(stmt)).all()
     return [(r.event_type, r.cnt) for r in rows]
 
 
+@_instrumented(rows=_retention_rows)
 async def get_retention(
     session: AsyncSession,
     start_date: date,
     windows: int,
 ) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Cohort = users whose first event is on start_date. With rollups on,
+    the cohort comes from user_first_seen and only its users' events are
+    read; otherwise first events are regrouped from the raw table.
+    """
+    if not get_settings().ROLLUPS_ENABLED:
+        return await get_retention_raw(session, start_date, windows)
+
+    cohort_size = (await session.execute(text("""
+        SELECT COUNT(*) FROM user_first_seen WHERE first_date = :start_date
+    """), {"start_date": start_date})).scalar_one()
 
+    if cohort_size == 0:
+        return 0, [(d, 0) for d in range(0, windows + 1)]
+
+    start_ts = datetime.combine(start_date, datetime.min.time())
+    end_ts = start_ts + timedelta(days=windows + 1)
+    rows = (await session.execute(text("""
+        SELECT e.occurred_at::date - CAST(:start_date AS date) AS day,
+               COUNT(DISTINCT e.user_id) AS cnt
+        FROM user_first_seen f
+        JOIN events e ON e.user_id = f.user_id
+        WHERE f.first_date = :start_date
+          AND e.occurred_at >= :start_ts AND e.occurred_at < :end_ts
+        GROUP BY 1
+    """), {
+        "start_date": start_date, "start_ts": start_ts, "end_ts": end_ts,
+    })).all()
+
+    counts = {r.day: r.cnt for r in rows}
+    return cohort_size, [(d, counts.get(d, 0)) for d in range(0, windows + 1)]
+
+
+@_instrumented()
+async def get_retention_matrix(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    windows: int,
+) -> List[Tuple[date, int, List[Tuple[int, int]]]]:
+    """
+    get_retention for every cohort date in [date_from, date_to] at once:
+    (cohort_date, cohort_size, [(day, count), ...]). One grouped scan over
+    (user, day) pairs - daily_active_users when the rollups cover the whole
+    span, else the cohorts' events.
+    """
+    start_ts = datetime.combine(date_from, datetime.min.time())
+    end_ts = datetime.combine(date_to, datetime.min.time()) + timedelta(days=windows + 1)
+    params = {
+        "d_from": date_from, "d_to": date_to, "windows": windows,
+        "start_ts": start_ts, "end_ts": end_ts,
+    }
+
+    if get_settings().ROLLUPS_ENABLED:
+        cohort_cte = """
+            SELECT user_id, first_date
+            FROM user_first_seen
+            WHERE first_date BETWEEN :d_from AND :d_to
+        """
+    else:
+        cohort_cte = """
+            SELECT user_id, MIN(occurred_at)::date AS first_date
+            FROM events
+            GROUP BY user_id
+            HAVING MIN(occurred_at)::date BETWEEN :d_from AND :d_to
+        """
+
+    if await _use_rollups(session, date_from, date_to + timedelta(days=windows)):
+        activity = """
+            SELECT c.first_date, a.day - c.first_date AS day, COUNT(*) AS cnt
+            FROM cohort c
+            JOIN daily_active_users a
+              ON a.user_id = c.user_id
+             AND a.day BETWEEN c.first_date AND c.first_date + CAST(:windows AS integer)
+            GROUP BY 1, 2
+        """
+    else:
+        activity = """
+            SELECT c.first_date, e.occurred_at::date - c.first_date AS day,
+                   COUNT(DISTINCT e.user_id) AS cnt
+            FROM cohort c
+            JOIN events e ON e.user_id = c.user_id
+            WHERE e.occurred_at >= :start_ts AND e.occurred_at < :end_ts
+              AND e.occurred_at::date <= c.first_date + CAST(:windows AS integer)
+            GROUP BY 1, 2
+        """
+
+    rows = (await session.execute(text(f"""
+        WITH cohort AS MATERIALIZED ({cohort_cte})
+        SELECT first_date, -1 AS day, COUNT(*) AS cnt
+        FROM cohort
+        GROUP BY 1
+        UNION ALL
+        {activity}
+    """), params)).all()
+
+    sizes: dict = {}
+    counts: dict = {}
+    for r in rows:
+        if r.day < 0:
+            sizes[r.first_date] = r.cnt
+        else:
+            counts[(r.first_date, r.day)] = r.cnt
+
+    out = []
+    day = date_from
+    while day <= date_to:
+        out.append((
+            day,
+            sizes.get(day, 0),
+            [(d, counts.get((day, d), 0)) for d in range(0, windows + 1)],
+        ))
+        day += timedelta(days=1)
+    return out
+
+
+@_instrumented(rows=_retention_rows)
+async def get_retention_raw(
+    session: AsyncSession,
+    start_date: date,
+    windows: int,
+) -> Tuple[int, List[Tuple[int, int]]]:
     cohort_sql = text("""
         WITH first_events AS (
             SELECT user_id, MIN(occurred_at::date) AS first_date
@@ -54,6 +54,8 @@ def run_migrations_online():
         configuration,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
+        # backfills cast occurred_at to UTC days, like the app
+        connect_args={"options": "-c timezone=UTC"},
     )
 
     with connectable.connect() as connection:
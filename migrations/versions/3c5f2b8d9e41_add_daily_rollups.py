@@ -0,0 +1,44 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "3c5f2b8d9e41"
+down_revision = "a198ede84dff"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_event_counts",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("event_type", sa.Text(), primary_key=True),
+        sa.Column("cnt", sa.BigInteger(), nullable=False),
+    )
+    op.create_table(
+        "daily_active_users",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("user_id", sa.Text(), primary_key=True),
+    )
+    op.create_table(
+        "rollup_coverage",
+        sa.Column("day", sa.Date(), primary_key=True),
+    )
+    op.create_table(
+        "rollup_state",
+        sa.Column("id", sa.SmallInteger(), primary_key=True),
+        sa.Column("maintained_since", sa.Date(), nullable=False),
+        sa.CheckConstraint("id = 1", name="ck_rollup_state_single_row"),
+    )
+    # Ingest maintains rollups from tomorrow on; older days become covered
+    # once `python -m app.cli.rollups rebuild` has run over them.
+    op.execute(
+        "INSERT INTO rollup_state (id, maintained_since) "
+        "VALUES (1, CURRENT_DATE + 1)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rollup_state")
+    op.drop_table("rollup_coverage")
+    op.drop_table("daily_active_users")
+    op.drop_table("daily_event_counts")
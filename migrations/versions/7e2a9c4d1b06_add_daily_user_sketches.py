@@ -0,0 +1,19 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "7e2a9c4d1b06"
+down_revision = "3c5f2b8d9e41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_user_sketches",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("registers", sa.LargeBinary(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("daily_user_sketches")
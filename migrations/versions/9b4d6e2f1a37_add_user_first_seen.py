@@ -0,0 +1,29 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "9b4d6e2f1a37"
+down_revision = "7e2a9c4d1b06"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_first_seen",
+        sa.Column("user_id", sa.Text(), primary_key=True),
+        sa.Column("first_seen_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("first_date", sa.Date(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO user_first_seen (user_id, first_seen_at, first_date) "
+        "SELECT user_id, MIN(occurred_at), MIN(occurred_at)::date "
+        "FROM events GROUP BY user_id"
+    )
+    op.create_index(
+        "ix_user_first_seen_first_date", "user_first_seen", ["first_date"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_first_seen_first_date", table_name="user_first_seen")
+    op.drop_table("user_first_seen")
@@ -0,0 +1,25 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "a7d3e5f91c28"
+down_revision = "e4b7c2a9f613"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_event_count_deltas",
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=True), primary_key=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("event_type", sa.Text(), nullable=False),
+        sa.Column("cnt", sa.BigInteger(), nullable=False),
+    )
+    op.create_index(
+        "ix_daily_event_count_deltas_day", "daily_event_count_deltas", ["day"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_daily_event_count_deltas_day", table_name="daily_event_count_deltas")
+    op.drop_table("daily_event_count_deltas")
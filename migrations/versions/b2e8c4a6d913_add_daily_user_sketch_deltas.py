@@ -0,0 +1,24 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "b2e8c4a6d913"
+down_revision = "a7d3e5f91c28"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_user_sketch_deltas",
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=True), primary_key=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=False),
+    )
+    op.create_index(
+        "ix_daily_user_sketch_deltas_day", "daily_user_sketch_deltas", ["day"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_daily_user_sketch_deltas_day", table_name="daily_user_sketch_deltas")
+    op.drop_table("daily_user_sketch_deltas")
@@ -0,0 +1,103 @@
+"""
+Range-partition events on occurred_at.
+
+The partition interval comes from EVENTS_PARTITION_INTERVAL at upgrade
+time. Existing rows are copied into one partition per period from the
+oldest event up to EVENTS_PARTITIONS_AHEAD periods past today; later
+periods are created by `python -m app.cli.partitions ensure`.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import get_settings
+
+revision = "c81f3a5d7e20"
+down_revision = "9b4d6e2f1a37"
+branch_labels = None
+depends_on = None
+
+
+def _next(d: date, interval: str) -> date:
+    if interval == "day":
+        return d + timedelta(days=1)
+    return (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def upgrade() -> None:
+    settings = get_settings()
+    interval = settings.EVENTS_PARTITION_INTERVAL
+    if interval not in ("month", "day"):
+        raise ValueError(f"Unknown EVENTS_PARTITION_INTERVAL={interval!r}")
+
+    bind = op.get_bind()
+    today = datetime.now(timezone.utc).date()
+    oldest = bind.execute(sa.text(
+        "SELECT (MIN(occurred_at) AT TIME ZONE 'UTC')::date FROM events"
+    )).scalar() or today
+
+    op.execute("ALTER TABLE events RENAME TO events_unpartitioned")
+    op.execute("""
+        CREATE TABLE events (
+            event_id uuid NOT NULL,
+            occurred_at timestamptz NOT NULL,
+            user_id text NOT NULL,
+            event_type text NOT NULL,
+            properties jsonb
+        ) PARTITION BY RANGE (occurred_at)
+    """)
+    op.execute("CREATE TABLE events_default PARTITION OF events DEFAULT")
+
+    start = oldest if interval == "day" else oldest.replace(day=1)
+    last = today
+    for _ in range(settings.EVENTS_PARTITIONS_AHEAD):
+        last = _next(last, interval)
+    while start <= last:
+        end = _next(start, interval)
+        fmt = "%Y_%m" if interval == "month" else "%Y_%m_%d"
+        op.execute(
+            f"CREATE TABLE events_p{start.strftime(fmt)} PARTITION OF events "
+            f"FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')"
+        )
+        start = end
+
+    op.execute(
+        "INSERT INTO events (event_id, occurred_at, user_id, event_type, properties) "
+        "SELECT event_id, occurred_at, user_id, event_type, properties "
+        "FROM events_unpartitioned"
+    )
+    op.create_table(
+        "event_ids",
+        sa.Column("event_id", sa.dialects.postgresql.UUID(as_uuid=True), primary_key=True),
+    )
+    op.execute("INSERT INTO event_ids (event_id) SELECT event_id FROM events_unpartitioned")
+    op.execute("DROP TABLE events_unpartitioned")
+
+    # indexes after the copy; on the parent they cascade to every partition
+    op.execute("ALTER TABLE events ADD PRIMARY KEY (event_id, occurred_at)")
+    op.create_index("ix_events_occurred_at", "events", ["occurred_at"])
+    op.create_index("ix_events_user_id", "events", ["user_id"])
+    op.create_index("ix_events_event_type", "events", ["event_type"])
+    op.execute("CREATE INDEX ix_events_occurred_at_brin ON events USING BRIN (occurred_at)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE events RENAME TO events_partitioned")
+    op.execute("""
+        CREATE TABLE events (
+            event_id uuid NOT NULL,
+            occurred_at timestamptz NOT NULL,
+            user_id text NOT NULL,
+            event_type text NOT NULL,
+            properties jsonb
+        )
+    """)
+    op.execute("INSERT INTO events SELECT * FROM events_partitioned")
+    op.execute("DROP TABLE events_partitioned")
+    op.drop_table("event_ids")
+    op.execute("ALTER TABLE events ADD PRIMARY KEY (event_id)")
+    op.execute("CREATE INDEX ix_events_occurred_at_brin ON events USING BRIN (occurred_at)")
+    op.create_index("ix_events_occurred_at", "events", ["occurred_at"])
+    op.create_index("ix_events_event_type", "events", ["event_type"])
+    op.create_index("ix_events_user_id", "events", ["user_id"])
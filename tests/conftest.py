@@ -1,8 +1,17 @@
+import asyncio
+import json
+import sys
+import uuid
+from datetime import date, datetime, time, timezone
 import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from app.api.schemas import EventIn
 from app.db.session import AsyncSessionLocal
+from app.services.stats_cache import get_stats_cache, get_version_map
+
+EVENT_DAY = date(2025, 10, 20)
 
 
 @pytest_asyncio.fixture
@@ -13,5 +22,60 @@ async def db() -> AsyncSession:
 
 @pytest_asyncio.fixture(autouse=True)
 async def clean_db(db: AsyncSession):
-    await db.execute(text("TRUNCATE TABLE events"))
+    await db.execute(text(
+        "TRUNCATE TABLE events, event_ids, daily_event_counts, daily_event_count_deltas, "
+        "daily_active_users, rollup_coverage, daily_user_sketches, daily_user_sketch_deltas, "
+        "user_first_seen, day_versions"
+    ))
     await db.commit()
+    get_stats_cache().clear()
+    get_version_map().invalidate()
+
+
+@pytest.fixture
+def make_event():
+    """
+    Event factory: u1 logs in at noon on EVENT_DAY unless told otherwise.
+    day is a date or a day of EVENT_DAY's month; as_json gives the body
+    a client would send instead of an EventIn.
+    """
+    def make(day=EVENT_DAY, user_id="u1", event_type="login", event_id=None, *,
+             hour=12, properties=None, as_json=False):
+        if isinstance(day, int):
+            day = EVENT_DAY.replace(day=day)
+        event = EventIn(
+            event_id=event_id or uuid.uuid4(),
+            occurred_at=datetime.combine(day, time(hour), tzinfo=timezone.utc),
+            user_id=user_id,
+            event_type=event_type,
+            properties=properties,
+        )
+        return event.model_dump(mode="json") if as_json else event
+    return make
+
+
+_WRITER = """
+import asyncio, json, sys
+from app.api.schemas import events_batch_adapter
+from app.db.session import AsyncSessionLocal
+from app.services.events_dao import insert_events_idempotent
+
+async def main():
+    async with AsyncSessionLocal() as session:
+        await insert_events_idempotent(session, events_batch_adapter.validate_json(sys.stdin.read()))
+        await session.commit()
+
+asyncio.run(main())
+"""
+
+
+@pytest.fixture
+def write_elsewhere():
+    """Ingests a JSON batch from another process, like a second worker would."""
+    async def write(batch: list) -> None:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", _WRITER, stdin=asyncio.subprocess.PIPE,
+        )
+        await proc.communicate(json.dumps(batch).encode())
+        assert proc.returncode == 0
+    return write
@@ -0,0 +1,20 @@
+from tools.bench_suite import compare
+
+
+def _doc(**values):
+    better = {"rps": "higher", "p99": "lower"}
+    return {"results": {
+        k: {"value": v, "unit": "", "better": better[k]} for k, v in values.items()
+    }}
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    rows = {r[0]: r for r in compare(_doc(rps=100, p99=10), _doc(rps=80, p99=9), 0.15)}
+    assert rows["rps"][4] and not rows["p99"][4]
+
+    rows = {r[0]: r for r in compare(_doc(rps=100, p99=10), _doc(rps=120, p99=12), 0.15)}
+    assert not rows["rps"][4] and rows["p99"][4]
+    assert rows["p99"][3] == 0.2
+
+    # metrics only in one file are not compared
+    assert [r[0] for r in compare(_doc(rps=1), _doc(rps=1, p99=1), 0.15)] == ["rps"]
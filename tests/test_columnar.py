@@ -0,0 +1,98 @@
+import json
+import uuid
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas import EventIn
+from app.cli import columnar, export_events, import_events
+from app.services.events_dao import insert_events_idempotent
+
+
+def test_parse_record_batch_matches_csv_rules():
+    ids = [str(uuid.uuid4()) for _ in range(6)]
+    batch = pa.record_batch({
+        "event_id": ids[:5] + ["nope"],
+        "occurred_at": pa.array([datetime(2025, 10, 20, 10, i) for i in range(6)],
+                                pa.timestamp("us")),
+        "user_id": [" u1 ", "u2", "   ", "u4", "u5", "u6"],
+        "event_type": ["login"] * 6,
+        "properties_json": ['{"a": 1}', None, "{}", "[1, 2]", "not json", "{}"],
+    })
+    events, invalid = columnar.parse_record_batch(batch)
+    assert invalid == 2
+    assert [e.user_id for e in events] == ["u1", "u2", "u4", "u5"]
+    assert events[0].occurred_at == datetime(2025, 10, 20, 10, 0, tzinfo=timezone.utc)
+    assert events[0].event_id == uuid.UUID(ids[0])
+    assert [e.properties_json for e in events] == [
+        '{"a": 1}', "{}", '{"_value": [1, 2]}', '{"_raw": "not json"}',
+    ]
+
+    # all objects: the vectorised check passes values through untouched
+    ok = batch.set_column(4, "properties_json", pa.array(['{"a": 1}', " {} "] + ["{}"] * 4))
+    events, _ = columnar.parse_record_batch(ok)
+    assert events[1].properties_json == " {} "
+
+
+def _events():
+    return [
+        EventIn(
+            event_id=uuid.uuid4(),
+            occurred_at=datetime(2025, 10, 20, 10, i, 30, 123456, tzinfo=timezone.utc),
+            user_id=f"u{i % 3}",
+            event_type="view",
+            properties={"i": i, "nested": {"x": [1, "two"]}} if i % 4 else None,
+        )
+        for i in range(25)
+    ]
+
+
+async def _snapshot(db: AsyncSession):
+    rows = (await db.execute(text(
+        "SELECT event_id, occurred_at, user_id, event_type, properties "
+        "FROM events ORDER BY event_id"
+    ))).all()
+    return [tuple(r) for r in rows]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+async def test_columnar_export_import_round_trip(db: AsyncSession, tmp_path, suffix):
+    await insert_events_idempotent(db, _events())
+    await db.commit()
+    before = await _snapshot(db)
+
+    path = str(tmp_path / f"events{suffix}")
+    n = await export_events._run(path, date(2025, 10, 20), date(2025, 10, 20), chunk_rows=10)
+    assert n == 25
+    if suffix == ".parquet":
+        assert pq.ParquetFile(path).num_row_groups == 3
+
+    await db.execute(text("TRUNCATE TABLE events, event_ids"))
+    await db.commit()
+    p = await import_events._run(path, 7, False, workers=0)
+    assert (p.total_read, p.total_accepted, p.total_skipped) == (25, 25, 0)
+    assert await _snapshot(db) == before
+
+
+def test_resume_skips_whole_row_groups(tmp_path):
+    path = str(tmp_path / "events.parquet")
+    table = pa.table({
+        "event_id": [str(uuid.uuid4()) for _ in range(10)],
+        "occurred_at": ["2025-10-20T10:00:00Z"] * 10,
+        "user_id": [f"u{i}" for i in range(10)],
+        "event_type": ["x"] * 10,
+        "properties": pa.array([{"i": i} for i in range(10)]),
+    })
+    pq.write_table(table, path, row_group_size=4)
+
+    batches = list(columnar.iter_record_batches(path, "parquet", 3, start_rows=5))
+    assert [b.num_rows for b, _ in batches] == [3, 2]
+    assert [m.rows for _, m in batches] == [8, 10]
+    events, invalid = columnar.parse_record_batch(batches[0][0])
+    assert invalid == 0
+    assert [e.user_id for e in events] == ["u5", "u6", "u7"]
+    assert json.loads(events[0].properties_json) == {"i": 5}
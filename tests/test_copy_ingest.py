@@ -0,0 +1,56 @@
+import uuid
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.events_dao import insert_events_idempotent
+
+
+@pytest.fixture
+def copy_engine(monkeypatch):
+    monkeypatch.setattr(get_settings(), "INGEST_ENGINE", "copy")
+
+
+@pytest.mark.asyncio
+async def test_copy_engine_idempotent(db: AsyncSession, copy_engine, make_event):
+    batch = [make_event(hour=9), make_event(hour=10, properties={"amount": 9.99})]
+
+    assert await insert_events_idempotent(db, batch) == (2, 0)
+    await db.commit()
+    assert await insert_events_idempotent(db, batch) == (0, 2)
+    await db.commit()
+
+    props = (await db.execute(
+        text("SELECT properties FROM events WHERE event_id = :id"),
+        {"id": batch[1].event_id},
+    )).scalar_one()
+    assert props == {"amount": 9.99}
+
+
+@pytest.mark.asyncio
+async def test_copy_engine_duplicates_and_repeated_calls_in_one_tx(
+    db: AsyncSession, copy_engine, make_event
+):
+    eid = uuid.uuid4()
+    assert await insert_events_idempotent(
+        db, [make_event(event_id=eid, hour=11), make_event(user_id="u2", event_id=eid)]
+    ) == (1, 1)
+    # second call in the same transaction must not see the staged rows again
+    assert await insert_events_idempotent(db, [make_event(hour=13)]) == (1, 0)
+    await db.commit()
+
+    total = (await db.execute(text("SELECT count(*) FROM events"))).scalar_one()
+    assert total == 2
+
+
+@pytest.mark.asyncio
+async def test_engines_agree(db: AsyncSession, monkeypatch, make_event):
+    seen = make_event(hour=8)
+    monkeypatch.setattr(get_settings(), "INGEST_ENGINE", "values")
+    assert await insert_events_idempotent(db, [seen]) == (1, 0)
+    await db.commit()
+
+    monkeypatch.setattr(get_settings(), "INGEST_ENGINE", "copy")
+    assert await insert_events_idempotent(db, [seen, make_event(hour=9)]) == (1, 1)
+    await db.commit()
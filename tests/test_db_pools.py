@@ -0,0 +1,87 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import event, exc, text
+
+from app.core.config import Settings, get_settings
+from app.db.session import make_engine
+from app.observability.metrics import REGISTRY
+
+
+def _sample(name: str, pool: str) -> float:
+    return REGISTRY.get_sample_value(name, {"pool": pool}) or 0.0
+
+
+def test_analytics_url_follows_replica_settings():
+    s = Settings(POSTGRES_HOST="primary", POSTGRES_REPLICA_HOST="")
+    assert s.ANALYTICS_DATABASE_URL == s.DATABASE_URL
+    s = Settings(POSTGRES_HOST="primary", POSTGRES_REPLICA_HOST="replica", POSTGRES_REPLICA_PORT=5433)
+    assert "@replica:5433/" in s.ANALYTICS_DATABASE_URL
+    assert "@primary:" in s.DATABASE_URL
+
+
+@pytest.mark.asyncio
+async def test_busy_analytics_pool_does_not_starve_ingest():
+    url = get_settings().DATABASE_URL
+    analytics = make_engine("t-analytics", url, 1, 0, 0.2, null_pool=False)
+    ingest = make_engine("t-ingest", url, 1, 0, 5.0, null_pool=False)
+    timeouts = _sample("db_pool_checkout_timeouts_total", "t-analytics")
+    try:
+        async with analytics.connect() as slow:
+            await slow.execute(text("SELECT 1"))
+            assert _sample("db_pool_connections_in_use", "t-analytics") == 1
+            assert _sample("db_pool_size", "t-analytics") == 1
+
+            # the analytics pool is exhausted ...
+            with pytest.raises(exc.TimeoutError):
+                async with analytics.connect():
+                    pass
+            # ... while ingest still gets a connection straight away
+            async with ingest.connect() as conn:
+                assert (await conn.execute(text("SELECT 1"))).scalar_one() == 1
+
+        assert _sample("db_pool_checkout_timeouts_total", "t-analytics") == timeouts + 1
+        assert _sample("db_pool_connections_in_use", "t-analytics") == 0
+        assert _sample("db_pool_checkout_seconds_count", "t-analytics") >= 2
+        assert _sample("db_pool_checkout_seconds_count", "t-ingest") >= 1
+
+        # overflow connections are counted separately from pool_size
+        burst = make_engine("t-burst", url, 1, 2, 1.0, null_pool=False)
+        try:
+            conns = [await burst.connect() for _ in range(3)]
+            assert _sample("db_pool_overflow_connections", "t-burst") == 2
+            await asyncio.gather(*(c.close() for c in conns))
+        finally:
+            await burst.dispose()
+    finally:
+        await analytics.dispose()
+        await ingest.dispose()
+
+
+@pytest.mark.asyncio
+async def test_checkout_time_is_only_the_wait_for_a_slot():
+    pool = make_engine("t-wait", get_settings().DATABASE_URL, 1, 0, 5.0, null_pool=False)
+
+    @event.listens_for(pool.sync_engine, "connect")
+    def slow_connect(dbapi_connection, record):
+        time.sleep(0.3)
+
+    try:
+        # a new connection is slow to open, but nobody waited for a slot
+        async with pool.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        assert _sample("db_pool_checkout_seconds_sum", "t-wait") < 0.1
+
+        held = await pool.connect()
+
+        async def release():
+            await asyncio.sleep(0.2)
+            await held.close()
+
+        task = asyncio.create_task(release())
+        async with pool.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await task
+        assert _sample("db_pool_checkout_seconds_sum", "t-wait") >= 0.15
+    finally:
+        await pool.dispose()
@@ -0,0 +1,119 @@
+import asyncio
+import gzip
+import json
+import sys
+import uuid
+import pytest
+import httpx
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.main import app
+from app.api.schemas import EventIn
+from app.cli import export_events, import_events
+from app.services.events_dao import insert_events_idempotent
+
+
+def _events():
+    return [
+        EventIn(
+            event_id=uuid.uuid4(),
+            occurred_at=datetime(2025, 10, 19 + i % 3, 10, i, tzinfo=timezone.utc),
+            user_id=f"u{i}" if i % 4 else 'user, "quoted"\nлінія',
+            event_type="login" if i % 2 else "purchase",
+            properties={"i": i, "s": "a,b\n\"c\""} if i % 5 else None,
+        )
+        for i in range(12)
+    ]
+
+
+async def _snapshot(db: AsyncSession):
+    rows = (await db.execute(text(
+        "SELECT event_id, occurred_at, user_id, event_type, properties "
+        "FROM events ORDER BY event_id"
+    ))).all()
+    return [tuple(r) for r in rows]
+
+
+async def _reset(db: AsyncSession):
+    await db.execute(text("TRUNCATE TABLE events, event_ids"))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_cli_export_round_trips_through_importer(db: AsyncSession, tmp_path):
+    await insert_events_idempotent(db, _events())
+    await db.commit()
+    before = await _snapshot(db)
+
+    csv_path = tmp_path / "out.csv"
+    n = await export_events._run(
+        str(csv_path), date(2025, 10, 19), date(2025, 10, 21), chunk_rows=5,
+    )
+    assert n == 12
+
+    gz_path = tmp_path / "login.ndjson.gz"
+    n = await export_events._run(
+        str(gz_path), date(2025, 10, 20), date(2025, 10, 20), event_type="login",
+    )
+    lines = gzip.decompress(gz_path.read_bytes()).decode().splitlines()
+    assert n == len(lines) == 2
+    assert {json.loads(x)["event_type"] for x in lines} == {"login"}
+
+    await _reset(db)
+    p = await import_events._run(str(csv_path), 100, False, workers=0)
+    assert (p.total_accepted, p.total_skipped) == (12, 0)
+    assert await _snapshot(db) == before
+
+
+@pytest.mark.asyncio
+async def test_cli_export_to_stdout_is_only_data(db: AsyncSession):
+    await insert_events_idempotent(db, _events())
+    await db.commit()
+
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "app.cli.export_events", "-",
+        "--from", "2025-10-19", "--to", "2025-10-21", "--gzip", "--chunk-rows", "5",
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await proc.communicate()
+    assert proc.returncode == 0, err
+    lines = gzip.decompress(out).decode().splitlines()
+    assert sorted(json.loads(x)["event_id"] for x in lines) == sorted(
+        str(r[0]) for r in await _snapshot(db)
+    )
+    assert b"export_complete" in err
+
+
+@pytest.mark.asyncio
+async def test_http_export_ndjson_round_trips_through_stream(db: AsyncSession):
+    await insert_events_idempotent(db, _events())
+    await db.commit()
+    before = await _snapshot(db)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t",
+    ) as client:
+        r = await client.get("/events/export",
+                             params={"from": "2025-10-19", "to": "2025-10-21"})
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/x-ndjson"
+        body = r.content
+        stamps = [json.loads(x)["occurred_at"] for x in body.splitlines()]
+        assert len(stamps) == 12 and stamps == sorted(stamps)
+
+        r = await client.get("/events/export", params={
+            "from": "2025-10-19", "to": "2025-10-19", "format": "csv",
+        })
+        assert r.headers["content-type"].startswith("text/csv")
+        assert r.text.startswith("event_id,occurred_at,user_id,event_type,properties_json\r\n")
+
+        r = await client.get("/events/export",
+                             params={"from": "2025-10-20", "to": "2025-10-19"})
+        assert r.status_code == 422
+
+        await _reset(db)
+        r = await client.post("/events/stream", content=body)
+        assert r.json()["accepted"] == 12
+    assert await _snapshot(db) == before
@@ -0,0 +1,98 @@
+import pytest
+import httpx
+from fastapi import FastAPI
+
+from app.api.main import app
+from app.api.schemas import EventsBatchIn
+
+
+def _reference_app() -> FastAPI:
+    # what FastAPI itself answers for a declared body parameter
+    ref = FastAPI()
+
+    @ref.post("/events", status_code=202)
+    async def ingest(batch: EventsBatchIn):
+        return {"accepted": len(batch), "skipped": 0}
+
+    return ref
+
+
+BAD_BODIES = [
+    b"",
+    b"{not json",
+    b'[{"event_id": 1,',
+    b"\xff\xfe",
+    b'{"event_id": "x"}',
+    b"null",
+    b'[{"user_id": "u1"}]',
+    b"\x80[]",
+]
+
+
+@pytest.mark.asyncio
+async def test_ingest_errors_match_fastapi(make_event):
+    bodies = list(BAD_BODIES)
+    bodies.append(httpx.Request("POST", "/", json=[
+        make_event(as_json=True),
+        {**make_event(as_json=True), "event_id": "nope", "user_id": "  "},
+        {**make_event(as_json=True), "occurred_at": "later"},
+    ]).read())
+
+    ours = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t")
+    ref = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=_reference_app()), base_url="http://t",
+    )
+    async with ours, ref:
+        cases = [(b, "application/json") for b in bodies]
+        cases.append((bodies[-1], "text/plain"))
+        for body, ctype in cases:
+            headers = {"content-type": ctype}
+            r1 = await ours.post("/events", content=body, headers=headers)
+            r2 = await ref.post("/events", content=body, headers=headers)
+            assert r1.status_code == r2.status_code != 202, body
+            assert r1.json() == r2.json(), body
+
+        r = await ours.post("/events", json=[])
+        assert r.status_code == 422
+        assert r.json() == {"detail": "Empty batch"}
+
+
+@pytest.mark.asyncio
+async def test_ingest_too_large_and_accepted(monkeypatch, make_event):
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "MAX_BATCH_SIZE", 2)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t",
+    ) as client:
+        r = await client.post("/events", json=[make_event(as_json=True) for _ in range(3)])
+        assert r.status_code == 413
+        assert r.json() == {"detail": "Batch too large. MAX_BATCH_SIZE=2"}
+
+        r = await client.post("/events", json=[
+            make_event(as_json=True), make_event(user_id="u2", as_json=True),
+        ])
+        assert r.status_code == 202
+        assert r.json() == {"accepted": 2, "skipped": 0}
+
+        r = await client.get("/stats/retention", params={"start_date": "2025-10-20"})
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/json"
+        assert r.json() == {
+            "cohort_size": 2,
+            "windows": [
+                {"day": 0, "count": 2, "rate": 1.0},
+                {"day": 1, "count": 0, "rate": 0.0},
+                {"day": 2, "count": 0, "rate": 0.0},
+                {"day": 3, "count": 0, "rate": 0.0},
+            ],
+        }
+        r = await client.get("/stats/unique-users",
+                             params={"from": "2025-10-20", "to": "2025-10-20"})
+        assert r.json() == {
+            "date_from": "2025-10-20", "date_to": "2025-10-20", "unique_users": 2,
+        }
+        assert "etag" in r.headers
+
+    schema = app.openapi()["paths"]["/events"]["post"]["requestBody"]
+    assert schema["content"]["application/json"]["schema"]["type"] == "array"
@@ -0,0 +1,71 @@
+import json
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas import EventIn
+from app.services.rollups_dao import maintained_since
+from tools.gen_events import Profile, copy_to_db, generate_day
+
+START = date(2025, 3, 1)
+
+
+def _profile(**overrides) -> Profile:
+    values = dict(
+        seed=7, start=START, days=4, new_users=200, day1_retention=0.4, decay=0.5,
+        weekend_factor=1.0, events_per_user=5.0, zipf=0.8, engagement_skew=2.0,
+        dup_rate=0.0, late_rate=0.0, late_max_days=2, user_prefix="g-",
+        fmt="ndjson", compress=0,
+    )
+    values.update(overrides)
+    return Profile(**values)
+
+
+def test_day_shards_are_deterministic_valid_events():
+    p = _profile(dup_rate=0.05, late_rate=0.1)
+    shard = generate_day(p, 3)
+    assert shard.data == generate_day(p, 3).data
+    assert shard.data != generate_day(_profile(seed=8, dup_rate=0.05, late_rate=0.1), 3).data
+
+    events = [EventIn(**json.loads(line)) for line in shard.data.decode().splitlines()]
+    assert len(events) == shard.rows
+    ids = [e.event_id for e in events]
+    assert len(ids) - len(set(ids)) == shard.duplicates > 0
+    late = [e for e in events[:shard.rows - shard.duplicates] if e.occurred_at.date() < date(2025, 3, 4)]
+    assert len(late) == shard.late > 0
+    # only day 0 cohorts sign up on their own day
+    assert {e.user_id.split("-")[1] for e in events if e.event_type == "signup"} == {"u3"}
+
+
+@pytest.mark.asyncio
+async def test_copy_loads_cohorts_with_decaying_retention(db: AsyncSession):
+    p = _profile(fmt="copy")
+    shards = await copy_to_db(p, workers=1)
+
+    total = (await db.execute(text("SELECT count(*) FROM events"))).scalar_one()
+    assert total == sum(s.rows for s in shards)
+    assert (await db.execute(text("SELECT count(*) FROM event_ids"))).scalar_one() == total
+
+    # the day-0 cohort: everyone on day 0, then about 40% and fewer
+    active = (await db.execute(text("""
+        SELECT occurred_at::date, count(DISTINCT user_id) FROM events
+        WHERE user_id LIKE 'g-u0-%' GROUP BY 1 ORDER BY 1
+    """))).all()
+    counts = [n for _, n in active]
+    assert counts[0] == 200
+    assert 60 <= counts[1] <= 100
+    assert counts[1] > counts[3]
+    covered = (await db.execute(text("SELECT count(*) FROM rollup_coverage"))).scalar_one()
+    assert covered == 4
+    first_seen = (await db.execute(text("SELECT count(*) FROM user_first_seen"))).scalar_one()
+    assert first_seen == (await db.execute(text("SELECT count(DISTINCT user_id) FROM events"))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_copy_without_rebuild_refuses_maintained_days(db: AsyncSession):
+    since = await maintained_since(db)
+    p = _profile(fmt="copy", start=since - timedelta(days=1), days=2)
+    with pytest.raises(ValueError, match="maintained"):
+        await copy_to_db(p, workers=1, rebuild=False)
+    assert (await db.execute(text("SELECT count(*) FROM events"))).scalar_one() == 0
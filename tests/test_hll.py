@@ -0,0 +1,105 @@
+import random
+import pytest
+from datetime import date, timedelta
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.main import app
+from app.services.events_dao import insert_events_idempotent
+from app.services.hll import RELATIVE_ERROR, HyperLogLog, merge_all, rolling_merge
+from app.services.rollup_folder import RollupFolder
+from app.services.rollups_dao import rebuild_rollups
+from app.services.sketches_dao import load_sketches
+from app.services.stats_dao import get_rolling_unique_users, get_unique_users
+
+D_FROM = date(2025, 10, 1)
+
+
+@pytest.mark.parametrize("n", [0, 1, 100, 5_000, 50_000, 200_000])
+def test_estimate_within_error_bound(n):
+    h = HyperLogLog.of(f"user-{i}" for i in range(n))
+    assert abs(h.estimate() - n) <= max(1, 3 * RELATIVE_ERROR * n)
+
+
+def test_merge_and_rolling_match_union():
+    rnd = random.Random(7)
+    days = [{f"u{rnd.randrange(20_000)}" for _ in range(3_000)} for _ in range(12)]
+    sketches = [HyperLogLog.of(d) for d in days]
+
+    union = set().union(*days)
+    assert merge_all(sketches) == HyperLogLog.of(union)
+    assert sketches[0].copy().merge(sketches[1]) == HyperLogLog.of(days[0] | days[1])
+
+    rolled = rolling_merge(sketches, 5)
+    assert len(rolled) == len(days) - 4
+    for i, sk in enumerate(rolled):
+        assert sk == HyperLogLog.of(set().union(*days[i:i + 5]))
+
+    with pytest.raises(ValueError):
+        HyperLogLog(b"\x00" * 10)
+
+
+@pytest.mark.asyncio
+async def test_stored_sketches_and_endpoints(db: AsyncSession, make_event):
+    rnd = random.Random(11)
+    active = {}
+    batch = []
+    for i in range(10):
+        day = D_FROM + timedelta(days=i)
+        active[day] = {f"u{rnd.randrange(3_000)}" for _ in range(800)}
+        batch += [make_event(day, u) for u in active[day]]
+    for i in range(0, len(batch), 1000):
+        await insert_events_idempotent(db, batch[i:i + 1000])
+    await db.commit()
+
+    d_to = D_FROM + timedelta(days=9)
+    # uncovered days are sketched from raw events
+    raw = await load_sketches(db, D_FROM, d_to)
+    await rebuild_rollups(db, D_FROM, d_to)
+    await db.commit()
+    stored = await load_sketches(db, D_FROM, d_to)
+    assert stored == raw
+    assert stored == {d: HyperLogLog.of(u) for d, u in active.items()}
+
+    # ingest on a covered day keeps the stored sketch in step
+    late = D_FROM + timedelta(days=3)
+    await insert_events_idempotent(db, [make_event(late, "late-user")])
+    await db.commit()
+    active[late].add("late-user")
+    assert (await load_sketches(db, late, late))[late] == HyperLogLog.of(active[late])
+    # ... before and after its delta is folded
+    assert await RollupFolder(interval=0, batch=100).fold_once() == 1
+    assert (await load_sketches(db, late, late))[late] == HyperLogLog.of(active[late])
+    pending = await db.execute(text("SELECT count(*) FROM daily_user_sketch_deltas"))
+    assert pending.scalar_one() == 0
+
+    exact = len(set().union(*active.values()))
+    approx = await get_unique_users(db, D_FROM, d_to)
+    assert abs(approx - exact) <= 3 * RELATIVE_ERROR * exact
+
+    wau = dict(await get_rolling_unique_users(db, D_FROM, d_to, 7))
+    assert set(wau) == set(active)
+    last = set().union(*(active[D_FROM + timedelta(days=i)] for i in range(3, 10)))
+    assert abs(wau[d_to] - len(last)) <= 3 * RELATIVE_ERROR * len(last)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        params = {"from": D_FROM.isoformat(), "to": d_to.isoformat()}
+        exact_dau = (await client.get("/stats/dau", params=params)).json()
+        approx_dau = (await client.get(
+            "/stats/dau", params={**params, "approx": "true"}
+        )).json()
+        assert [r["date"] for r in approx_dau] == [r["date"] for r in exact_dau]
+        for e, a in zip(exact_dau, approx_dau):
+            n = e["unique_users"]
+            assert abs(a["unique_users"] - n) <= 3 * RELATIVE_ERROR * n
+
+        r = await client.get("/stats/unique-users", params=params)
+        assert r.status_code == 200, r.text
+        assert r.json()["unique_users"] == approx
+
+        for path in ("/stats/wau", "/stats/mau"):
+            r = await client.get(path, params=params)
+            assert r.status_code == 200, r.text
+            assert len(r.json()) == 10
@@ -1,4 +1,5 @@
 import uuid
+import pytest
 from datetime import datetime, timezone
 from app.api.schemas import EventIn
 from app.services.events_dao import insert_events_idempotent
@@ -55,3 +56,22 @@ async def test_insert_idempotent_duplicates_in_same_batch(db: AsyncSession):
     acc, skip = await insert_events_idempotent(db, [e1, e2])
     await db.commit()
     assert (acc, skip) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_values_batch_past_the_parameter_limit(db: AsyncSession, monkeypatch, make_event):
+    from sqlalchemy import text
+    from app.core.config import get_settings
+
+    # 5 columns x 8000 rows would exceed asyncpg's 32767 bind parameters
+    monkeypatch.setattr(get_settings(), "INGEST_ENGINE", "values")
+    batch = [make_event(properties={"n": i}) for i in range(8000)]
+    late_dup = make_event(event_id=batch[0].event_id, user_id="u2")
+    assert await insert_events_idempotent(db, batch + [late_dup]) == (8000, 1)
+    await db.commit()
+
+    # the first occurrence of an id wins; properties stay JSON objects
+    row = (await db.execute(text(
+        "SELECT user_id, properties->>'n' FROM events WHERE event_id = :id"
+    ), {"id": batch[0].event_id})).one()
+    assert tuple(row) == ("u1", "0")
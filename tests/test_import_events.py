@@ -0,0 +1,104 @@
+import csv
+import json
+import uuid
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cli.import_events import _run
+
+HEADER = ["event_id", "occurred_at", "user_id", "event_type", "properties_json"]
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        w.writerows(rows)
+
+
+def _rows(n, dup_every=0):
+    rows = []
+    for i in range(n):
+        eid = str(uuid.uuid4())
+        rows.append([eid, f"2025-10-20T10:{i % 60:02d}:00Z", f"u{i % 7}",
+                     "login", json.dumps({"i": i})])
+        if dup_every and i % dup_every == 0:
+            rows.append(list(rows[-1]))
+    return rows
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers,writers", [(0, 1), (2, 3)])
+async def test_import_pipeline_totals(db: AsyncSession, tmp_path, workers, writers):
+    path = tmp_path / "events.csv"
+    rows = _rows(50, dup_every=10)
+    rows.append(["not-a-uuid", "2025-10-20T10:00:00Z", "u1", "login", "{}"])
+    rows.append([str(uuid.uuid4()), "2025-10-20T10:00:00Z", "  ", "login", "{}"])
+    _write_csv(path, rows)
+
+    p = await _run(str(path), 7, False, workers=workers, writers=writers)
+    assert p.total_read == 57
+    assert (p.total_accepted, p.total_skipped) == (50, 7)
+
+    again = await _run(str(path), 7, False, workers=workers, writers=writers)
+    assert (again.total_accepted, again.total_skipped) == (0, 57)
+
+    total = (await db.execute(text("SELECT count(*) FROM events"))).scalar_one()
+    assert total == 50
+
+
+@pytest.mark.asyncio
+async def test_import_missing_columns(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("event_id,user_id\n1,u1\n", encoding="utf-8")
+    with pytest.raises(RuntimeError, match="missing required columns"):
+        await _run(str(path), 10, False, workers=0)
+
+
+@pytest.mark.asyncio
+async def test_import_resume_skips_committed_rows(db: AsyncSession, tmp_path, monkeypatch):
+    import app.cli.import_events as imp
+
+    path = tmp_path / "events.csv"
+    _write_csv(path, _rows(30))
+
+    real_write = imp._write_batch
+    calls = {"n": 0}
+
+    async def flaky_write(events, invalid):
+        calls["n"] += 1
+        if calls["n"] == 4:
+            raise ConnectionError("db went away")
+        return await real_write(events, invalid)
+
+    monkeypatch.setattr(imp, "_write_batch", flaky_write)
+    with pytest.raises(ConnectionError):
+        await _run(str(path), 5, False, workers=0, writers=1)
+    monkeypatch.setattr(imp, "_write_batch", real_write)
+
+    p = await _run(str(path), 5, False, workers=0, resume=True)
+    assert p.total_read == 15
+    assert (p.total_accepted, p.total_skipped) == (15, 0)
+
+    total = (await db.execute(text("SELECT count(*) FROM events"))).scalar_one()
+    assert total == 30
+
+    done = await _run(str(path), 5, False, workers=0, resume=True)
+    assert done.total_read == 0
+
+
+def test_checkpoint_only_advances_over_contiguous_batches(tmp_path):
+    from app.cli.checkpoint import (
+        BatchMark, Checkpoint, CheckpointTracker, load_checkpoint,
+    )
+
+    cp_path = str(tmp_path / "cp")
+    tracker = CheckpointTracker(cp_path, Checkpoint(identity="x"))
+
+    assert not tracker.mark_committed(BatchMark(1, 200, 20))
+    assert not tracker.mark_committed(BatchMark(2, 300, 30))
+    assert load_checkpoint(cp_path) is None
+
+    assert tracker.mark_committed(BatchMark(0, 100, 10))
+    assert load_checkpoint(cp_path) == Checkpoint(identity="x", offset=300, rows=30)
@@ -0,0 +1,53 @@
+import asyncio
+import uuid
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.ingest_batcher import IngestBatcher
+
+
+@pytest.mark.asyncio
+async def test_batcher_coalesces_and_attributes_counts(db: AsyncSession, make_event):
+    batcher = IngestBatcher(max_events=1000, max_delay=0.05, max_pending_events=1000)
+    await batcher.start()
+
+    known = make_event()
+    first = await batcher.submit([known])
+    assert first == (1, 0)
+
+    dup = uuid.uuid4()
+    batches = [
+        [make_event(), make_event()],
+        [known, make_event()],
+        [make_event(event_id=dup), make_event(user_id="u2", event_id=dup)],
+        [make_event(event_id=dup)],
+    ]
+    results = await asyncio.gather(*(batcher.submit(b) for b in batches))
+    await batcher.stop()
+
+    assert results == [(2, 0), (1, 1), (1, 1), (0, 1)]
+    total = (await db.execute(text("SELECT count(*) FROM events"))).scalar_one()
+    assert total == 5
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_by_size_and_on_stop(db: AsyncSession, make_event):
+    batcher = IngestBatcher(max_events=3, max_delay=60.0, max_pending_events=100)
+    await batcher.start()
+
+    # reaches max_events: flushed without waiting for the 60s deadline
+    full = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.submit([make_event(), make_event()]), batcher.submit([make_event()]),
+        ),
+        timeout=5,
+    )
+    assert full == [(2, 0), (1, 0)]
+
+    pending = asyncio.create_task(batcher.submit([make_event()]))
+    await asyncio.sleep(0.05)
+    assert not pending.done()
+    await batcher.stop()
+    assert await pending == (1, 0)
+    assert not batcher.running
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.ingest_spool import IngestSpool
+
+
+def _spool(root, drain=True):
+    return IngestSpool(
+        root=str(root),
+        segment_bytes=1024,
+        fsync_interval=0.001,
+        max_bytes=10 * 1024 * 1024,
+        drain_batch=50,
+        drain=drain,
+    )
+
+
+async def _count(db: AsyncSession) -> int:
+    n = (await db.execute(text("SELECT count(*) FROM events"))).scalar_one()
+    await db.commit()
+    return n
+
+
+async def _wait_drained(spool: IngestSpool, timeout=10.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while spool.lag_bytes() > 0:
+        assert loop.time() < deadline, "spool did not drain"
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_spool_appends_rotates_and_drains(db: AsyncSession, tmp_path, make_event):
+    spool = _spool(tmp_path)
+    await spool.start()
+
+    dup = make_event()
+    batches = [[make_event() for _ in range(5)] for _ in range(20)] + [[dup], [dup]]
+    await asyncio.gather(*(spool.append(b) for b in batches))
+
+    await _wait_drained(spool)
+    await spool.stop()
+
+    assert await _count(db) == 101
+    # drained sealed segments are removed; only the active one is left
+    segments = [f for f in os.listdir(spool.dir) if f.startswith("segment-")]
+    assert len(segments) == 1
+
+
+@pytest.mark.asyncio
+async def test_spool_replays_after_crash_with_torn_tail(db: AsyncSession, tmp_path, make_event):
+    crashed = _spool(tmp_path, drain=False)
+    await crashed.start()
+    for _ in range(10):
+        await crashed.append([make_event(), make_event()])
+    active = crashed._segment_path(crashed._active_seq)
+    await crashed.stop()
+
+    # half-written frame at the end of the segment
+    with open(active, "ab") as f:
+        f.write(b"\x40\x00\x00\x00garbage")
+    assert await _count(db) == 0
+
+    spool = _spool(tmp_path)
+    await spool.start()
+    await _wait_drained(spool)
+    await spool.stop()
+
+    assert await _count(db) == 20
+
+
+@pytest.mark.asyncio
+async def test_drain_batches_stop_at_frame_boundaries(
+    db: AsyncSession, tmp_path, monkeypatch, make_event
+):
+    from app.core.config import get_settings
+
+    # 4000-event frames against 5000-event drain batches: one frame each
+    monkeypatch.setattr(get_settings(), "INGEST_ENGINE", "values")
+    kwargs = dict(root=str(tmp_path), segment_bytes=64 * 1024 * 1024, fsync_interval=0.001,
+                  max_bytes=64 * 1024 * 1024, drain_batch=5000)
+    writer = IngestSpool(**kwargs, drain=False)
+    await writer.start()
+    for _ in range(2):
+        await writer.append([make_event() for _ in range(4000)])
+    await writer.stop()
+
+    spool = IngestSpool(**kwargs)
+    await spool.start()
+    await _wait_drained(spool)
+    await spool.stop()
+
+    assert await _count(db) == 8000
+
+
+@pytest.mark.asyncio
+async def test_orphan_slot_is_drained(db: AsyncSession, tmp_path, make_event):
+    # two workers spooled, then the service came back with one
+    first, second = _spool(tmp_path, drain=False), _spool(tmp_path, drain=False)
+    await first.start()
+    await second.start()
+    for _ in range(6):
+        await second.append([make_event(), make_event()])
+    assert second.lag_bytes() > 0
+    orphan = second.dir
+    await first.stop()
+    await second.stop()
+
+    spool = _spool(tmp_path)
+    await spool.start()
+    assert spool.dir != orphan
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + 10.0
+    while await _count(db) < 12:
+        assert loop.time() < deadline, "orphan slot was not drained"
+        await asyncio.sleep(0.05)
+    await spool.stop()
+
+    assert not [f for f in os.listdir(orphan) if f.startswith("segment-")]
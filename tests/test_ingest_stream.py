@@ -0,0 +1,86 @@
+import gzip
+import json
+import uuid
+import pytest
+import httpx
+from sqlalchemy import text
+
+from app.api.main import app
+from app.core.config import get_settings
+
+
+def _line(**over) -> bytes:
+    e = {
+        "event_id": str(uuid.uuid4()),
+        "occurred_at": "2025-10-20T10:00:00Z",
+        "user_id": "u1",
+        "event_type": "login",
+        "properties": {"k": 1},
+    }
+    e.update(over)
+    return json.dumps(e).encode()
+
+
+async def _chunked(data: bytes, size: int = 7):
+    # split mid-line to exercise incremental parsing
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.mark.asyncio
+async def test_stream_ingest_counts_and_line_errors(db, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "INGEST_STREAM_BATCH", 2)
+    monkeypatch.setattr(settings, "INGEST_STREAM_MAX_LINE_BYTES", 300)
+    monkeypatch.setattr(settings, "INGEST_STREAM_MAX_ERRORS", 2)
+
+    dup = str(uuid.uuid4())
+    body = b"\n".join([
+        _line(event_id=dup),
+        _line(),
+        b"",
+        b"{broken",
+        _line(event_id=dup, user_id="u2"),
+        _line(user_id="x" * 400),
+        _line(event_id="nope"),
+        _line(user_id="u3"),
+    ]) + b"\n"
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t",
+    ) as client:
+        r = await client.post(
+            "/events/stream", content=_chunked(body),
+            headers={"content-type": "application/x-ndjson"},
+        )
+        assert r.status_code == 202
+        res = r.json()
+        assert (res["accepted"], res["skipped"], res["invalid"]) == (3, 1, 3)
+        assert [e["line"] for e in res["errors"]] == [4, 6]
+        assert "longer than 300 bytes" in res["errors"][1]["error"]
+
+        n = (await db.execute(text("SELECT count(*) FROM events"))).scalar_one()
+        assert n == 3
+
+        # gzip, two concatenated members, no trailing newline
+        gz = gzip.compress(_line(user_id="g1") + b"\n") + gzip.compress(_line(user_id="g2"))
+        r = await client.post(
+            "/events/stream", content=_chunked(gz, 5),
+            headers={"content-encoding": "gzip"},
+        )
+        assert r.json() == {"accepted": 2, "skipped": 0, "invalid": 0, "errors": []}
+
+        # a corrupt tail keeps what was decoded before it
+        bad = gzip.compress(_line(user_id="g3") + b"\n" + _line(user_id="g4") + b"\n")
+        r = await client.post(
+            "/events/stream", content=bad[:-6],
+            headers={"content-encoding": "gzip"},
+        )
+        res = r.json()
+        assert (res["accepted"], res["invalid"]) == (2, 1)
+        assert "gzip" in res["errors"][0]["error"]
+
+        r = await client.post(
+            "/events/stream", content=b"x", headers={"content-encoding": "br"},
+        )
+        assert r.status_code == 415
@@ -42,3 +42,29 @@ async def test_ingest_then_dau():
         )
         assert r2.status_code == 200, r2.text
         assert r2.json() == [{"date":"2025-10-20","unique_users":2}]
+
+
+@pytest.mark.asyncio
+async def test_days_are_utc_whatever_the_server_timezone(db, make_event):
+    from datetime import date
+    from sqlalchemy import text
+    from app.core.config import get_settings
+    from app.db.session import AsyncSessionLocal
+    from app.services.events_dao import insert_events_idempotent
+    from app.services.stats_dao import get_dau, get_dau_raw
+
+    database = get_settings().POSTGRES_DB
+    await db.execute(text(f"ALTER DATABASE {database} SET timezone = 'America/New_York'"))
+    await db.commit()
+    try:
+        async with AsyncSessionLocal() as s:
+            assert (await s.execute(text("SHOW timezone"))).scalar_one() == "UTC"
+            # 22:00 on the 20th in New York
+            await insert_events_idempotent(s, [make_event(21, hour=2)])
+            await s.commit()
+            expected = [(date(2025, 10, 21), 1)]
+            assert await get_dau_raw(s, date(2025, 10, 20), date(2025, 10, 21)) == expected
+            assert await get_dau(s, date(2025, 10, 20), date(2025, 10, 21)) == expected
+    finally:
+        await db.execute(text(f"ALTER DATABASE {database} RESET timezone"))
+        await db.commit()
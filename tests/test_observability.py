@@ -0,0 +1,88 @@
+import uuid
+import pytest
+import httpx
+
+from app.api.main import app
+from app.api.middleware import UNMATCHED_ROUTE
+from app.observability.metrics import REGISTRY
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_request_id_and_route_template_labels():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        before = _sample("http_requests_total", method="GET", path="/healthz", status="200")
+        rid = str(uuid.uuid4())
+        r = await client.get("/healthz", headers={"X-Request-ID": rid})
+        assert r.headers["x-request-id"] == rid
+        assert _sample(
+            "http_requests_total", method="GET", path="/healthz", status="200"
+        ) == before + 1
+        assert _sample(
+            "http_request_duration_seconds_count", method="GET", route="/healthz"
+        ) >= 1
+
+        # invalid incoming ids are replaced
+        r = await client.get("/healthz", headers={"X-Request-ID": "not-a-uuid"})
+        assert uuid.UUID(r.headers["x-request-id"])
+
+        # validation errors still resolve to the route template
+        r = await client.get("/stats/dau", params={"from": "x", "to": "y"})
+        assert r.status_code == 422
+        assert _sample(
+            "http_requests_total", method="GET", path="/stats/dau", status="422"
+        ) >= 1
+
+        unmatched = _sample(
+            "http_requests_total", method="GET", path=UNMATCHED_ROUTE, status="404"
+        )
+        for i in range(5):
+            r = await client.get(f"/wp-admin/{i}.php")
+            assert r.status_code == 404
+            assert "x-request-id" in r.headers
+        assert _sample(
+            "http_requests_total", method="GET", path=UNMATCHED_ROUTE, status="404"
+        ) == unmatched + 5
+        assert _sample(
+            "http_requests_total", method="GET", path="/wp-admin/0.php", status="404"
+        ) == 0
+
+
+@pytest.mark.asyncio
+async def test_ingest_stages_and_stats_queries_share_one_registry():
+    stages = ("body", "validate", "build", "execute", "commit")
+    before = {s: _sample("ingest_stage_seconds_count", stage=s) for s in stages}
+    batches = _sample("ingest_batch_events_count")
+    all_dupes = _sample("ingest_duplicate_ratio_bucket", le="0.0")
+    accepted = _sample("events_ingested_total", result="accepted")
+    dau_calls = _sample("stats_query_seconds_count", query="get_dau")
+
+    event = {
+        "event_id": str(uuid.uuid4()),
+        "occurred_at": "2025-02-01T10:00:00Z",
+        "user_id": "u1",
+        "event_type": "login",
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/events", json=[event, {**event, "event_id": str(uuid.uuid4())}])
+        assert r.json() == {"accepted": 2, "skipped": 0}
+        r = await client.post("/events", json=[event])
+        assert r.json() == {"accepted": 0, "skipped": 1}
+        r = await client.get("/stats/dau", params={"from": "2025-02-01", "to": "2025-02-01"})
+        assert r.json() == [{"date": "2025-02-01", "unique_users": 1}]
+        text = (await client.get("/metrics")).text
+
+    for s in stages:
+        assert _sample("ingest_stage_seconds_count", stage=s) == before[s] + 2
+    assert _sample("ingest_batch_events_count") == batches + 2
+    # one batch without duplicates, one made only of them
+    assert _sample("ingest_duplicate_ratio_bucket", le="0.0") == all_dupes + 1
+    assert _sample("events_ingested_total", result="accepted") == accepted + 2
+    assert _sample("stats_query_seconds_count", query="get_dau") == dau_calls + 1
+    assert _sample("stats_query_rows_sum", query="get_dau") >= 1
+    assert "events_ingested_total" in text and "ingest_stage_seconds_bucket" in text
@@ -0,0 +1,90 @@
+import uuid
+import pytest
+import httpx
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.main import app
+from app.api.schemas import EventIn
+from app.core.config import get_settings
+from app.services import parallel_stats
+from app.services.events_dao import insert_events_idempotent
+from app.services.stats_dao import get_dau_raw, get_top_events_raw
+
+START = date(2025, 1, 1)
+
+
+def test_split_range_covers_every_day_once():
+    chunks = parallel_stats.split_range(date(2025, 1, 1), date(2025, 3, 1), 31)
+    assert chunks == [
+        (date(2025, 1, 1), date(2025, 1, 31)),
+        (date(2025, 2, 1), date(2025, 3, 1)),
+    ]
+    assert parallel_stats.split_range(START, START, 7) == [(START, START)]
+
+
+def _events():
+    out = []
+    for day in range(60):
+        # "view" leads the first month, "click" the second; "login" is
+        # never first in a chunk but has the largest total
+        counts = {"view": 3, "login": 2} if day < 30 else {"click": 3, "login": 2}
+        for event_type, n in counts.items():
+            for i in range(n):
+                out.append(EventIn(
+                    event_id=uuid.uuid4(),
+                    occurred_at=datetime.combine(START + timedelta(days=day), datetime.min.time(),
+                                                 tzinfo=timezone.utc) + timedelta(hours=i),
+                    user_id=f"u{(day + i) % 7}",
+                    event_type=event_type,
+                ))
+    return out
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    s = get_settings()
+    monkeypatch.setattr(s, "ROLLUPS_ENABLED", False)
+    monkeypatch.setattr(s, "STATS_PARALLEL_ENABLED", True)
+    monkeypatch.setattr(s, "STATS_PARALLEL_CHUNK_DAYS", 30)
+    monkeypatch.setattr(s, "STATS_PARALLEL_DEGREE", 2)
+
+
+@pytest.mark.asyncio
+async def test_parallel_results_match_single_query(db: AsyncSession, parallel):
+    await insert_events_idempotent(db, _events())
+    await db.commit()
+    end = START + timedelta(days=59)
+
+    assert await parallel_stats.get_dau_parallel(db, START, end) == await get_dau_raw(db, START, end)
+    top = await parallel_stats.get_top_events_parallel(db, START, end, limit=2)
+    assert top == await get_top_events_raw(db, START, end, limit=2)
+    assert top == [("login", 120), ("click", 90)]
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t",
+    ) as client:
+        r = await client.get("/stats/dau", params={"from": str(START), "to": str(end)})
+        assert len(r.json()) == 60
+        r = await client.get("/stats/top-events",
+                             params={"from": str(START), "to": str(end), "limit": 1})
+        assert r.json() == [{"event_type": "login", "count": 120}]
+
+
+@pytest.mark.asyncio
+async def test_chunk_statement_timeout():
+    async def slow(session, lo, hi):
+        await session.execute(text("SELECT pg_sleep(1)"))
+        return []
+
+    chunks = parallel_stats.split_range(START, START + timedelta(days=3), 2)
+    with pytest.raises(parallel_stats.StatsTimeout, match="exceeded 50 ms"):
+        await parallel_stats.run_chunks("dau", chunks, slow, 2, 50)
+
+    async def fast(session, lo, hi):
+        return [(lo, 1)]
+
+    parts, timings = await parallel_stats.run_chunks("dau", chunks, fast, 2, 1000)
+    assert parts == [[(START, 1)], [(START + timedelta(days=2), 1)]]
+    assert [(t.date_from, t.rows) for t in timings] == [(START, 1), (START + timedelta(days=2), 1)]
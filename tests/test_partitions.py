@@ -0,0 +1,77 @@
+import uuid
+import pytest
+from datetime import date
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import engine
+from app.services.events_dao import insert_events_idempotent
+from app.services.partitions_dao import detach_partitions, ensure_partitions, list_partitions
+from app.services.stats_dao import get_dau_raw, get_top_events_raw
+
+
+async def _count(db, relation):
+    return (await db.execute(text(f"SELECT count(*) FROM {relation}"))).scalar_one()
+
+
+async def _plan(db: AsyncSession, call) -> str:
+    """EXPLAIN of the statement `call` sends to the database."""
+    captured = []
+
+    def grab(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", grab)
+    try:
+        await call()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", grab)
+    statement, parameters = captured[-1]
+    raw = await (await db.connection()).get_raw_connection()
+    rows = await raw.driver_connection.fetch("EXPLAIN " + statement, *parameters)
+    return "\n".join(r[0] for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_partition_maintenance_and_pruning(db: AsyncSession, make_event):
+    # everything runs in one transaction that is rolled back, so the
+    # partitions made here do not outlive the test
+    dup = uuid.uuid4()
+    assert await insert_events_idempotent(db, [
+        make_event(date(2031, 3, 15), event_id=dup), make_event(date(2031, 3, 16)),
+    ]) == (2, 0)
+    assert await _count(db, "events_default") == 2
+
+    created = await ensure_partitions(db, date(2031, 3, 1), date(2031, 4, 30), "month")
+    assert created == ["events_p2031_03", "events_p2031_04"]
+    assert await _count(db, "events_p2031_03") == 2
+    assert await _count(db, "events_default") == 0
+    # monthly periods already cover these days
+    assert await ensure_partitions(db, date(2031, 4, 1), date(2031, 4, 2), "day") == []
+
+    # event_id stays unique across partitions
+    assert await insert_events_idempotent(db, [
+        make_event(date(2031, 4, 2), event_id=dup), make_event(date(2031, 4, 3)),
+    ]) == (1, 1)
+
+    d_from, d_to = date(2031, 3, 10), date(2031, 3, 20)
+    for call in (
+        lambda: get_dau_raw(db, d_from, d_to),
+        lambda: get_top_events_raw(db, d_from, d_to),
+    ):
+        plan = await _plan(db, call)
+        assert "events_p2031_03" in plan
+        assert "events_p2031_04" not in plan
+        assert "events_default" not in plan
+
+    detached = await detach_partitions(db, date(2031, 4, 1), drop=True)
+    assert "events_p2031_03" in detached and "events_p2031_04" not in detached
+    assert [p[0] for p in await list_partitions(db)][-1] == "events_p2031_04"
+    assert await _count(db, "events") == 1
+    # the guard rows went with the partition: dedupe starts at 2031-04
+    assert await _count(db, "event_ids") == 1
+    assert await insert_events_idempotent(db, [
+        make_event(date(2031, 3, 15), event_id=dup),
+    ]) == (1, 0)
+
+    await db.rollback()
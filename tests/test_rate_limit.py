@@ -0,0 +1,170 @@
+import multiprocessing
+import uuid
+import pytest
+import httpx
+from datetime import datetime, timezone
+
+from app.api.main import app
+from app.core import rate_limit
+from app.core.config import get_settings
+from app.core.rate_limit import TokenBucketRateLimiter
+from app.core.shared_rate_limit import WAYS, SharedTokenBucketRateLimiter
+from app.observability.metrics import RATE_LIMIT_EVICTIONS, RATE_LIMIT_REJECTED
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_refill_wait_and_cost_cap():
+    clock = Clock()
+    limiter = TokenBucketRateLimiter(rps=10, burst=20, clock=clock)
+    assert limiter.acquire("a", 15) == 0.0
+    # a denied request takes nothing
+    assert limiter.acquire("a", 10) == pytest.approx(0.5)
+    assert limiter.acquire("a", 5) == 0.0
+    assert limiter.acquire("a", 1) == pytest.approx(0.1)
+    clock.now += 0.1
+    assert limiter.acquire("a", 1) == 0.0
+    # costs above the burst wait for a full bucket instead of never passing
+    clock.now += 2.0
+    assert limiter.acquire("a", 500) == 0.0
+    assert limiter.acquire("b", 1) == 0.0
+
+
+def test_idle_buckets_are_evicted_without_changing_decisions():
+    clock = Clock()
+    limiter = TokenBucketRateLimiter(rps=10, burst=20, shards=1, clock=clock)
+    for i in range(1000):
+        limiter.acquire(f"ip{i}", 20)
+    assert len(limiter) == 1000
+
+    clock.now += 1.0
+    limiter.acquire("ip0", 1)
+    clock.now += 1.0  # capacity / rate: all but ip0 are full again
+    limiter.acquire("late", 1)
+    assert len(limiter) == 2
+    # an evicted client would have been full anyway, a kept one keeps its state
+    assert limiter.acquire("ip1", 20) == 0.0
+    assert limiter.acquire("ip0", 20) == pytest.approx(0.1)
+
+
+def test_max_keys_bounds_memory():
+    limiter = TokenBucketRateLimiter(rps=1, burst=5, max_keys=64, shards=4)
+    for i in range(10_000):
+        limiter.acquire(f"ip{i}")
+    assert len(limiter) <= 64
+
+
+@pytest.fixture(params=["memory", "shared"])
+def limits(request, monkeypatch, tmp_path):
+    s = get_settings()
+    monkeypatch.setattr(s, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(s, "RATE_LIMIT_BACKEND", request.param)
+    monkeypatch.setattr(s, "RATE_LIMIT_SHARED_DIR", str(tmp_path))
+    monkeypatch.setattr(s, "RATE_LIMIT_RPS", 1)
+    monkeypatch.setattr(s, "RATE_LIMIT_BURST", 2)
+    monkeypatch.setattr(s, "RATE_LIMIT_INGEST_EPS", 1)
+    monkeypatch.setattr(s, "RATE_LIMIT_INGEST_BURST", 10)
+    rate_limit._limiters.clear()
+    yield
+    for _, limiter in rate_limit._limiters.values():
+        if hasattr(limiter, "close"):
+            limiter.close()
+    rate_limit._limiters.clear()
+
+
+def _batch(n):
+    return [{
+        "event_id": str(uuid.uuid4()),
+        "occurred_at": datetime(2025, 10, 20, 10, tzinfo=timezone.utc).isoformat(),
+        "user_id": f"u{i}",
+        "event_type": "login",
+    } for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_routes_are_limited_per_route(limits):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t",
+    ) as client:
+        rejected = RATE_LIMIT_REJECTED.labels("ingest")
+        rejected0 = rejected._value.get()
+        params = {"from": "2025-10-20", "to": "2025-10-20"}
+        assert (await client.get("/stats/dau", params=params)).status_code == 200
+        assert (await client.get("/stats/top-events", params=params)).status_code == 200
+        r = await client.get("/stats/dau", params=params)
+        assert r.status_code == 429
+        assert r.headers["retry-after"] == "1"
+
+        # ingest has its own bucket, charged per event
+        assert (await client.post("/events", json=_batch(8))).status_code == 202
+        r = await client.post("/events", json=_batch(5))
+        assert r.status_code == 429
+        assert r.headers["retry-after"] == "3"
+        assert (await client.post("/events", json=_batch(2))).status_code == 202
+
+        # invalid batches are rejected before they cost anything
+        assert (await client.post("/events", json=[])).status_code == 422
+
+        assert rejected._value.get() - rejected0 == 1
+        r = await client.get("/metrics")
+        assert 'rate_limit_keys{limit="stats"} 1.0' in r.text
+
+
+def _drain(path, key, attempts, start, results):
+    limiter = SharedTokenBucketRateLimiter(rps=0.001, burst=1000, path=path, max_keys=64)
+    start.wait()
+    results.put(sum(limiter.acquire(key) == 0.0 for _ in range(attempts)))
+
+
+def test_shared_buckets_are_exact_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    path = str(tmp_path / "buckets")
+    start, results = ctx.Event(), ctx.Queue()
+    procs = [
+        ctx.Process(target=_drain, args=(path, "10.0.0.1", 400, start, results))
+        for _ in range(4)
+    ]
+    for p in procs:
+        p.start()
+    start.set()
+    allowed = [results.get(timeout=60) for _ in procs]
+    for p in procs:
+        p.join(timeout=60)
+    # 1600 concurrent attempts on one bucket of 1000: no lost or double updates
+    assert sum(allowed) == 1000
+
+    limiter = SharedTokenBucketRateLimiter(rps=0.001, burst=1000, path=path, max_keys=64)
+    assert limiter.acquire("10.0.0.1") > 0
+    assert limiter.acquire("10.0.0.2") == 0.0
+    limiter.close()
+
+
+def test_shared_set_reuses_idle_then_least_recent_slot(tmp_path):
+    clock = Clock()
+    limiter = SharedTokenBucketRateLimiter(
+        rps=10, burst=20, path=str(tmp_path / "b"), max_keys=1, clock=clock,
+    )
+    idle = RATE_LIMIT_EVICTIONS.labels("default", "idle")
+    over = RATE_LIMIT_EVICTIONS.labels("default", "capacity")
+    idle0, over0 = idle._value.get(), over._value.get()
+
+    # max_keys=1 is a single set of WAYS slots
+    for i in range(WAYS):
+        assert limiter.acquire(f"ip{i}", 20) == 0.0
+        clock.now += 0.1
+    assert len(limiter) == WAYS
+
+    clock.now = 1002.05  # ip0 has been idle for burst / rate seconds
+    assert limiter.acquire("new", 20) == 0.0
+    assert idle._value.get() - idle0 == 1
+    # ip0 would have been full anyway; its new slot is taken from ip1
+    assert limiter.acquire("ip0", 20) == 0.0
+    assert over._value.get() - over0 == 1
+    assert limiter.acquire("ip2", 20) == pytest.approx(0.15)
+    limiter.close()
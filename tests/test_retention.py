@@ -0,0 +1,105 @@
+import pytest
+from datetime import date
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.main import app
+from app.core.config import get_settings
+from app.services.events_dao import insert_events_idempotent
+from app.services.rollups_dao import rebuild_rollups
+from app.services.stats_dao import (
+    get_retention,
+    get_retention_matrix,
+    get_retention_raw,
+)
+
+
+async def _assert_parity(db: AsyncSession):
+    for day in range(18, 24):
+        start = date(2025, 10, day)
+        assert await get_retention(db, start, 4) == await get_retention_raw(db, start, 4)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", ["values", "copy"])
+async def test_first_seen_follows_late_events(
+    db: AsyncSession, monkeypatch, engine, make_event
+):
+    monkeypatch.setattr(get_settings(), "INGEST_ENGINE", engine)
+    await insert_events_idempotent(db, [
+        make_event(20, "u1", hour=9), make_event(20, "u1", hour=8), make_event(21, "u1"),
+        make_event(20, "u2"), make_event(22, "u2"),
+        make_event(21, "u3"), make_event(23, "u3"),
+    ])
+    await db.commit()
+
+    cohort, points = await get_retention(db, date(2025, 10, 20), 3)
+    assert cohort == 2
+    assert points == [(0, 2), (1, 1), (2, 1), (3, 0)]
+    await _assert_parity(db)
+
+    # a late event moves u2 into an earlier cohort
+    await insert_events_idempotent(db, [make_event(19, "u2"), make_event(24, "u1")])
+    await db.commit()
+    first = (await db.execute(text(
+        "SELECT first_date FROM user_first_seen WHERE user_id = 'u2'"
+    ))).scalar_one()
+    assert first == date(2025, 10, 19)
+    assert (await get_retention(db, date(2025, 10, 20), 3))[0] == 1
+    await _assert_parity(db)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_backfills_first_seen(db: AsyncSession, monkeypatch, make_event):
+    monkeypatch.setattr(get_settings(), "ROLLUPS_ENABLED", False)
+    await insert_events_idempotent(
+        db, [make_event(20, "u1"), make_event(21, "u1"), make_event(21, "u2")]
+    )
+    await db.commit()
+    monkeypatch.setattr(get_settings(), "ROLLUPS_ENABLED", True)
+    assert (await get_retention(db, date(2025, 10, 20), 1))[0] == 0
+
+    await rebuild_rollups(db, date(2025, 10, 20), date(2025, 10, 21))
+    await db.commit()
+    await _assert_parity(db)
+
+
+@pytest.mark.asyncio
+async def test_matrix_matches_per_cohort(db: AsyncSession, monkeypatch, make_event):
+    batch = [
+        make_event(day, f"u{n}")
+        for n in range(40)
+        for day in range(18 + n % 4, 26, 1 + n % 3)
+    ]
+    await insert_events_idempotent(db, batch)
+    await db.commit()
+
+    async def expected():
+        return [
+            (date(2025, 10, d), *await get_retention_raw(db, date(2025, 10, d), 5))
+            for d in range(17, 24)
+        ]
+
+    want = await expected()
+    assert any(size for _, size, _ in want)
+    d_from, d_to = date(2025, 10, 17), date(2025, 10, 23)
+    # events scan, then daily_active_users once the span is covered
+    assert await get_retention_matrix(db, d_from, d_to, 5) == want
+    await rebuild_rollups(db, d_from, date(2025, 10, 28))
+    await db.commit()
+    assert await get_retention_matrix(db, d_from, d_to, 5) == want
+    monkeypatch.setattr(get_settings(), "ROLLUPS_ENABLED", False)
+    assert await get_retention_matrix(db, d_from, d_to, 5) == want
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/stats/retention/matrix", params={
+            "from": "2025-10-17", "to": "2025-10-23", "windows": 5,
+        })
+        assert r.status_code == 200, r.text
+        cohorts = r.json()["cohorts"]
+        assert [c["cohort_size"] for c in cohorts] == [w[1] for w in want]
+        assert [[p["count"] for p in c["windows"]] for c in cohorts] == [
+            [cnt for _, cnt in w[2]] for w in want
+        ]
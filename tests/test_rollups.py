@@ -0,0 +1,109 @@
+import uuid
+import pytest
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.events_dao import insert_events_idempotent
+from app.services.rollup_folder import RollupFolder
+from app.services.rollups_dao import check_rollups, rebuild_rollups, rollup_covers
+from app.services.stats_dao import (
+    get_dau,
+    get_dau_raw,
+    get_top_events,
+    get_top_events_raw,
+)
+
+D_FROM, D_TO = date(2025, 10, 19), date(2025, 10, 21)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", ["values", "copy"])
+async def test_rollups_follow_ingest_and_serve_stats(
+    db: AsyncSession, monkeypatch, engine, make_event
+):
+    monkeypatch.setattr(get_settings(), "INGEST_ENGINE", engine)
+    dup = uuid.uuid4()
+    batch = [
+        make_event(19, "u1", "login"),
+        make_event(19, "u1", "view"),
+        make_event(20, "u1", "login"),
+        make_event(20, "u2", "purchase", dup),
+        make_event(20, "u2", "purchase", dup),
+        make_event(21, "u3", "view"),
+    ]
+    assert await insert_events_idempotent(db, batch) == (5, 1)
+    await db.commit()
+    # re-sent batch must not inflate the counters
+    assert await insert_events_idempotent(db, batch) == (0, 6)
+    await db.commit()
+
+    assert await check_rollups(db, D_FROM, D_TO) == []
+    assert not await rollup_covers(db, D_FROM, D_TO)
+
+    await rebuild_rollups(db, D_FROM, D_TO)
+    await db.commit()
+    assert await rollup_covers(db, D_FROM, D_TO)
+
+    # a late event inside an already covered range
+    await insert_events_idempotent(db, [make_event(19, "u9", "view")])
+    await db.commit()
+    assert await check_rollups(db, D_FROM, D_TO) == []
+
+    assert await get_dau(db, D_FROM, D_TO) == await get_dau_raw(db, D_FROM, D_TO)
+    assert await get_dau(db, D_FROM, D_TO) == [
+        (date(2025, 10, 19), 2), (date(2025, 10, 20), 2), (date(2025, 10, 21), 1)
+    ]
+    assert (await get_top_events(db, D_FROM, D_TO, 10)
+            == await get_top_events_raw(db, D_FROM, D_TO, 10)
+            == [("view", 3), ("login", 2), ("purchase", 1)])
+
+
+@pytest.mark.asyncio
+async def test_rebuild_repairs_drifted_rollups(db: AsyncSession, make_event):
+    await insert_events_idempotent(db, [make_event(20, "u1", "login")])
+    await db.execute(text("UPDATE daily_event_count_deltas SET cnt = cnt + 5"))
+    await db.execute(text("DELETE FROM daily_active_users"))
+    await db.commit()
+
+    mismatches = await check_rollups(db, D_FROM, D_TO)
+    assert {m[0] for m in mismatches} == {"event_counts", "dau"}
+
+    await rebuild_rollups(db, D_FROM, D_TO)
+    await db.commit()
+    assert await check_rollups(db, D_FROM, D_TO) == []
+
+
+@pytest.mark.asyncio
+async def test_folding_moves_deltas_without_changing_results(db: AsyncSession, make_event):
+    async def deltas():
+        return (await db.execute(text(
+            "SELECT count(*) FROM daily_event_count_deltas"
+        ))).scalar_one()
+
+    for user in ("u1", "u2", "u3"):
+        await insert_events_idempotent(db, [make_event(20, user), make_event(21, user, "view")])
+        await db.commit()
+    await rebuild_rollups(db, D_FROM, D_TO)
+    await db.commit()
+    # ingest after the rebuild: counted in deltas only
+    for user in ("u4", "u5"):
+        await insert_events_idempotent(db, [make_event(20, user)])
+        await db.commit()
+    assert await deltas() == 2
+    expected = [("login", 5), ("view", 3)]
+    assert await get_top_events(db, D_FROM, D_TO, 10) == expected
+
+    folder = RollupFolder(interval=0, batch=1)
+    assert await folder.fold_once() == 1
+    assert await get_top_events(db, D_FROM, D_TO, 10) == expected
+    assert await folder.fold_once() == 1
+    assert await folder.fold_once() == 0
+    assert await deltas() == 0
+    assert await get_top_events(db, D_FROM, D_TO, 10) == expected
+    assert await check_rollups(db, D_FROM, D_TO) == []
+    cnt = (await db.execute(text(
+        "SELECT cnt FROM daily_event_counts WHERE day = '2025-10-20' AND event_type = 'login'"
+    ))).scalar_one()
+    assert cnt == 5
@@ -0,0 +1,77 @@
+import itertools
+import json
+from uuid import UUID
+
+from app.api.schemas import EventIn
+from app.cli.import_events import _parse_dt_iso8601, _parse_row
+
+
+def _reference_properties(value):
+    if not value or value.strip() == "":
+        return {}
+    try:
+        obj = json.loads(value)
+        if isinstance(obj, dict):
+            return obj
+        return {"_value": obj}
+    except json.JSONDecodeError:
+        return {"_raw": value}
+
+
+def _reference(r):
+    return EventIn(
+        event_id=UUID(r["event_id"]),
+        occurred_at=_parse_dt_iso8601(r["occurred_at"]),
+        user_id=r["user_id"].strip(),
+        event_type=r["event_type"].strip(),
+        properties=_reference_properties(r.get("properties_json", "")),
+    )
+
+
+def _outcome(fn, r):
+    try:
+        return fn(r)
+    except Exception:
+        return None
+
+
+EVENT_IDS = [
+    "6f1c1a8e-3a7e-4b9e-9c1e-0d2b7f3e4a11",
+    "6F1C1A8E3A7E4B9E9C1E0D2B7F3E4A11",
+    "{6f1c1a8e-3a7e-4b9e-9c1e-0d2b7f3e4a11}",
+    "not-a-uuid",
+    "",
+]
+OCCURRED = [
+    "2025-10-20T10:00:00Z",
+    "2025-10-20T10:00:00.123456+03:00",
+    " 2025-10-20 10:00:00 ",
+    "2025-10-20",
+    "20/10/2025",
+]
+USERS = ["u1", "  u2 ", "", "   ", None]
+TYPES = ["login", "\tview\n", "", " "]
+PROPS = ['{"a": 1}', "", "  ", "[1, 2]", "5", "null", "not json", None]
+
+
+def test_fast_path_matches_eventin():
+    combos = itertools.product(EVENT_IDS, OCCURRED, USERS, TYPES, PROPS)
+    for event_id, occurred_at, user_id, event_type, props in combos:
+        r = {
+            "event_id": event_id,
+            "occurred_at": occurred_at,
+            "user_id": user_id,
+            "event_type": event_type,
+            "properties_json": props,
+        }
+        ref = _outcome(_reference, r)
+        fast = _outcome(_parse_row, r)
+
+        assert (ref is None) == (fast is None), r
+        if ref is None:
+            continue
+        assert fast.event_id == ref.event_id
+        assert fast.occurred_at == ref.occurred_at
+        assert fast.user_id == ref.user_id
+        assert fast.event_type == ref.event_type
+        assert json.loads(fast.properties_json) == ref.properties
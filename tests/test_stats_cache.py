@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from datetime import date
+import httpx
+from sqlalchemy import text
+
+from app.api.main import app
+from app.db.session import AnalyticsSessionLocal
+from app.observability.metrics import STATS_CACHE_REQUESTS
+from app.services.day_versions_dao import range_version
+from app.services.stats_cache import StatsCache, get_stats_cache
+from app.services.stats_dao import get_dau
+
+D1, D2, D3 = date(2025, 10, 1), date(2025, 10, 2), date(2025, 10, 3)
+
+
+def _loader(calls, value, delay=0.0):
+    async def load():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+    return load
+
+
+@pytest.mark.asyncio
+async def test_lru_ttl_and_day_invalidation():
+    cache = StatsCache(max_entries=2, ttl=60, closed_ttl=60)
+    calls = []
+    assert await cache.get_or_load(("a",), D1, D1, _loader(calls, 1)) == 1
+    assert await cache.get_or_load(("a",), D1, D1, _loader(calls, 2)) == 1
+    await cache.get_or_load(("b",), D2, D3, _loader(calls, 3))
+    await cache.get_or_load(("c",), D3, D3, _loader(calls, 4))
+    assert len(cache) == 2 and ("a",) not in cache._entries  # LRU
+
+    cache.invalidate_days([D1, date(2025, 9, 1)])
+    assert len(cache) == 2
+    cache.invalidate_days([D3])
+    assert len(cache) == 0
+
+    cache = StatsCache(max_entries=10, ttl=0, closed_ttl=0)
+    await cache.get_or_load(("a",), D1, D1, _loader(calls, 5))
+    assert await cache.get_or_load(("a",), D1, D1, _loader(calls, 6)) == 6
+
+
+@pytest.mark.asyncio
+async def test_single_flight_and_races():
+    cache = StatsCache(max_entries=10, ttl=60, closed_ttl=60)
+    calls = []
+    results = await asyncio.gather(*(
+        cache.get_or_load(("k",), D1, D2, _loader(calls, 7, 0.05)) for _ in range(20)
+    ))
+    assert results == [7] * 20 and calls == [7]
+
+    # a write landing while the query runs must not leave a stale entry
+    task = asyncio.create_task(cache.get_or_load(("w",), D1, D2, _loader(calls, 8, 0.05)))
+    await asyncio.sleep(0.01)
+    cache.invalidate_days([D2])
+    assert await task == 8
+    assert ("w",) not in cache._entries
+
+    # a cancelled leader hands over to a waiter instead of failing it
+    leader = asyncio.create_task(cache.get_or_load(("x",), D1, D1, _loader(calls, 9, 1)))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(cache.get_or_load(("x",), D1, D1, _loader(calls, 10)))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await waiter == 10
+
+
+@pytest.mark.asyncio
+async def test_ingest_invalidates_only_written_days(make_event):
+    def sample(result):
+        return STATS_CACHE_REQUESTS.labels("dau", result)._value.get()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/events", json=[make_event(20, "u1", as_json=True)])
+        p20 = {"from": "2025-10-20", "to": "2025-10-20"}
+        p21 = {"from": "2025-10-21", "to": "2025-10-21"}
+
+        misses = sample("miss")
+        assert (await client.get("/stats/dau", params=p20)).json()[0]["unique_users"] == 1
+        await client.get("/stats/dau", params=p21)
+        hits = sample("hit")
+        await client.get("/stats/dau", params=p20)
+        assert sample("hit") == hits + 1
+
+        await client.post("/events", json=[make_event(20, "u2", as_json=True)])
+        r = await client.get("/stats/dau", params=p20)
+        assert r.json()[0]["unique_users"] == 2
+        # 10-21 entry survived the write to 10-20
+        await client.get("/stats/dau", params=p21)
+        assert sample("miss") == misses + 3
+        assert len(get_stats_cache()) == 2
+
+
+@pytest.mark.asyncio
+async def test_write_from_another_process_invalidates_closed_range(
+    write_elsewhere, make_event
+):
+    params = {"from": "2025-10-19", "to": "2025-10-20"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/events", json=[make_event(user_id="u1", as_json=True)])
+        assert (await client.get("/stats/dau", params=params)).json()[0]["unique_users"] == 1
+        hits = STATS_CACHE_REQUESTS.labels("dau", "hit")._value.get()
+        await client.get("/stats/dau", params=params)
+        assert STATS_CACHE_REQUESTS.labels("dau", "hit")._value.get() == hits + 1
+
+        # this process never sees the commit, only the day's new version
+        await write_elsewhere([make_event(user_id="u2", as_json=True)])
+        assert (await client.get("/stats/dau", params=params)).json()[0]["unique_users"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lagging_reader_never_caches_stale_rows_under_new_version(
+    write_elsewhere, make_event
+):
+    day = date(2025, 10, 20)
+    event = make_event(as_json=True)
+    cache = StatsCache(max_entries=10, ttl=3600, closed_ttl=3600)
+    key = ("dau", day, day)
+
+    # a snapshot taken before the write stands in for a replica behind it
+    async with AnalyticsSessionLocal() as lagging:
+        await lagging.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+        version = await range_version(lagging, day, day)
+        await write_elsewhere([event])
+        rows = await cache.get_or_load(key, day, day, lambda: get_dau(lagging, day, day), version)
+        assert rows == []
+
+    # the stale rows were cached under the version they were read with
+    async with AnalyticsSessionLocal() as caught_up:
+        version = await range_version(caught_up, day, day)
+        rows = await cache.get_or_load(key, day, day, lambda: get_dau(caught_up, day, day), version)
+        assert [n for _, n in rows] == [1]
@@ -0,0 +1,119 @@
+import pytest
+from datetime import datetime, timezone
+import httpx
+
+from app.api.main import app
+from app.api.routers import stats as stats_router
+from app.core.config import get_settings
+from app.services import stats_cache
+from app.services.stats_cache import get_stats_cache, get_version_map
+
+
+@pytest.mark.asyncio
+async def test_etag_revalidation_and_late_event(write_elsewhere, make_event):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/events", json=[make_event(20, "u1", as_json=True)])
+        params = {"from": "2025-10-19", "to": "2025-10-21"}
+
+        r = await client.get("/stats/dau", params=params)
+        assert r.status_code == 200
+        etag = r.headers["etag"]
+        assert r.headers["cache-control"].startswith("public, max-age=")
+
+        r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+
+        # the tag comes from the database, not from this process's cache
+        get_stats_cache().clear()
+        r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+
+        # an event outside the range keeps the validator
+        await client.post("/events", json=[make_event(25, "u2", as_json=True)])
+        r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+
+        # a late event inside the range changes it, whoever writes it
+        await write_elsewhere([make_event(19, "u3", as_json=True)])
+        get_version_map().invalidate()  # as STATS_VERSIONS_MAX_AGE_S would
+        r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.headers["etag"] != etag
+        assert [d["date"] for d in r.json()] == ["2025-10-19", "2025-10-20"]
+
+        # retention depends on every earlier day through the cohort
+        rp = {"start_date": "2025-10-20", "windows": 1}
+        etag = (await client.get("/stats/retention", params=rp)).headers["etag"]
+        await write_elsewhere([make_event(1, "u1", as_json=True)])
+        get_version_map().invalidate()
+        r = await client.get("/stats/retention", params=rp, headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.json()["cohort_size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_current_etag_is_answered_without_a_query(monkeypatch, write_elsewhere, make_event):
+    monkeypatch.setattr(get_version_map(), "max_age", 3600.0)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/events", json=[make_event(20, "u1", as_json=True)])
+        params = {"from": "2025-10-19", "to": "2025-10-21"}
+        etag = (await client.get("/stats/dau", params=params)).headers["etag"]
+        await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+
+        async def no_query(*args, **kwargs):
+            raise AssertionError("queried the versions")
+
+        with monkeypatch.context() as m:
+            m.setattr(stats_router, "range_version", no_query)
+            m.setattr(stats_cache, "load_day_versions", no_query)
+            r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+            assert r.status_code == 304
+            assert r.headers["etag"] == etag
+
+        # a commit in this process is seen at once
+        await client.post("/events", json=[make_event(19, "u2", as_json=True)])
+        r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        etag = r.headers["etag"]
+
+        # another process's only once the copy is older than max_age
+        await write_elsewhere([make_event(19, "u3", as_json=True)])
+        r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        monkeypatch.setattr(get_version_map(), "max_age", 0.0)
+        r = await client.get("/stats/dau", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.json()[0]["unique_users"] == 2
+
+
+@pytest.mark.asyncio
+async def test_open_range_must_revalidate(monkeypatch):
+    # keep both requests inside one TTL bucket
+    monkeypatch.setattr(get_settings(), "STATS_CACHE_TTL_S", 3600.0)
+    today = datetime.now(timezone.utc).date().isoformat()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/stats/top-events", params={"from": today, "to": today})
+        assert r.status_code == 200
+        assert r.headers["cache-control"] == "no-cache"
+        r = await client.get(
+            "/stats/top-events",
+            params={"from": today, "to": today},
+            headers={"If-None-Match": f'"x", {r.headers["etag"]}'},
+        )
+        assert r.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_no_proxy_caching_when_reading_a_replica(monkeypatch):
+    # the engines are already built, so requests still go to the primary
+    monkeypatch.setattr(get_settings(), "POSTGRES_REPLICA_HOST", "replica.invalid")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/stats/dau", params={"from": "2025-10-19", "to": "2025-10-21"})
+        assert r.status_code == 200
+        assert r.headers["cache-control"] == "no-cache"
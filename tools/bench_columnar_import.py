@@ -0,0 +1,131 @@
+"""
+Benchmark: importer read + parse stage, CSV vs Parquet vs Arrow IPC.
+
+    python -m tools.bench_columnar_import --rows 500000 --batch-size 5000
+
+No database needed. The same synthetic dataset is written as CSV, Parquet
+(row groups of --row-group rows) and Arrow IPC, then each file goes
+through the importer's own batch reader and parser (_open_batches and the
+parse function it returns) in a single process, which is what each
+--workers process does. Add --db to also time full imports into the
+configured database (the imported rows are deleted afterwards).
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from app.cli.checkpoint import Checkpoint
+from app.cli.columnar import SCHEMA
+from app.cli.import_events import _open_batches, _run
+from app.db.session import AsyncSessionLocal
+
+EVENT_TYPES = ["login", "view", "purchase", "logout"]
+
+
+def _columns(n: int) -> dict:
+    start = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    return {
+        "event_id": [str(uuid.uuid4()) for _ in range(n)],
+        "occurred_at": [start + timedelta(seconds=i) for i in range(n)],
+        "user_id": [f"u{i % 10_000}" for i in range(n)],
+        "event_type": [EVENT_TYPES[i % 4] for i in range(n)],
+        "properties_json": [
+            json.dumps({"country": "UA", "i": i, "tags": ["a", "b"]}) for i in range(n)
+        ],
+    }
+
+
+def _write_files(cols: dict, out_dir: str, row_group: int) -> dict:
+    paths = {
+        "csv": os.path.join(out_dir, "events.csv"),
+        "parquet": os.path.join(out_dir, "events.parquet"),
+        "arrow": os.path.join(out_dir, "events.arrow"),
+    }
+    with open(paths["csv"], "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(cols.keys())
+        for row in zip(*cols.values()):
+            w.writerow((row[0], row[1].isoformat(), *row[2:]))
+
+    table = pa.table(cols, schema=SCHEMA)
+    pq.write_table(table, paths["parquet"], row_group_size=row_group, compression="zstd")
+    with pa.OSFile(paths["arrow"], "wb") as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            for batch in table.to_batches(max_chunksize=row_group):
+                writer.write_batch(batch)
+    return paths
+
+
+def _parse_only(path: str, batch_size: int) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    accepted = 0
+    with ExitStack() as stack:
+        batches, parse = _open_batches(stack, path, batch_size, Checkpoint(identity=""))
+        for rows, _ in batches:
+            events, _ = parse(rows)
+            accepted += len(events)
+    return time.perf_counter() - t0, accepted
+
+
+async def _full_imports(paths: dict, batch_size: int, ids: list) -> dict:
+    out = {}
+    for fmt, path in paths.items():
+        t0 = time.perf_counter()
+        await _run(path, batch_size, False, workers=0, writers=2,
+                   checkpoint_path=path + ".checkpoint")
+        out[fmt] = time.perf_counter() - t0
+        async with AsyncSessionLocal() as session:
+            for table in ("events", "event_ids"):
+                await session.execute(
+                    text(f"DELETE FROM {table} WHERE event_id = ANY(:ids)"), {"ids": ids},
+                )
+            await session.commit()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--row-group", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", action="store_true", help="Also run full imports")
+    args = parser.parse_args()
+
+    cols = _columns(args.rows)
+    with tempfile.TemporaryDirectory() as out_dir:
+        paths = _write_files(cols, out_dir, args.row_group)
+        parse = {}
+        for fmt, path in paths.items():
+            t, accepted = min(_parse_only(path, args.batch_size) for _ in range(args.repeat))
+            assert accepted == args.rows, (fmt, accepted)
+            parse[fmt] = t
+        imports = {}
+        if args.db:
+            ids = [uuid.UUID(e) for e in cols["event_id"]]
+            imports = asyncio.run(_full_imports(paths, args.batch_size, ids))
+
+        print(f"{'format':<8} {'MB':>7} {'parse s':>8} {'rows/s':>10} {'speedup':>8}"
+              + (f" {'import s':>9} {'rows/s':>9}" if args.db else ""))
+        for fmt, path in paths.items():
+            t = parse[fmt]
+            line = (f"{fmt:<8} {os.path.getsize(path) / 1e6:>7.1f} {t:>8.2f} "
+                    f"{args.rows / t:>10.0f} {parse['csv'] / t:>7.2f}x")
+            if args.db:
+                line += f" {imports[fmt]:>9.2f} {args.rows / imports[fmt]:>9.0f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
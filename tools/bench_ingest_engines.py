@@ -0,0 +1,86 @@
+"""
+Compare INGEST_ENGINE=values vs INGEST_ENGINE=copy on a live Postgres.
+
+    python -m tools.bench_ingest_engines --rows 50000 --batch-sizes 500,5000
+
+Inserted rows are deleted afterwards, so the benchmark can run against a
+non-empty database.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.api.schemas import EventIn
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.services.events_dao import INGEST_ENGINES, insert_events_idempotent
+
+EVENT_TYPES = ["login", "view", "purchase", "logout"]
+
+
+def _make_events(n: int) -> list[EventIn]:
+    start = datetime(2025, 10, 19, 10, 0, tzinfo=timezone.utc)
+    return [
+        EventIn(
+            event_id=uuid.uuid4(),
+            occurred_at=start + timedelta(seconds=i),
+            user_id=f"u{i % 1000}",
+            event_type=EVENT_TYPES[i % len(EVENT_TYPES)],
+            properties={"country": "UA", "i": i},
+        )
+        for i in range(n)
+    ]
+
+
+async def _run_once(events: list[EventIn], batch_size: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        async with AsyncSessionLocal() as session:
+            await insert_events_idempotent(session, events[i:i + batch_size])
+            await session.commit()
+    return time.perf_counter() - t0
+
+
+async def _cleanup(events: list[EventIn]) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("DELETE FROM events WHERE event_id = ANY(:ids)"),
+            {"ids": [e.event_id for e in events]},
+        )
+        await session.commit()
+
+
+async def _bench(rows: int, batch_sizes: list[int], engines: list[str]) -> None:
+    settings = get_settings()
+    print(f"{'engine':<8} {'batch':>7} {'rows':>9} {'seconds':>9} {'rows/s':>10}")
+    for bs in batch_sizes:
+        for engine in engines:
+            settings.INGEST_ENGINE = engine
+            events = _make_events(rows)
+            try:
+                dt = await _run_once(events, bs)
+            finally:
+                await _cleanup(events)
+            print(f"{engine:<8} {bs:>7} {rows:>9} {dt:>9.3f} {rows / dt:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--batch-sizes", default="500,5000")
+    parser.add_argument("--engines", default=",".join(INGEST_ENGINES))
+    args = parser.parse_args()
+
+    asyncio.run(_bench(
+        args.rows,
+        [int(x) for x in args.batch_sizes.split(",")],
+        args.engines.split(","),
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Microbenchmark: JSON decode of ingest batches and encode of stats responses.
+
+    python -m tools.bench_json --events 1000 --days 365
+
+No database or server needed. "decode" compares what FastAPI does for a
+declared body (json.loads, then Python-mode validation) with one
+TypeAdapter.validate_json call over the raw bytes. "encode" compares the
+response_model path (serialize_response + JSONResponse) with
+FastJSONResponse rendering the DAO rows directly, for a /stats/dau
+response and a /stats/retention/matrix response.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.fast_json import FastJSONResponse
+from app.api.schemas import DATEDAU, RetentionMatrixResponse, events_batch_adapter
+
+
+def _batch(n: int) -> bytes:
+    t0 = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    return json.dumps([
+        {
+            "event_id": str(uuid.uuid4()),
+            "occurred_at": (t0 + timedelta(seconds=i)).isoformat(),
+            "user_id": f"u{random.randrange(10_000)}",
+            "event_type": random.choice(["login", "view", "click", "purchase"]),
+            "properties": {"country": "UA", "n": i, "tags": ["a", "b"]},
+        }
+        for i in range(n)
+    ]).encode()
+
+
+def _best(fn, repeat: int, loops: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / loops)
+    return best
+
+
+def _decode(n: int, repeat: int, loops: int) -> dict:
+    body = _batch(n)
+    old = _best(lambda: events_batch_adapter.validate_python(json.loads(body)), repeat, loops)
+    new = _best(lambda: events_batch_adapter.validate_json(body), repeat, loops)
+    return {"old": old, "new": new}
+
+
+async def _encode(field, content, repeat: int, loops: int) -> dict:
+    old = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            JSONResponse(await serialize_response(field=field, response_content=content))
+        old = min(old, (time.perf_counter() - t0) / loops)
+    new = _best(lambda: FastJSONResponse(content), repeat, loops)
+    return {"old": old, "new": new}
+
+
+def _dau(days: int) -> tuple:
+    start = date(2025, 1, 1)
+    rows = [(start + timedelta(days=i), random.randrange(100_000)) for i in range(days)]
+    content = [{"date": d, "unique_users": n} for d, n in rows]
+    return create_model_field("dau", List[DATEDAU]), content
+
+
+def _matrix(cohorts: int, windows: int) -> tuple:
+    start = date(2025, 1, 1)
+    content = {"cohorts": [
+        {
+            "cohort_date": start + timedelta(days=c),
+            "cohort_size": 1000,
+            "windows": [
+                {"day": w, "count": 1000 - w, "rate": round((1000 - w) / 1000, 4)}
+                for w in range(windows + 1)
+            ],
+        }
+        for c in range(cohorts)
+    ]}
+    return create_model_field("matrix", RetentionMatrixResponse), content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000, help="events per batch")
+    parser.add_argument("--days", type=int, default=365, help="rows in the DAU response")
+    parser.add_argument("--cohorts", type=int, default=90)
+    parser.add_argument("--windows", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--loops", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    d = _decode(args.events, args.repeat, args.loops)
+    print(f"decode  {args.events} events: old {d['old'] * 1e3:7.2f} ms "
+          f"({args.events / d['old']:>9.0f} ev/s)  new {d['new'] * 1e3:7.2f} ms "
+          f"({args.events / d['new']:>9.0f} ev/s)  x{d['old'] / d['new']:.2f}")
+
+    for name, case in (
+        (f"dau     {args.days} rows", _dau(args.days)),
+        (f"matrix  {args.cohorts}x{args.windows + 1}", _matrix(args.cohorts, args.windows)),
+    ):
+        e = asyncio.run(_encode(*case, args.repeat, args.loops))
+        print(f"encode  {name}: old {e['old'] * 1e3:7.2f} ms  "
+              f"new {e['new'] * 1e3:7.2f} ms  x{e['old'] / e['new']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
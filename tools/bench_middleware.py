@@ -0,0 +1,133 @@
+"""
+Microbenchmark: per-request overhead of the HTTP observability middleware.
+
+    python -m tools.bench_middleware --requests 20000
+
+No database or server needed: requests are driven straight through the
+ASGI interface of a FastAPI app with one trivial route. "bare" has no
+middleware; "before" is the old stack of two BaseHTTPMiddleware classes
+(reproduced below); "after" is ObservabilityMiddleware. The overhead is
+the difference to "bare".
+"""
+import argparse
+import asyncio
+import logging
+import time
+from uuid import uuid4
+
+import structlog
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.api.middleware import ObservabilityMiddleware
+from app.api.utils import extract_request_id_from_headers
+from app.observability.metrics import REQUESTS, REQUEST_LATENCY
+
+
+class _OldPrometheusMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        log = logging.getLogger("access")
+        start = time.perf_counter()
+        request_id = request.headers.get("x-request-id") or str(uuid4())
+        request.scope["request_id"] = request_id
+        response = None
+        try:
+            response = await call_next(request)
+            log.info(
+                f"access method={request.method} path={request.url.path} "
+                f"status={response.status_code} request_id={request_id}"
+            )
+            response.headers["x-request-id"] = request_id
+            return response
+        finally:
+            dur = time.perf_counter() - start
+            status_code = response.status_code if response is not None else 500
+            REQUEST_LATENCY.labels(method=request.method, route="bench").observe(dur)
+            REQUESTS.labels(
+                method=request.method,
+                path=request.scope.get("path", request.url.path),
+                status=str(status_code),
+            ).inc()
+
+
+class _OldAccessLogMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request_id = extract_request_id_from_headers(request.headers)
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+        try:
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            structlog.contextvars.clear_contextvars()
+
+
+def _app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if stack == "before":
+        app.add_middleware(_OldPrometheusMiddleware)
+        app.add_middleware(_OldAccessLogMiddleware)
+    elif stack == "after":
+        app.add_middleware(ObservabilityMiddleware)
+    return app
+
+
+async def _drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/items/{i}",
+            "raw_path": f"/items/{i}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - t0
+
+
+async def _bench(n: int, repeat: int) -> dict:
+    out = {}
+    for stack in ("bare", "before", "after"):
+        app = _app(stack)
+        await _drive(app, 200)  # warm-up, builds the middleware stack
+        out[stack] = min([await _drive(app, n) for _ in range(repeat)])
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger("access").disabled = True
+    res = asyncio.run(_bench(args.requests, args.repeat))
+    bare = res["bare"] / args.requests
+    for stack, t in res.items():
+        per = t / args.requests
+        print(f"{stack:<7} {args.requests / t:>10.0f} req/s {per * 1e6:8.1f} us/req "
+              f"overhead {(per - bare) * 1e6:7.1f} us")
+    print(f"overhead reduction x{(res['before'] - res['bare']) / (res['after'] - res['bare']):.2f}")
+
+
+if __name__ == "__main__":
+    main()
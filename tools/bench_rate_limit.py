@@ -0,0 +1,200 @@
+"""
+Benchmark: rate limiter decisions and memory with 100k distinct client keys.
+
+    python -m tools.bench_rate_limit --keys 100000 --rounds 5
+
+No server needed. Compares the previous limiter (one dict of dataclass
+buckets behind a global asyncio.Lock, never evicted) with the sharded,
+evicting TokenBucketRateLimiter and the cross-process mmap table
+(RATE_LIMIT_BACKEND=shared) on two workloads, both driven by a simulated
+clock so the numbers do not depend on wall time:
+
+  hot    --keys clients each send --rounds requests (decisions/s)
+  churn  --churn-waves waves of --keys new clients, --wave-gap seconds apart,
+         i.e. IP churn; reports buckets held and traced memory at the end
+         (measured in a separate tracemalloc run; the shared table's size
+         is fixed by --max-keys and shown as its file size)
+
+--processes N then runs the hot workload for the shared table in N
+processes at once on one file and reports the aggregate decisions/s.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict
+
+from app.core.rate_limit import TokenBucketRateLimiter
+from app.core.shared_rate_limit import SharedTokenBucketRateLimiter
+
+
+@dataclass
+class _Bucket:
+    capacity: int
+    tokens: float
+    refill_rate: float
+    last_refill: float
+
+
+class GlobalLockLimiter:
+    """The limiter as it was before sharding and eviction."""
+
+    def __init__(self, rps: int, burst: int, clock):
+        self.refill_rate = float(rps)
+        self.capacity = int(burst)
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = asyncio.Lock()
+        self._now = clock
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def allow(self, key: str, cost: int = 1) -> bool:
+        async with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = _Bucket(self.capacity, float(self.capacity), self.refill_rate, self._now())
+                self._buckets[key] = b
+            now = self._now()
+            b.tokens = min(self.capacity, b.tokens + max(0.0, now - b.last_refill) * b.refill_rate)
+            b.last_refill = now
+            if b.tokens >= cost:
+                b.tokens -= cost
+                return True
+            return False
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _make(kind: str, args, clock):
+    if kind == "global-lock":
+        return GlobalLockLimiter(args.rps, args.burst, clock)
+    if kind == "shared":
+        path = args.shared_file or os.path.join(args.shared_dir, f"b{time.perf_counter_ns()}")
+        return SharedTokenBucketRateLimiter(
+            args.rps, args.burst, path=path, max_keys=args.max_keys, clock=clock,
+        )
+    return TokenBucketRateLimiter(args.rps, args.burst, max_keys=args.max_keys, clock=clock)
+
+
+def _table_bytes(limiter) -> int:
+    if isinstance(limiter, SharedTokenBucketRateLimiter):
+        return os.path.getsize(limiter.path)
+    return 0
+
+
+async def _decide(limiter, keys, step: float, clock) -> float:
+    if isinstance(limiter, GlobalLockLimiter):
+        t0 = time.perf_counter()
+        for k in keys:
+            clock.now += step
+            await limiter.allow(k)
+        return time.perf_counter() - t0
+    acquire = limiter.acquire
+    t0 = time.perf_counter()
+    if not isinstance(clock, Clock):
+        for k in keys:
+            acquire(k)
+    else:
+        for k in keys:
+            clock.now += step
+            acquire(k)
+    return time.perf_counter() - t0
+
+
+async def _hot(kind: str, args, clock=None) -> float:
+    clock = clock or Clock()
+    limiter = _make(kind, args, clock)
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.keys)]
+    n = args.keys * args.rounds
+    # requests spread over one second per round
+    spent = sum([await _decide(limiter, keys, 1.0 / args.keys, clock)
+                 for _ in range(args.rounds)])
+    return n / spent
+
+
+async def _churn(kind: str, args, trace: bool) -> tuple:
+    clock = Clock()
+    if trace:
+        tracemalloc.start()
+    limiter = _make(kind, args, clock)
+    spent = 0.0
+    for w in range(args.churn_waves):
+        keys = [f"wave{w}-{i}" for i in range(args.keys)]
+        spent += await _decide(limiter, keys, args.wave_gap / args.keys, clock)
+    del keys
+    held = len(limiter)
+    mem = _table_bytes(limiter)
+    if trace:
+        mem += tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return args.keys * args.churn_waves / spent, held, mem
+
+
+def _hot_worker(args, start, results):
+    start.wait()
+    # simulated clocks would disagree between processes
+    results.put(asyncio.run(_hot("shared", args, clock=time.monotonic)))
+
+
+def _processes(args) -> float:
+    # all processes decide for the same clients on one file, like workers
+    ctx = multiprocessing.get_context("fork")
+    start, results = ctx.Event(), ctx.Queue()
+    args.shared_file = os.path.join(args.shared_dir, "processes")
+    procs = [ctx.Process(target=_hot_worker, args=(args, start, results))
+             for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    start.set()
+    total = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rps", type=int, default=20)
+    parser.add_argument("--burst", type=int, default=40)
+    parser.add_argument("--max-keys", type=int, default=250_000)
+    parser.add_argument("--churn-waves", type=int, default=10)
+    parser.add_argument("--wave-gap", type=float, default=5.0,
+                        help="Simulated seconds per wave of new clients")
+    parser.add_argument("--processes", type=int, default=0)
+    parser.add_argument("--shared-dir", default="/dev/shm")
+    args = parser.parse_args()
+
+    print(f"{'limiter':<12} {'hot dec/s':>10} {'us/dec':>7} "
+          f"{'churn dec/s':>12} {'buckets':>9} {'MB':>7}")
+    with tempfile.TemporaryDirectory(dir=args.shared_dir) as shared_dir:
+        args.shared_dir, args.shared_file = shared_dir, None
+        _report(args)
+        if args.processes:
+            total = _processes(args)
+            print(f"shared x{args.processes} processes: {total:.0f} dec/s")
+
+
+def _report(args):
+    for kind in ("global-lock", "sharded", "shared"):
+        hot = asyncio.run(_hot(kind, args))
+        churn, held, _ = asyncio.run(_churn(kind, args, trace=False))
+        _, _, mem = asyncio.run(_churn(kind, args, trace=True))
+        print(f"{kind:<12} {hot:>10.0f} {1e6 / hot:>7.2f} "
+              f"{churn:>12.0f} {held:>9} {mem / 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
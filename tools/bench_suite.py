@@ -0,0 +1,416 @@
+"""
+End-to-end benchmark suite: ingest DAO, POST /events and stats_dao on a live Postgres.
+
+    python -m tools.bench_suite run --out bench.json --scales 1000000,10000000
+    python -m tools.bench_suite compare baseline.json bench.json --threshold 0.15
+
+`run` measures
+  ingest.dao.batch_<n>     insert_events_idempotent rows/s per batch size
+  ingest.http.*            POST /events through the in-process ASGI app with
+                           --clients concurrent clients: requests/s, events/s,
+                           p50/p99 latency
+  ingest.concurrent.*      N concurrent ingest transactions (--concurrency)
+                           into one day, with rollups on and off: events/s,
+                           p99 transaction latency, mean rollup stage time
+  stats.<scale>.<query>    p50 latency of every stats_dao function on a
+                           synthetic dataset of <scale> events, once with the
+                           rollups covering it and once on raw events
+
+Everything is written into bench-only date windows (2032 for ingest, 2033
+for stats) with "bench-" user ids; the stats window gets its own
+partitions. All of it is removed afterwards, so the suite can run
+against a database that has real data (which does affect the numbers).
+
+Results are one JSON document, {"meta": ..., "results": {name: {"value",
+"unit", "better"}}}. `compare` prints every metric shared by two such
+files and exits 1 if any of them got worse by more than --threshold.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.main import app
+from app.api.schemas import EventIn
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.observability.metrics import REGISTRY
+from app.services import stats_dao
+from app.services.events_dao import insert_events_idempotent
+from app.services.partitions_dao import ensure_partitions
+from app.services.rollups_dao import rebuild_rollups
+
+EVENT_TYPES = ["view", "click", "login", "purchase", "logout", "search", "share", "signup"]
+INGEST_START = datetime(2032, 1, 1, tzinfo=timezone.utc)
+STATS_START = date(2033, 1, 1)
+USER_PREFIX = "bench-"
+
+Results = Dict[str, dict]
+
+
+def _put(results: Results, name: str, value: float, unit: str, better: str) -> None:
+    results[name] = {"value": round(value, 6), "unit": unit, "better": better}
+    print(f"{name:<48} {value:>14.4f} {unit}", flush=True)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+
+def _events(n: int, offset: int = 0) -> List[EventIn]:
+    return [
+        EventIn(
+            event_id=uuid.uuid4(),
+            occurred_at=INGEST_START + timedelta(seconds=offset + i),
+            user_id=f"{USER_PREFIX}u{(offset + i) % 5000}",
+            event_type=EVENT_TYPES[i % len(EVENT_TYPES)],
+            properties={"country": "UA", "i": i},
+        )
+        for i in range(n)
+    ]
+
+
+async def _cleanup(lo: date, hi: date) -> None:
+    start = datetime.combine(lo, datetime.min.time(), tzinfo=timezone.utc)
+    end = datetime.combine(hi, datetime.min.time(), tzinfo=timezone.utc) + timedelta(days=1)
+    window = {"start": start, "end": end}
+    days = {"lo": lo, "hi": hi}
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("""
+            DELETE FROM event_ids WHERE event_id IN (
+                SELECT event_id FROM events WHERE occurred_at >= :start AND occurred_at < :end
+            )
+        """), window)
+        await session.execute(text(
+            "DELETE FROM events WHERE occurred_at >= :start AND occurred_at < :end"
+        ), window)
+        for table in ("daily_event_counts", "daily_event_count_deltas",
+                      "daily_active_users", "daily_user_sketches", "daily_user_sketch_deltas",
+                      "rollup_coverage"):
+            await session.execute(text(
+                f"DELETE FROM {table} WHERE day BETWEEN :lo AND :hi"
+            ), days)
+        await session.execute(text(
+            "DELETE FROM user_first_seen WHERE user_id LIKE :p"
+        ), {"p": USER_PREFIX + "%"})
+        await session.commit()
+
+
+# --- ingest -----------------------------------------------------------------
+
+async def bench_ingest_dao(results: Results, rows: int, batch_sizes: List[int]) -> None:
+    for bs in batch_sizes:
+        events = _events(rows)
+        t0 = time.perf_counter()
+        for i in range(0, rows, bs):
+            async with AsyncSessionLocal() as session:
+                await insert_events_idempotent(session, events[i:i + bs])
+                await session.commit()
+        _put(results, f"ingest.dao.batch_{bs}", rows / (time.perf_counter() - t0),
+             "rows/s", "higher")
+        await _cleanup(INGEST_START.date(), INGEST_START.date() + timedelta(days=30))
+
+
+async def bench_ingest_http(results: Results, clients: int, requests: int, batch: int) -> None:
+    latencies: List[float] = []
+
+    async def client_loop(c: int, client: httpx.AsyncClient) -> None:
+        for r in range(requests):
+            body = [e.model_dump(mode="json") for e in
+                    _events(batch, offset=(c * requests + r) * batch)]
+            t0 = time.perf_counter()
+            resp = await client.post("/events", json=body)
+            latencies.append(time.perf_counter() - t0)
+            resp.raise_for_status()
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60,
+    ) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client_loop(c, client) for c in range(clients)))
+        elapsed = time.perf_counter() - t0
+    await _cleanup(INGEST_START.date(), INGEST_START.date() + timedelta(days=30))
+
+    n = clients * requests
+    prefix = f"ingest.http.c{clients}_b{batch}"
+    _put(results, f"{prefix}.requests_per_s", n / elapsed, "req/s", "higher")
+    _put(results, f"{prefix}.events_per_s", n * batch / elapsed, "events/s", "higher")
+    _put(results, f"{prefix}.p50_ms", _percentile(latencies, 0.50) * 1000, "ms", "lower")
+    _put(results, f"{prefix}.p99_ms", _percentile(latencies, 0.99) * 1000, "ms", "lower")
+
+
+def _rollup_stage() -> tuple:
+    labels = {"stage": "rollups"}
+    return (REGISTRY.get_sample_value("ingest_stage_seconds_sum", labels) or 0.0,
+            REGISTRY.get_sample_value("ingest_stage_seconds_count", labels) or 0.0)
+
+
+async def bench_ingest_concurrency(
+    results: Results,
+    concurrency: List[int],
+    transactions: int,
+    batch: int,
+) -> None:
+    """
+    Every transaction writes the same day, the worst case for rollups
+    maintained on ingest: the gap between rollups on and off is what the
+    rollup stage costs, and it growing with N means ingests wait on rows
+    shared through the rollups.
+    """
+    settings = get_settings()
+    saved = settings.ROLLUPS_ENABLED
+    try:
+        for n in concurrency:
+            for rollups in (True, False):
+                settings.ROLLUPS_ENABLED = rollups
+                latencies: List[float] = []
+
+                async def worker(w: int) -> None:
+                    for t in range(transactions):
+                        events = _events(batch, offset=(w * transactions + t) * batch)
+                        t0 = time.perf_counter()
+                        async with AsyncSessionLocal() as session:
+                            await insert_events_idempotent(session, events)
+                            await session.commit()
+                        latencies.append(time.perf_counter() - t0)
+
+                stage_sum, stage_count = _rollup_stage()
+                t0 = time.perf_counter()
+                await asyncio.gather(*(worker(w) for w in range(n)))
+                elapsed = time.perf_counter() - t0
+                await _cleanup(INGEST_START.date(), INGEST_START.date() + timedelta(days=30))
+
+                prefix = f"ingest.concurrent.c{n}.rollups_{'on' if rollups else 'off'}"
+                _put(results, f"{prefix}.events_per_s",
+                     n * transactions * batch / elapsed, "events/s", "higher")
+                _put(results, f"{prefix}.p99_ms", _percentile(latencies, 0.99) * 1000,
+                     "ms", "lower")
+                if rollups:
+                    s_sum, s_count = _rollup_stage()
+                    _put(results, f"{prefix}.rollup_stage_ms",
+                         (s_sum - stage_sum) / max(1.0, s_count - stage_count) * 1000,
+                         "ms", "lower")
+    finally:
+        settings.ROLLUPS_ENABLED = saved
+
+
+# --- stats ------------------------------------------------------------------
+
+async def load_stats_dataset(rows: int, days: int, seed: int) -> List[str]:
+    """
+    rows synthetic events over `days` days from STATS_START, rollups
+    rebuilt. Returns the partitions it created.
+    """
+    lo, hi = STATS_START, STATS_START + timedelta(days=days - 1)
+    users = max(100, rows // 50)
+    rng = random.Random(seed)
+    async with AsyncSessionLocal() as session:
+        created = await ensure_partitions(
+            session, lo, hi, get_settings().EVENTS_PARTITION_INTERVAL,
+        )
+        await session.commit()
+    step = 1_000_000
+    for first in range(0, rows, step):
+        n = min(step, rows - first)
+        async with AsyncSessionLocal() as session:
+            # users have a stable "home" slice of days so cohorts come back
+            await session.execute(text("""
+                INSERT INTO events (event_id, occurred_at, user_id, event_type, properties)
+                SELECT gen_random_uuid(),
+                       CAST(:start AS timestamptz)
+                         + ((u.id * 7 + i / :users) % :days) * INTERVAL '1 day'
+                         + ((i * 7919 + :salt) % 86400) * INTERVAL '1 second',
+                       :prefix || 'u' || u.id,
+                       (CAST(:types AS text[]))[1 + (i * 31 + u.id) % :ntypes],
+                       '{}'::jsonb
+                FROM generate_series(CAST(:first AS bigint), CAST(:last AS bigint)) AS i,
+                     LATERAL (SELECT (i * 2654435761 + :salt) % :users AS id) AS u
+            """), {
+                "start": datetime.combine(lo, datetime.min.time(), tzinfo=timezone.utc),
+                "days": days, "users": users, "salt": rng.randrange(1 << 20),
+                "prefix": USER_PREFIX, "types": EVENT_TYPES, "ntypes": len(EVENT_TYPES),
+                "first": first, "last": first + n - 1,
+            })
+            await session.commit()
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("ANALYZE events"))
+        await rebuild_rollups(session, lo, hi)
+        await session.commit()
+    return created
+
+
+async def _timed(fn: Callable[[AsyncSession], Awaitable], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as session:
+            t0 = time.perf_counter()
+            await fn(session)
+            samples.append(time.perf_counter() - t0)
+    return _percentile(samples, 0.5)
+
+
+def _stats_queries(days: int) -> Dict[str, Callable]:
+    lo, hi = STATS_START, STATS_START + timedelta(days=days - 1)
+    month = lo + timedelta(days=29)
+    return {
+        "dau": lambda s: stats_dao.get_dau(s, lo, hi),
+        "dau_raw": lambda s: stats_dao.get_dau_raw(s, lo, hi),
+        "dau_approx": lambda s: stats_dao.get_dau_approx(s, lo, hi),
+        "unique_users": lambda s: stats_dao.get_unique_users(s, lo, hi),
+        "wau": lambda s: stats_dao.get_rolling_unique_users(s, lo, hi, 7),
+        "mau": lambda s: stats_dao.get_rolling_unique_users(s, lo, hi, 30),
+        "top_events": lambda s: stats_dao.get_top_events(s, lo, hi, 10),
+        "top_events_raw": lambda s: stats_dao.get_top_events_raw(s, lo, hi, 10),
+        "retention": lambda s: stats_dao.get_retention(s, lo, 30),
+        "retention_raw": lambda s: stats_dao.get_retention_raw(s, lo, 30),
+        "retention_matrix": lambda s: stats_dao.get_retention_matrix(s, lo, month, 30),
+    }
+
+
+async def bench_stats(results: Results, scale: int, days: int, repeat: int, seed: int) -> None:
+    lo, hi = STATS_START, STATS_START + timedelta(days=days - 1)
+    await _cleanup(lo, hi)
+    created: List[str] = []
+    try:
+        t0 = time.perf_counter()
+        created = await load_stats_dataset(scale, days, seed)
+        print(f"# loaded {scale} events in {time.perf_counter() - t0:.1f}s", flush=True)
+        for name, fn in _stats_queries(days).items():
+            await _timed(fn, 1)  # warm the buffer cache and plans
+            _put(results, f"stats.{scale}.{name}.p50_ms",
+                 await _timed(fn, repeat) * 1000, "ms", "lower")
+    finally:
+        await _cleanup(lo, hi)
+        async with AsyncSessionLocal() as session:
+            for name in created:
+                await session.execute(text(f"DROP TABLE {name}"))
+            await session.commit()
+
+
+# --- run / compare ----------------------------------------------------------
+
+def _meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    s = get_settings()
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "args": {k: v for k, v in vars(args).items() if k != "func"},
+        "settings": {
+            k: getattr(s, k) for k in (
+                "INGEST_ENGINE", "INGEST_BATCHER_ENABLED", "INGEST_SPOOL_ENABLED",
+                "ROLLUPS_ENABLED", "STATS_CACHE_ENABLED", "RATE_LIMIT_ENABLED",
+            )
+        },
+    }
+
+
+async def _run(args) -> dict:
+    results: Results = {}
+    meta = _meta(args)
+    async with AsyncSessionLocal() as session:
+        meta["postgres"] = (await session.execute(text("SHOW server_version"))).scalar_one()
+    if "ingest" in args.only:
+        await bench_ingest_dao(results, args.ingest_rows, args.batch_sizes)
+        await bench_ingest_http(results, args.clients, args.requests, args.http_batch)
+        await bench_ingest_concurrency(results, args.concurrency, args.requests,
+                                       args.http_batch)
+    if "stats" in args.only:
+        for scale in args.scales:
+            await bench_stats(results, scale, args.days, args.repeat, args.seed)
+    return {"meta": meta, "results": results}
+
+
+def cmd_run(args) -> int:
+    doc = asyncio.run(_run(args))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+    print(f"# wrote {args.out}")
+    return 0
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[tuple]:
+    """(name, base, current, relative change, regressed) for shared metrics."""
+    rows = []
+    for name in sorted(baseline["results"].keys() & current["results"].keys()):
+        b, c = baseline["results"][name], current["results"][name]
+        change = (c["value"] - b["value"]) / b["value"] if b["value"] else 0.0
+        worse = -change if c["better"] == "higher" else change
+        rows.append((name, b["value"], c["value"], change, worse > threshold))
+    return rows
+
+
+def cmd_compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, b, c, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<48} {b:>12.3f} {c:>12.3f} {change:>+7.1%}{flag}")
+    missing = baseline["results"].keys() - current["results"].keys()
+    for name in sorted(missing):
+        print(f"{name:<48} missing from {args.current}")
+    regressions = sum(r[4] for r in rows)
+    print(f"# {regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def _ints(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the suite and write JSON results")
+    run.add_argument("--out", default="bench.json")
+    run.add_argument("--only", type=lambda s: s.split(","), default=["ingest", "stats"],
+                     help="Comma-separated sections: ingest, stats")
+    run.add_argument("--ingest-rows", type=int, default=50_000)
+    run.add_argument("--batch-sizes", type=_ints, default=[100, 1000, 5000])
+    run.add_argument("--clients", type=int, default=16)
+    run.add_argument("--requests", type=int, default=50, help="Requests (or transactions) per client")
+    run.add_argument("--http-batch", type=int, default=100, help="Events per request")
+    run.add_argument("--concurrency", type=_ints, default=[1, 4, 16],
+                     help="Concurrent ingest transactions, rollups on vs off")
+    run.add_argument("--scales", type=_ints, default=[1_000_000, 10_000_000])
+    run.add_argument("--days", type=int, default=90)
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--seed", type=int, default=1)
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="Compare two result files")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.15,
+                      help="Relative change counted as a regression")
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+"""
+Synthetic event generator with realistic shape, for load tests and benchmarks.
+
+    python -m tools.gen_events data/events.csv.gz --days 90 --dau 20000
+    python -m tools.gen_events data/events.ndjson --rows 5000000 --dup-rate 0.01
+    python -m tools.gen_events --copy --start 2025-01-01 --days 30 --rows 2000000
+
+Every day a cohort of new users signs up; a cohort comes back on day g
+with probability --day1-retention * g**-decay (lower on weekends), so
+/stats/retention shows a real decay curve. Inside a cohort users are
+ranked by engagement: the events a user produces per active day follow a
+Zipf law (--zipf) around --events-per-user, and returning users are drawn
+mostly from the engaged end. Event types are weighted (login first,
+signup on a user's first day), properties carry country/device per user,
+a session id per user-day and item/price/query payloads per type.
+
+--dup-rate re-emits that share of rows with the same event_id (ingest has
+to drop them), --late-rate stamps that share of rows up to --late-max-days
+in the past (never before the user's first day) while writing them in a
+later day's shard.
+
+Volume is set with --dau (new users are sized so the last day has about
+that many active users) or --rows (the whole window has about that many
+rows). Days are generated in parallel by --workers processes; a day's
+output depends only on (--seed, day), so a file is byte-identical for the
+same arguments whatever the worker count.
+
+The output format follows the file name: .csv / .ndjson, plus .gz (every
+day is its own gzip member, compressed in the worker). The CSV has the
+importer's columns; NDJSON lines are /events/stream bodies. --copy loads
+the configured database with COPY into events and event_ids instead,
+creating partitions first: the window has to be empty (no duplicates are
+written in this mode, there is no dedupe step). COPY bypasses the rollups
+ingest maintains, so they are rebuilt for the window afterwards, a week
+per transaction; --no-rebuild-rollups skips that and is refused for
+windows reaching rollup_state.maintained_since, whose stats are read from
+rollups only.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gzip
+import io
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+# weighted choices for the events after a user-day's first one
+EVENT_WEIGHTS = {
+    "view": 50,
+    "click": 20,
+    "search": 10,
+    "add_to_cart": 6,
+    "share": 3,
+    "purchase": 2,
+}
+LOGOUT_SHARE = 0.3
+
+# per-user attributes, as 100-slot lookup tables
+COUNTRIES = ["UA"] * 30 + ["PL"] * 20 + ["DE"] * 15 + ["US"] * 15 + ["GB"] * 10 + ["FR"] * 5 + ["CA"] * 5
+DEVICES = ["android"] * 45 + ["ios"] * 30 + ["web"] * 25
+CURRENCY = {"UA": "UAH", "PL": "PLN", "US": "USD", "CA": "CAD", "GB": "GBP"}
+LOGIN_METHODS = ["password", "password", "google", "google", "apple"]
+QUERIES = ["shoes", "phone case", "headphones", "coffee", "backpack", "lamp",
+           "charger", "jacket", "watch", "keyboard", "book", "gift card"]
+ITEMS = 5000
+
+# share of sessions starting in each UTC hour
+HOUR_WEIGHTS = [2, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 6, 7, 7, 6, 6, 6, 7, 8, 9, 9, 8, 6, 4]
+
+COLUMNS = ["event_id", "occurred_at", "user_id", "event_type", "properties_json"]
+COPY_COLUMNS = ["event_id", "occurred_at", "user_id", "event_type", "properties"]
+
+MAX_EVENTS_PER_USER_DAY = 500
+SIZING_PILOT_USERS = 1000
+
+
+@dataclass(frozen=True)
+class Profile:
+    seed: int
+    start: date
+    days: int
+    new_users: int
+    day1_retention: float
+    decay: float
+    weekend_factor: float
+    events_per_user: float
+    zipf: float
+    engagement_skew: float
+    dup_rate: float
+    late_rate: float
+    late_max_days: int
+    user_prefix: str
+    fmt: str               # "csv", "ndjson" or "copy"
+    compress: int          # gzip level, 0 = plain
+
+
+@dataclass
+class Shard:
+    day: int
+    rows: int
+    duplicates: int
+    late: int
+    data: bytes
+    ids: bytes = b""
+
+
+def retention(g: int, day1: float, decay: float) -> float:
+    if g == 0:
+        return 1.0
+    return min(1.0, day1 * g ** -decay)
+
+
+def _weekday_factor(p: Profile, day: int) -> float:
+    return p.weekend_factor if (p.start + timedelta(days=day)).weekday() >= 5 else 1.0
+
+
+def expected_active(p: Profile, day: int) -> float:
+    """Expected active users on a day, new_users per cohort."""
+    returning = sum(
+        retention(day - c, p.day1_retention, p.decay) for c in range(day)
+    ) * _weekday_factor(p, day)
+    return p.new_users * (1 + returning)
+
+
+def _zipf_norm(n: int, s: float) -> float:
+    """Mean of (j + 1) ** -s over j < n (midpoint-rule integral)."""
+    if s == 1.0:
+        total = math.log((n + 0.5) / 0.5)
+    else:
+        total = ((n + 0.5) ** (1 - s) - 0.5 ** (1 - s)) / (1 - s)
+    return total / n
+
+
+def _uuid4(rng: random.Random) -> str:
+    x = rng.getrandbits(128)
+    x = (x & ~(0xF000 << 64)) | (0x4000 << 64)
+    x = (x & ~(0xC000 << 48)) | (0x8000 << 48)
+    h = f"{x:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _returning(rng: random.Random, n: int, k: int, skew: float) -> List[int]:
+    """k distinct ranks out of n, biased toward low (engaged) ranks."""
+    if k >= n:
+        return list(range(n))
+    if k > n * 0.3 or skew <= 1.0:
+        return rng.sample(range(n), k)
+    picked = set()
+    rand = rng.random
+    while len(picked) < k:
+        picked.add(int(n * rand() ** skew))
+    return list(picked)
+
+
+def _properties(rng: random.Random, event_type: str, country: str, device: str, session: str) -> str:
+    base = f'"country":"{country}","device":"{device}","session_id":"{session}"'
+    if event_type in ("view", "click", "add_to_cart", "share"):
+        item = int(ITEMS * rng.random() ** 3)
+        return f'{{{base},"item_id":"sku-{item}"}}'
+    if event_type == "purchase":
+        item = int(ITEMS * rng.random() ** 3)
+        amount = round(rng.lognormvariate(3.5, 0.8), 2)
+        return (f'{{{base},"item_id":"sku-{item}","amount":{amount},'
+                f'"currency":"{CURRENCY.get(country, "EUR")}"}}')
+    if event_type == "search":
+        return f'{{{base},"query":"{QUERIES[int(len(QUERIES) * rng.random() ** 2)]}"}}'
+    if event_type == "login":
+        return f'{{{base},"method":"{LOGIN_METHODS[int(rng.random() * 5)]}"}}'
+    if event_type == "signup":
+        return f'{{{base},"referrer":"{rng.choice(("organic", "ads", "invite"))}"}}'
+    return f"{{{base}}}"
+
+
+def generate_day(p: Profile, day: int) -> Shard:
+    """Every event written in day `day`'s shard; depends only on (seed, day)."""
+    rng = random.Random(f"{p.seed}:{day}")
+    rand = rng.random
+    weekday = _weekday_factor(p, day)
+    days = [(p.start + timedelta(days=d)).isoformat() for d in range(day + 1)]
+    types = list(EVENT_WEIGHTS)
+    cum_types = [sum(list(EVENT_WEIGHTS.values())[:i + 1]) for i in range(len(types))]
+    cum_hours = [sum(HOUR_WEIGHTS[:i + 1]) for i in range(24)]
+    hours = list(range(24))
+    norm = _zipf_norm(p.new_users, p.zipf)
+    extra_mean = max(0.0, p.events_per_user - 1)
+    csv_out = p.fmt != "ndjson"
+
+    out: List[str] = []
+    ids: List[str] = []
+    dups: List[str] = []
+    late = 0
+
+    for cohort in range(day + 1):
+        g = day - cohort
+        n = p.new_users
+        if g == 0:
+            active = range(n)
+        else:
+            prob = min(1.0, retention(g, p.day1_retention, p.decay) * weekday)
+            k = round(n * prob + rng.gauss(0, math.sqrt(n * prob * (1 - prob))))
+            active = _returning(rng, n, max(0, min(n, k)), p.engagement_skew)
+
+        for j in active:
+            uid = f"{p.user_prefix}u{cohort}-{j}"
+            h = ((cohort * 1_000_003 + j) * 2654435761) & 0xFFFFFFFF
+            country = COUNTRIES[h % 100]
+            device = DEVICES[(h >> 8) % 100]
+            session = f"{rng.getrandbits(32):08x}"
+
+            mean = extra_mean * (j + 1) ** -p.zipf / norm
+            count = 1 + (int(rng.expovariate(1 / mean)) if mean > 0 else 0)
+            count = min(count, MAX_EVENTS_PER_USER_DAY)
+            kinds = ["signup", "login"] if g == 0 else ["login"]
+            if count > len(kinds):
+                kinds += rng.choices(types, cum_weights=cum_types, k=count - len(kinds))
+                if rand() < LOGOUT_SHARE:
+                    kinds.append("logout")
+
+            second = rng.choices(hours, cum_weights=cum_hours)[0] * 3600 + int(rand() * 3600)
+            for event_type in kinds:
+                ts_day = day
+                if p.late_rate and rand() < p.late_rate:
+                    lag = rng.randint(1, p.late_max_days)
+                    if lag <= g:
+                        ts_day = day - lag
+                        late += 1
+                hh, rest = divmod(min(second, 86399), 3600)
+                mm, ss = divmod(rest, 60)
+                ts = f"{days[ts_day]}T{hh:02d}:{mm:02d}:{ss:02d}Z"
+                second += 1 + int(rng.expovariate(1 / 40))
+
+                eid = _uuid4(rng)
+                props = _properties(rng, event_type, country, device, session)
+                if csv_out:
+                    line = f'{eid},{ts},{uid},{event_type},"{props.replace(chr(34), chr(34) * 2)}"\n'
+                else:
+                    line = (f'{{"event_id":"{eid}","occurred_at":"{ts}","user_id":"{uid}",'
+                            f'"event_type":"{event_type}","properties":{props}}}\n')
+                out.append(line)
+                if p.fmt == "copy":
+                    ids.append(f"{eid},{ts}")
+                elif p.dup_rate and rand() < p.dup_rate:
+                    dups.append(line)
+
+    # retries arrive after the original
+    rows = len(out)
+    out.extend(dups)
+    data = "".join(out).encode()
+    if p.compress:
+        data = gzip.compress(data, compresslevel=p.compress, mtime=0)
+    return Shard(
+        day=day,
+        rows=rows + len(dups),
+        duplicates=len(dups),
+        late=late,
+        data=data,
+        ids="\n".join(ids).encode() + (b"\n" if ids else b""),
+    )
+
+
+def _generate_day(args: Tuple[Profile, int]) -> Shard:
+    return generate_day(*args)
+
+
+def generate(p: Profile, workers: int) -> Iterator[Shard]:
+    """Shards in day order; up to `workers` days are generated ahead."""
+    jobs = [(p, day) for day in range(p.days)]
+    if workers <= 1:
+        yield from map(_generate_day, jobs)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(_generate_day, jobs)
+
+
+def expected_rows(p: Profile) -> float:
+    """
+    Expected rows (without duplicates) for a profile, from the same
+    returning-user draws the generator makes but without the events.
+    """
+    norm = _zipf_norm(p.new_users, p.zipf)
+    extra_mean = max(0.0, p.events_per_user - 1)
+    total = 0.0
+    for day in range(p.days):
+        rng = random.Random(f"{p.seed}:size:{day}")
+        weekday = _weekday_factor(p, day)
+        for cohort in range(day + 1):
+            g = day - cohort
+            n = p.new_users
+            if g == 0:
+                active = range(n)
+            else:
+                prob = min(1.0, retention(g, p.day1_retention, p.decay) * weekday)
+                active = _returning(rng, n, round(n * prob), p.engagement_skew)
+            first = 2 if g == 0 else 1
+            for j in active:
+                m = extra_mean * (j + 1) ** -p.zipf / norm
+                if m <= 0:
+                    total += first
+                    continue
+                # extra events are floor(Exp(m)); login/signup come first anyway
+                q = math.exp(-1 / m)
+                extra = min(q / (1 - q), MAX_EVENTS_PER_USER_DAY - 1)
+                total += 1 + extra + (1 - q if first == 2 else 0) + LOGOUT_SHARE * q ** first
+    return total
+
+
+def sizing(args: argparse.Namespace, profile: Profile) -> int:
+    """New users per day giving about --dau on the last day or --rows in total."""
+    if args.rows:
+        # rows are close to linear in new_users: a guess from a small
+        # cohort size, then one correction at the guessed size
+        n = min(SIZING_PILOT_USERS, max(1, args.rows // profile.days))
+        for _ in range(2):
+            rows = expected_rows(Profile(**{**profile.__dict__, "new_users": n}))
+            n = max(1, round(args.rows * n / rows))
+        return n
+    unit = Profile(**{**profile.__dict__, "new_users": 1})
+    return max(1, round(args.dau / expected_active(unit, profile.days - 1)))
+
+
+def _output_format(path: str) -> Tuple[str, int]:
+    name = path[:-3] if path.endswith(".gz") else path
+    level = 6 if path.endswith(".gz") else 0
+    if name.endswith(".csv"):
+        return "csv", level
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson", level
+    raise SystemExit(f"unsupported output {path!r}: use .csv, .ndjson or .jsonl, optionally .gz")
+
+
+def write_file(path: str, p: Profile, workers: int) -> Iterator[Shard]:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        if p.fmt == "csv":
+            header = (",".join(COLUMNS) + "\n").encode()
+            f.write(gzip.compress(header, compresslevel=p.compress, mtime=0) if p.compress else header)
+        for shard in generate(p, workers):
+            f.write(shard.data)
+            yield shard
+
+
+REBUILD_CHUNK_DAYS = 7
+
+
+async def copy_to_db(p: Profile, workers: int, rebuild: bool = True) -> List[Shard]:
+    from sqlalchemy import text
+
+    from app.core.config import get_settings
+    from app.db.session import AsyncSessionLocal
+    from app.services.day_versions_dao import bump_day_versions
+    from app.services.partitions_dao import ensure_partitions
+    from app.services.rollups_dao import maintained_since, rebuild_rollups
+
+    last = p.start + timedelta(days=p.days - 1)
+    async with AsyncSessionLocal() as session:
+        since = await maintained_since(session)
+        if not rebuild and since is not None and last >= since:
+            raise ValueError(
+                f"rollups are maintained from {since} on; a window reaching it "
+                "needs the rollup rebuild"
+            )
+        await ensure_partitions(session, p.start, last, get_settings().EVENTS_PARTITION_INTERVAL)
+        await session.commit()
+
+    shards = []
+    for shard in generate(p, workers):
+        # a day per transaction
+        async with AsyncSessionLocal() as session:
+            conn = await session.connection()
+            raw = (await conn.get_raw_connection()).driver_connection
+            await raw.copy_to_table(
+                "event_ids", source=io.BytesIO(shard.ids),
+                columns=["event_id", "occurred_at"], format="csv",
+            )
+            await raw.copy_to_table(
+                "events", source=io.BytesIO(shard.data), columns=COPY_COLUMNS, format="csv",
+            )
+            # late rows reach back at most late_max_days
+            first = max(0, shard.day - (p.late_max_days if p.late_rate else 0))
+            await bump_day_versions(session, [
+                p.start + timedelta(days=d) for d in range(first, shard.day + 1)
+            ])
+            await session.commit()
+        shards.append(shard)
+        _progress(shard, p)
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("ANALYZE events"))
+        await session.commit()
+    day = p.start
+    while rebuild and day <= last:
+        # short transactions: the rebuild holds ingest's rollup writes back
+        chunk_to = min(day + timedelta(days=REBUILD_CHUNK_DAYS - 1), last)
+        async with AsyncSessionLocal() as session:
+            await rebuild_rollups(session, day, chunk_to)
+            await session.commit()
+        day = chunk_to + timedelta(days=1)
+    return shards
+
+
+def _progress(shard: Shard, p: Profile) -> None:
+    print(
+        f"{p.start + timedelta(days=shard.day)}: {shard.rows} rows",
+        file=sys.stderr,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out", nargs="?", help="Output file: .csv, .ndjson or .jsonl, optionally .gz")
+    parser.add_argument("--copy", action="store_true", help="COPY into the configured database instead")
+    parser.add_argument("--no-rebuild-rollups", dest="rebuild_rollups", action="store_false",
+                        help="With --copy: leave the window's rollups alone (only before maintained_since)")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2025, 1, 1))
+    parser.add_argument("--days", type=int, default=30)
+    volume = parser.add_mutually_exclusive_group()
+    volume.add_argument("--dau", type=int, default=10_000, help="Active users on the last day")
+    volume.add_argument("--rows", type=int, help="Total rows instead of --dau")
+    parser.add_argument("--events-per-user", type=float, default=8.0, help="Mean events per active user-day")
+    parser.add_argument("--zipf", type=float, default=0.8, help="Zipf exponent of per-user activity")
+    parser.add_argument("--engagement-skew", type=float, default=2.0,
+                        help="How strongly returning users are the engaged ones (1 = not at all)")
+    parser.add_argument("--day1-retention", type=float, default=0.4)
+    parser.add_argument("--decay", type=float, default=0.5, help="Retention on day g is day1 * g**-decay")
+    parser.add_argument("--weekend-factor", type=float, default=0.8)
+    parser.add_argument("--dup-rate", type=float, default=0.0, help="Share of rows re-sent with the same event_id")
+    parser.add_argument("--late-rate", type=float, default=0.0, help="Share of rows stamped days in the past")
+    parser.add_argument("--late-max-days", type=int, default=3)
+    parser.add_argument("--user-prefix", default="")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--gzip-level", type=int, default=None, help="Override the .gz compression level")
+    args = parser.parse_args(argv)
+
+    if bool(args.out) == args.copy:
+        parser.error("give an output file or --copy")
+    if not args.rebuild_rollups and not args.copy:
+        parser.error("--no-rebuild-rollups needs --copy")
+    if args.days < 1:
+        parser.error("--days must be >= 1")
+
+    if args.copy:
+        fmt, level = "copy", 0
+    else:
+        fmt, level = _output_format(args.out)
+        if level and args.gzip_level is not None:
+            level = args.gzip_level
+
+    profile = Profile(
+        seed=args.seed, start=args.start, days=args.days, new_users=1,
+        day1_retention=args.day1_retention, decay=args.decay,
+        weekend_factor=args.weekend_factor, events_per_user=args.events_per_user,
+        zipf=args.zipf, engagement_skew=args.engagement_skew,
+        dup_rate=0.0 if args.copy else args.dup_rate,
+        late_rate=args.late_rate, late_max_days=args.late_max_days,
+        user_prefix=args.user_prefix, fmt=fmt, compress=level,
+    )
+    profile = Profile(**{**profile.__dict__, "new_users": sizing(args, profile)})
+
+    t0 = time.perf_counter()
+    if args.copy:
+        try:
+            shards = asyncio.run(copy_to_db(profile, args.workers, args.rebuild_rollups))
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        shards = []
+        for shard in write_file(args.out, profile, args.workers):
+            shards.append(shard)
+            _progress(shard, profile)
+    elapsed = time.perf_counter() - t0
+
+    rows = sum(s.rows for s in shards)
+    print(
+        f"{rows} rows ({sum(s.duplicates for s in shards)} duplicates, "
+        f"{sum(s.late for s in shards)} late) for {profile.new_users} new users/day "
+        f"over {profile.days} days in {elapsed:.1f}s = {rows / elapsed * 60 / 1e6:.2f}M rows/min "
+        f"-> {args.out or 'database'}"
+    )
+
+
+if __name__ == "__main__":
+    main()